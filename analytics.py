@@ -0,0 +1,182 @@
+
+# Inventory analytics: total value, units per brand and low stock
+#
+# InventoryStats listens to the memory store and keeps running sums that
+# are changed by every add, update, delete and clear, so GET
+# /inventory/stats does not have to look at every item:
+# - item count, units (sum of stock) and value (sum of price * stock)
+# - the same three numbers per brand (an item with "Silk, Danone" counts
+#   for both brands)
+# - a sorted index of (stock, id), so the low-stock list only reads the
+#   items it returns
+#
+# compute_stats() builds the same numbers from scratch, one column at a
+# time. It is used to check the running sums (InventoryStats.check()).
+#
+# Stock or price values that are missing or not numbers (true / false
+# included, like in adjust_stock) count as 0.
+
+import math
+import operator
+import threading
+
+from store import SortedIndex, brand_keys
+
+
+def number(value):
+    """Return value if it is a finite number (not a bool), else 0."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value):
+        return value
+    return 0
+
+
+def round_value(value):
+    # "+ 0.0" turns a -0.0 left by the running sums into 0.0
+    return round(value, 2) + 0.0
+
+
+def format_stats(items, units, value, brands):
+    """Build the GET /inventory/stats body from the totals."""
+    return {
+        "items": items,
+        "units": units,
+        "value": round_value(value),
+        "brands": [
+            {"brand": brand, "items": totals[0], "units": totals[1], "value": round_value(totals[2])}
+            for brand, totals in sorted(brands.items())
+        ],
+    }
+
+
+def compute_stats(items):
+    """
+    Compute the stats of a list of items from scratch.
+
+    Works column by column: pull out the price and stock columns, then
+    let sum() and map() do the loops in C.
+    """
+    products = [item["product"] for item in items]
+    prices = list(map(number, map(operator.methodcaller("get", "price"), products)))
+    stocks = list(map(number, map(operator.methodcaller("get", "stock"), products)))
+    values = list(map(operator.mul, prices, stocks))
+
+    brands = {}
+    for product, stock, value in zip(products, stocks, values):
+        for brand in brand_keys(product):
+            totals = brands.setdefault(brand, [0, 0, 0.0])
+            totals[0] += 1
+            totals[1] += stock
+            totals[2] += value
+
+    return format_stats(len(products), sum(stocks), math.fsum(values), brands)
+
+
+class InventoryStats:
+    """Running totals for an InventoryStore."""
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+
+        self._items = 0
+        self._units = 0
+        self._value = 0.0
+        self._brands = {}  # brand -> [items, units, value]
+        self._by_stock = SortedIndex()  # (stock, id)
+        # id -> (brands, stock, value) last counted, to undo it on change
+        self._counted = {}
+
+        store.follow(self._on_change)
+
+    def _on_change(self, event, item, changes):
+        with self._lock:
+            if event == "clear":
+                self._reset()
+                return
+            if event in ("update", "delete"):
+                self._remove(item["id"])
+            if event in ("add", "update"):
+                self._add(item)
+
+    def _add(self, item):
+        product = item["product"]
+        stock = number(product.get("stock"))
+        value = number(product.get("price")) * stock
+        brands = tuple(brand_keys(product))
+
+        self._items += 1
+        self._units += stock
+        self._value += value
+        for brand in brands:
+            totals = self._brands.setdefault(brand, [0, 0, 0.0])
+            totals[0] += 1
+            totals[1] += stock
+            totals[2] += value
+
+        self._by_stock.add((stock, item["id"]))
+        self._counted[item["id"]] = (brands, stock, value)
+
+    def _remove(self, item_id):
+        counted = self._counted.pop(item_id, None)
+        if counted is None:
+            return
+        brands, stock, value = counted
+
+        self._items -= 1
+        self._units -= stock
+        self._value -= value
+        for brand in brands:
+            totals = self._brands[brand]
+            totals[0] -= 1
+            totals[1] -= stock
+            totals[2] -= value
+            # drop brands with no items left
+            if totals[0] == 0:
+                del self._brands[brand]
+
+        self._by_stock.remove((stock, item_id))
+
+    def _reset(self):
+        self._items = 0
+        self._units = 0
+        self._value = 0.0
+        self._brands.clear()
+        self._by_stock.clear()
+        self._counted.clear()
+
+    def stats(self):
+        """Totals and per-brand rollups, O(number of brands)."""
+        with self._lock:
+            return format_stats(self._items, self._units, self._value, self._brands)
+
+    def low_stock(self, threshold, limit=100):
+        """Return up to `limit` items with stock <= threshold, lowest stock first."""
+        with self._lock:
+            ids = []
+            for stock, item_id in self._by_stock:
+                if stock > threshold or len(ids) >= limit:
+                    break
+                ids.append(item_id)
+        return self.store.get_many(ids)
+
+    def check(self):
+        """
+        Return True if the running totals match a full recompute.
+        Only meaningful while no writes are running.
+        """
+        return _same_stats(self.stats(), compute_stats(self.store.all()))
+
+
+def _same_stats(actual, expected):
+    if (actual["items"], [b["brand"] for b in actual["brands"]]) != (
+        expected["items"], [b["brand"] for b in expected["brands"]]
+    ):
+        return False
+    # the running sums may differ from a fresh sum in the last float digits
+    pairs = [(actual, expected)] + list(zip(actual["brands"], expected["brands"]))
+    return all(
+        a["items"] == b["items"]
+        and math.isclose(a["units"], b["units"], abs_tol=1e-6)
+        and math.isclose(a["value"], b["value"], abs_tol=0.01)
+        for a, b in pairs
+    )
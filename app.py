@@ -1,15 +1,40 @@
 
-from flask import Flask, jsonify, request  
-import requests  # to call the external OpenFoodFacts API
+import base64
+import binascii
+import copy
+import hmac
+import json
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-app = Flask(__name__)
+from flask import Blueprint, Flask, Response, current_app, g, has_app_context, jsonify, request, stream_with_context
+from werkzeug.local import LocalProxy
 
-# Fake "database" (inventory array)
+from analytics import InventoryStats, compute_stats
+from changes import ChangeFeed, ResyncRequired
+from compression import CompressedCache, available_encodings, compress, compress_stream
+from jobs import JobError, JobQueue, QueueFull
+from metrics import Registry, instrument
+from off_cache import LookupCache, SingleFlight
+from profiling import SORT_KEYS, Profiler
+from range_index import SORT_ORDERS, RangeIndex, range_key, range_value, scan_range
+from search import SearchIndex
+from serializer import ResponseCache, encode_fast
+from store import InsufficientStockError, InventoryStore, VersionConflictError, parse_fields
+
+# Every route and hook is on this blueprint; create_app() (below) puts it
+# on a new Flask app
+api = Blueprint("inventory", __name__)
+
+# Example items used to fill an empty store
 # Each item has:
 # - id: unique ID for our system
 # - status: like OpenFoodFacts status (1 = found)
 # - product: dictionary with product details
-inventory = [
+SEED_ITEMS = [
     {
         "id": 1,
         "status": 1,
@@ -37,68 +62,1212 @@ inventory = [
 ]
 
 
-# Helper function to find an item by id in the inventory list
+# Pick the storage backend (create_app() passes its config; without
+# arguments the environment variables are used):
+#   INVENTORY_BACKEND=memory  (default) keep everything in a Python dict
+#   INVENTORY_BACKEND=sqlite  keep items in a SQLite file (INVENTORY_DB)
+# With the memory backend, INVENTORY_DATA_DIR turns on the write-ahead
+# log, so changes survive a restart (INVENTORY_FSYNC picks the fsync policy).
+def create_store(backend=None, db_path=None, data_dir=None, fsync=None, items=None):
+    backend = backend or os.environ.get("INVENTORY_BACKEND", "memory")
+    items = SEED_ITEMS if items is None else items
+
+    if backend == "memory":
+        data_dir = data_dir or os.environ.get("INVENTORY_DATA_DIR")
+        if not data_dir:
+            # copy so changes to the store never touch SEED_ITEMS
+            return InventoryStore(copy.deepcopy(items))
+
+        from journal import Journal
+
+        store = InventoryStore()
+        journal = Journal(data_dir, fsync=fsync or os.environ.get("INVENTORY_FSYNC", "interval"))
+        recovered = journal.recover(store)
+        journal.attach(store)
+        if not recovered:
+            # first start: the seed items go through the log like any other change
+            for item in copy.deepcopy(items):
+                store.insert(item)
+        return store
+
+    if backend == "sqlite":
+        # imported here so the default backend does not need it
+        from sqlite_store import SQLiteInventoryStore
+
+        db_path = db_path or os.environ.get("INVENTORY_DB", "inventory.db")
+        return SQLiteInventoryStore(db_path, items)
+
+    raise ValueError(f"Unknown INVENTORY_BACKEND: {backend}")
+
+
+# App factory
+#
+# create_app(config) builds a Flask app with its own store, caches and
+# OpenFoodFacts client, so every test (or worker) can have a fresh one:
+#     test_app = create_app({"INVENTORY_BACKEND": "sqlite", "INVENTORY_DB": path})
+# Nothing is built when the app is created. The store (with the indexes
+# and caches that follow it), the OpenFoodFacts client (and `requests`),
+# the lookup cache, the offline dump and the job queue are each built by
+# the first request that needs them.
+#
+# The routes use module names like `inventory` and `off_client`. These
+# are proxies to the objects of the app handling the request (or of the
+# default `app` at the end of this file, outside a request).
+
+# Settings read from create_app's config; a missing one comes from the
+# environment variable with the same name, or this default
+CONFIG_DEFAULTS = {
+    "INVENTORY_BACKEND": "memory",
+    "INVENTORY_DB": "inventory.db",
+    "INVENTORY_DATA_DIR": None,
+    "INVENTORY_FSYNC": "interval",
+    #   INVENTORY_CHANGES_SIZE  how many changes GET /inventory/changes keeps
+    "INVENTORY_CHANGES_SIZE": 10_000,
+    #   OFF_BASE_URL         API address (a local stub in tests/benchmarks)
+    #   OFF_POOL_SIZE        keep-alive connections kept open
+    #   OFF_CONNECT_TIMEOUT  seconds to open a connection
+    #   OFF_READ_TIMEOUT     seconds to wait for the answer
+    #   OFF_RETRIES          extra attempts for network errors / 429 / 5xx
+    "OFF_BASE_URL": None,
+    "OFF_POOL_SIZE": 10,
+    "OFF_CONNECT_TIMEOUT": 3.05,
+    "OFF_READ_TIMEOUT": 5,
+    "OFF_RETRIES": 2,
+    #   OFF_CACHE_SIZE          max barcodes kept in memory
+    #   OFF_CACHE_TTL           seconds a found product is kept
+    #   OFF_CACHE_NEGATIVE_TTL  seconds a "not found" / error result is kept
+    #   OFF_CACHE_PATH          optional SQLite file so the cache survives restarts
+    "OFF_CACHE_SIZE": 10_000,
+    "OFF_CACHE_TTL": 24 * 3600,
+    "OFF_CACHE_NEGATIVE_TTL": 300,
+    "OFF_CACHE_PATH": None,
+    #   OFF_DUMP_INDEX  offline OpenFoodFacts index built with off_dump.py;
+    #                   barcodes found in it never go to the network
+    "OFF_DUMP_INDEX": None,
+    #   OFF_JOB_WORKERS      lookups running at once in the background
+    #   OFF_JOB_QUEUE_SIZE   max lookups waiting or running, more get a 503
+    "OFF_JOB_WORKERS": 4,
+    "OFF_JOB_QUEUE_SIZE": 1000,
+    #   OFF_BATCH_CONCURRENCY  max lookups running at once for one batch
+    #   OFF_BATCH_MAX_SIZE     max barcodes in one batch request
+    #   OFF_FETCH_ASYNC        1 makes ?async=true the default for POST /inventory/fetch/<barcode>
+    "OFF_BATCH_CONCURRENCY": 8,
+    "OFF_BATCH_MAX_SIZE": 10_000,
+    "OFF_FETCH_ASYNC": False,
+    #   INVENTORY_METRICS  0 turns off the timing of requests and store calls
+    "INVENTORY_METRICS": True,
+    #   INVENTORY_PROFILE              1 profiles sampled requests from the start
+    #   INVENTORY_PROFILE_RATE         fraction of requests to profile
+    #   INVENTORY_PROFILE_TRACEMALLOC  1 also traces memory allocations
+    #   INVENTORY_ADMIN_TOKEN          token for the /admin/profile endpoints
+    #                                  (they are disabled when it is not set)
+    "INVENTORY_PROFILE": False,
+    "INVENTORY_PROFILE_RATE": 0.01,
+    "INVENTORY_PROFILE_TRACEMALLOC": False,
+    "INVENTORY_ADMIN_TOKEN": None,
+    #   INVENTORY_COMPRESS_MIN_SIZE  smaller bodies are sent uncompressed (bytes)
+    #   INVENTORY_GZIP_LEVEL         1 (fastest) .. 9 (smallest)
+    "INVENTORY_COMPRESS_MIN_SIZE": 1024,
+    "INVENTORY_GZIP_LEVEL": 6,
+    #   INVENTORY_SSE_SECONDS  an SSE stream of GET /inventory/changes is closed
+    #                          after this long; EventSource reconnects by itself
+    #   INVENTORY_BULK_MAX     max operations accepted by POST /inventory/bulk
+    "INVENTORY_SSE_SECONDS": 300,
+    "INVENTORY_BULK_MAX": 50_000,
+}
+
+
+def setting_flag(value):
+    """An on/off setting: True/False from config, or "1"/"0" (etc.) from the environment."""
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+# marks a service that was not built yet (a built one can be None)
+NOT_BUILT = object()
+
+
+class Services:
+    """
+    The objects one app needs, each built the first time it is used.
+
+    get(name) returns one of: inventory, response_cache, inventory_stats,
+    search_index, range_index, change_feed (built together with the
+    store, so the indexes see every change), off_client, lookup_cache,
+    lookups_in_flight, dump_index, jobs, metrics, profiler and
+    compressed_bodies.
+    """
+
+    STORE_PARTS = ("inventory", "response_cache", "inventory_stats", "search_index", "range_index", "change_feed")
+
+    def __init__(self, config):
+        self.config = config
+        self._built = {}
+        # an RLock because building one service can need another
+        self._lock = threading.RLock()
+
+    def get(self, name):
+        service = self._built.get(name, NOT_BUILT)
+        if service is NOT_BUILT:
+            with self._lock:
+                if name not in self._built:
+                    if name in self.STORE_PARTS:
+                        self._build_store()
+                    else:
+                        self._built[name] = getattr(self, f"_build_{name}")()
+                service = self._built[name]
+        return service
+
+    def peek(self, name):
+        """Return the service if it was built already, else None."""
+        return self._built.get(name)
+
+    def _build_store(self):
+        config = self.config
+        store = create_store(
+            config["INVENTORY_BACKEND"], config["INVENTORY_DB"], config["INVENTORY_DATA_DIR"],
+            config["INVENTORY_FSYNC"], config.get("SEED_ITEMS"),
+        )
+        if setting_flag(config["INVENTORY_METRICS"]):
+            # time the store methods the routes use (generators like
+            # iter_pages are left out, they return before doing the work)
+            instrument(store, [
+                "get", "get_many", "all", "add", "update", "delete", "adjust_stock", "apply_batch", "find", "page", "clear",
+            ], self.get("metrics").store_seconds)
+
+        memory = isinstance(store, InventoryStore)
+        parts = {
+            "inventory": store,
+            # Encoded JSON of the items, reused until an item changes (see
+            # serializer.py). Only the memory store tells us about every
+            # change, so SQLite skips it.
+            "response_cache": ResponseCache(store) if memory else None,
+            # Running totals for GET /inventory/stats and /inventory/low-stock
+            # (see analytics.py). The SQLite store answers the same calls with SQL.
+            "inventory_stats": InventoryStats(store) if memory else store,
+            # Full-text index for GET /inventory/search (see search.py). The
+            # SQLite store has its own FTS5 index.
+            "search_index": SearchIndex(store) if memory else store,
+            # Sorted price and stock indexes for GET /inventory?min_price=...
+            # (see range_index.py). The SQLite store uses indexes on its columns.
+            "range_index": RangeIndex(store) if memory else store,
+            # Ring buffer of the latest changes for GET /inventory/changes (see changes.py)
+            "change_feed": ChangeFeed(store, size=int(config["INVENTORY_CHANGES_SIZE"])),
+        }
+        self._built.update(parts)
+
+    def _build_off_client(self):
+        # imported here: `requests` is only loaded when a lookup needs it
+        from off_client import DEFAULT_BASE_URL, OpenFoodFactsClient
+
+        config = self.config
+        return OpenFoodFactsClient(
+            base_url=config["OFF_BASE_URL"] or DEFAULT_BASE_URL,
+            pool_size=int(config["OFF_POOL_SIZE"]),
+            connect_timeout=float(config["OFF_CONNECT_TIMEOUT"]),
+            read_timeout=float(config["OFF_READ_TIMEOUT"]),
+            retries=int(config["OFF_RETRIES"]),
+        )
+
+    def _build_lookup_cache(self):
+        config = self.config
+        return LookupCache(
+            max_size=int(config["OFF_CACHE_SIZE"]),
+            ttl=float(config["OFF_CACHE_TTL"]),
+            negative_ttl=float(config["OFF_CACHE_NEGATIVE_TTL"]),
+            path=config["OFF_CACHE_PATH"],
+        )
+
+    def _build_lookups_in_flight(self):
+        # lookups of the same barcode that run at the same time share one API call
+        return SingleFlight()
+
+    def _build_dump_index(self):
+        if not self.config["OFF_DUMP_INDEX"]:
+            return None
+        # imported here so the default setup does not need it
+        from off_dump import DumpIndex
+
+        return DumpIndex(self.config["OFF_DUMP_INDEX"])
+
+    def _build_jobs(self):
+        return JobQueue(workers=int(self.config["OFF_JOB_WORKERS"]), max_pending=int(self.config["OFF_JOB_QUEUE_SIZE"]))
+
+    def _build_metrics(self):
+        return AppMetrics()
+
+    def _build_profiler(self):
+        config = self.config
+        profiler = Profiler(
+            enabled=setting_flag(config["INVENTORY_PROFILE"]),
+            sample_rate=float(config["INVENTORY_PROFILE_RATE"]),
+        )
+        if setting_flag(config["INVENTORY_PROFILE_TRACEMALLOC"]):
+            profiler.set_tracemalloc(True)
+        return profiler
+
+    def _build_compressed_bodies(self):
+        return CompressedCache()
+
+    def close(self):
+        """Stop the job threads and close the files of the services that were built."""
+        jobs = self.peek("jobs")
+        if jobs is not None:
+            jobs.shutdown()
+        for name in ("inventory", "dump_index"):
+            service = self.peek(name)
+            if service is not None and hasattr(service, "close"):
+                service.close()
+
+
+def create_app(config=None):
+    """
+    Create the Flask app. config is a dict of CONFIG_DEFAULTS keys (and any
+    Flask setting); SEED_ITEMS sets the items a new store starts with.
+    """
+    new_app = Flask(__name__)
+    for name, default in CONFIG_DEFAULTS.items():
+        new_app.config[name] = os.environ.get(name, default)
+    new_app.config.update(config or {})
+    new_app.extensions["inventory"] = Services(new_app.config)
+    new_app.register_blueprint(api)
+    return new_app
+
+
+def services():
+    """The Services of the app handling this request (or of the default app)."""
+    if has_app_context():
+        return current_app.extensions["inventory"]
+    return app.extensions["inventory"]
+
+
+def service_proxy(name):
+    return LocalProxy(lambda: services().get(name))
+
+
+def setting(name):
+    """A CONFIG_DEFAULTS setting of the app handling this request (or of the default app)."""
+    return services().config[name]
+
+
+def resolve(value):
+    """The object behind a proxy (to compare it with None)."""
+    return value._get_current_object() if isinstance(value, LocalProxy) else value
+
+
+def with_app_context(function):
+    """Wrap function so it runs in this request's app, for worker threads."""
+    target = current_app._get_current_object()
+
+    def run(*args, **kwargs):
+        with target.app_context():
+            return function(*args, **kwargs)
+
+    return run
+
+
+# "database" used by all the routes below, and the objects that follow it
+inventory = service_proxy("inventory")
+response_cache = service_proxy("response_cache")
+inventory_stats = service_proxy("inventory_stats")
+search_index = service_proxy("search_index")
+range_index = service_proxy("range_index")
+change_feed = service_proxy("change_feed")
+
+
+def default_json_settings():
+    """
+    True if encode_fast() gives exactly what jsonify() would send.
+    (In debug mode jsonify pretty-prints, so we fall back to it.)
+    """
+    json_provider = current_app.json
+    compact = json_provider.compact
+    if compact is None:
+        compact = not current_app.debug
+    return compact and json_provider.sort_keys and json_provider.ensure_ascii
+
+
+def use_response_cache():
+    """True if the cached bytes are exactly what jsonify() would send."""
+    return resolve(response_cache) is not None and default_json_settings()
+
+
+def cached_json_response(body):
+    return Response(body, mimetype=current_app.json.mimetype)
+
+
+def json_response(value):
+    """Like jsonify(value), but encoded with orjson when that gives the same bytes."""
+    if default_json_settings():
+        return cached_json_response(encode_fast(value) + b"\n")
+    return jsonify(value)
+
+
+# Helper function to find an item by id in the inventory store
 def find_item_by_id(item_id):
-    for item in inventory:
-        if item["id"] == item_id:
-            return item
-    return None
+    return inventory.get(item_id)
+
+# OpenFoodFacts lookups (see off_client.py, off_cache.py and off_dump.py)
+off_client = service_proxy("off_client")
+lookup_cache = service_proxy("lookup_cache")
+lookups_in_flight = service_proxy("lookups_in_flight")
+# None unless OFF_DUMP_INDEX is set
+dump_index = service_proxy("dump_index")
+
+# Bulk barcode imports (OFF_BATCH_CONCURRENCY and OFF_BATCH_MAX_SIZE are in
+# CONFIG_DEFAULTS) and background barcode lookups for
+# POST /inventory/fetch/<barcode>?async=true (see jobs.py)
+jobs = service_proxy("jobs")
+
+
+class AppMetrics:
+    """The request metrics of one app, served at GET /metrics (see metrics.py)."""
+
+    def __init__(self):
+        self.registry = Registry()
+        self.request_count = self.registry.counter(
+            "inventory_http_requests_total", "HTTP requests by method, route and status.",
+            ("method", "route", "status"),
+        )
+        self.request_seconds = self.registry.histogram(
+            "inventory_http_request_duration_seconds", "Time to handle a request (until the body starts).",
+            ("method", "route"),
+        )
+        self.upstream_seconds = self.registry.histogram(
+            "inventory_upstream_request_duration_seconds", "Time spent in OpenFoodFacts calls (cache misses).",
+            ("service", "result"),
+        )
+        self.store_seconds = self.registry.histogram(
+            "inventory_store_operation_duration_seconds", "Time spent in inventory store methods.",
+            ("operation",),
+        )
+        # the gauges read the services of the app being scraped
+        gauge = self.registry.gauge
+        gauge("inventory_items", "Items in the inventory.", lambda: len(inventory))
+        gauge("inventory_lookup_cache_entries", "Barcodes in the lookup cache.",
+              lambda: lookup_cache.stats()["size"])
+        gauge("inventory_lookup_cache_requests_total", "Lookup cache hits and misses.",
+              lambda: {"hit": lookup_cache.hits, "miss": lookup_cache.misses}, ("result",), type="counter")
+        gauge("inventory_lookups_in_flight", "OpenFoodFacts lookups running now.",
+              lambda: lookups_in_flight.in_flight())
+        gauge("inventory_jobs_pending", "Background jobs waiting or running.", lambda: jobs.pending())
+        gauge("inventory_upstream_circuit_open", "1 while the OpenFoodFacts circuit breaker is not closed.",
+              upstream_circuit_open)
+
+
+def upstream_circuit_open():
+    # a client that was never built has never failed (and building it here
+    # would import requests just to be scraped)
+    client = services().peek("off_client")
+    return int(client is not None and client.breaker.state != "closed")
+
+
+metrics = service_proxy("metrics")
+
+
+# (the store methods are timed too, see Services._build_store)
+@api.before_app_request
+def start_request_timer():
+    if setting_flag(setting("INVENTORY_METRICS")):
+        g.metrics_start = time.perf_counter()
+
+
+@api.after_app_request
+def record_request_metrics(response):
+    start = g.pop("metrics_start", None)
+    if start is not None:
+        route = route_name()
+        metrics.request_seconds.observe(time.perf_counter() - start, request.method, route)
+        metrics.request_count.inc(request.method, route, str(response.status_code))
+    return response
+
 
-# Helper function to call OpenFoodFacts by barcode
+def route_name():
+    # the route pattern ("/inventory/<int:item_id>"), not the URL, so
+    # every item id shares one time series / profile
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+
+# On-demand profiling (see profiling.py), off by default; the INVENTORY_PROFILE*
+# and INVENTORY_ADMIN_TOKEN settings are in CONFIG_DEFAULTS
+profiler = service_proxy("profiler")
+
+
+@api.before_app_request
+def start_request_profile():
+    # the admin endpoints are not profiled, so they do not show up in the reports
+    if profiler.enabled and not request.path.startswith("/admin/"):
+        g.profile = profiler.start()
+
+
+# teardown runs even when the route raised, so a profile is never left on
+@api.teardown_app_request
+def finish_request_profile(error=None):
+    profile = g.pop("profile", None)
+    if profile is not None:
+        profiler.finish(f"{request.method} {route_name()}", profile)
+
+
+# Response compression (see compression.py; INVENTORY_COMPRESS_MIN_SIZE and
+# INVENTORY_GZIP_LEVEL are in CONFIG_DEFAULTS)
+COMPRESSIBLE_TYPES = {"application/json", "application/x-ndjson", "text/plain"}
+# compressed bodies at least this big are kept for the next identical request
+COMPRESSED_CACHE_MIN_SIZE = 64 * 1024
+compressed_bodies = service_proxy("compressed_bodies")
+
+
+@api.after_app_request
+def compress_response(response):
+    if (
+        response.status_code not in (200, 201)
+        or response.mimetype not in COMPRESSIBLE_TYPES
+        or "Content-Encoding" in response.headers
+    ):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = request.accept_encodings.best_match(available_encodings())
+    if encoding is None:
+        return response
+
+    level = int(setting("INVENTORY_GZIP_LEVEL"))
+    if response.is_streamed:
+        # NDJSON: compress chunk by chunk while it is sent
+        response.response = compress_stream(response.iter_encoded(), encoding, level)
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < int(setting("INVENTORY_COMPRESS_MIN_SIZE")):
+            return response
+        etag, _ = response.get_etag()
+        # the same URL with the same ETag is the same body (the ETag
+        # alone is not enough: every page of a list shares it)
+        key = (request.full_path, etag, encoding)
+        compressed = compressed_bodies.get(key) if etag else None
+        if compressed is None:
+            compressed = compress(data, encoding, level)
+            if etag and len(data) >= COMPRESSED_CACHE_MIN_SIZE:
+                compressed_bodies.put(key, compressed)
+        response.set_data(compressed)
+
+    response.headers["Content-Encoding"] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        # the compressed bytes are a different representation; a weak
+        # ETag only promises the same content, so it stays as it is
+        response.set_etag(f"{etag}-{encoding}")
+    return response
+
+
+# Helper function to call OpenFoodFacts by barcode, with the cache in front
 
 def fetch_openfoodfacts_product(barcode):
     """
-    Call the OpenFoodFacts API using a barcode.
+    Look up a barcode in the offline dump, then the cache, then the API.
+    Same return value as lookup_openfoodfacts_product.
+    """
+    if resolve(dump_index) is not None:
+        product = dump_index.get(barcode)
+        if product is not None:
+            return product
+
+    found, product = lookup_cache.get(barcode)
+    if found:
+        return product
+
+    def lookup_and_cache():
+        start = time.perf_counter()
+        product = lookup_openfoodfacts_product(barcode)
+        result = "found" if product is not None else "not_found"
+        metrics.upstream_seconds.observe(time.perf_counter() - start, "openfoodfacts", result)
+        lookup_cache.put(barcode, product)
+        return product
+
+    return lookups_in_flight.do(barcode, lookup_and_cache)
+
+
+def lookup_openfoodfacts_product(barcode):
+    """
+    Call the OpenFoodFacts API using a barcode (no cache).
     If the product is found, return a simple dict with some fields.
     If not found or error, return None.
     """
-    # endpoint for product by barcode 
-    url = f"https://world.openfoodfacts.org/api/v0/product/{barcode}.json"
+    return off_client.fetch_product(barcode)
+
+
+# Basic test route 
+@api.route("/")
+def home():
+    # text to see that the app runs
+    return "Inventory API is running."
+
+
+# GET /metrics  -> request, upstream and store metrics for Prometheus
+@api.route("/metrics", methods=["GET"])
+def get_metrics():
+    return Response(metrics.registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# Admin endpoints for the profiler
+# Send the token as "Authorization: Bearer <INVENTORY_ADMIN_TOKEN>".
+def admin_denied():
+    """Return an error response unless the request has the admin token."""
+    token = setting("INVENTORY_ADMIN_TOKEN")
+    if not token:
+        return jsonify({"error": "Admin endpoints are disabled"}), 404
+    sent = request.headers.get("Authorization", "")
+    if not hmac.compare_digest(sent.encode(), f"Bearer {token}".encode()):
+        return jsonify({"error": "Admin token required"}), 401
+    return None
+
+
+def profiler_status():
+    return {
+        "enabled": profiler.enabled,
+        "sample_rate": profiler.sample_rate,
+        "tracemalloc": profiler.tracing_memory,
+        "routes": profiler.routes(),
+    }
+
+
+# GET /admin/profile     -> is profiling on, and profiled requests per route
+# POST /admin/profile    -> change it: {"enabled": true, "sample_rate": 0.1, "tracemalloc": false}
+# DELETE /admin/profile  -> forget the collected stats
+@api.route("/admin/profile", methods=["GET", "POST", "DELETE"])
+def admin_profile():
+    denied = admin_denied()
+    if denied is not None:
+        return denied
+
+    if request.method == "DELETE":
+        profiler.reset()
+    elif request.method == "POST":
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({"error": "Body must be a JSON object"}), 400
+        sample_rate = data.get("sample_rate", profiler.sample_rate)
+        if not isinstance(sample_rate, (int, float)) or isinstance(sample_rate, bool) or not 0 < sample_rate <= 1:
+            return jsonify({"error": "sample_rate must be a number between 0 and 1"}), 400
+        profiler.sample_rate = sample_rate
+        if "enabled" in data:
+            profiler.enabled = bool(data["enabled"])
+        if "tracemalloc" in data:
+            profiler.set_tracemalloc(bool(data["tracemalloc"]))
+    return jsonify(profiler_status()), 200
+
 
+# GET /admin/profile/report  -> text report  (?route=GET /inventory&sort=tottime&limit=30)
+# GET /admin/profile/stats   -> .pstats file (?route=...), open with pstats or snakeviz
+@api.route("/admin/profile/report", methods=["GET"])
+@api.route("/admin/profile/stats", methods=["GET"])
+def admin_profile_report():
+    denied = admin_denied()
+    if denied is not None:
+        return denied
+
+    route = request.args.get("route")
+    if request.path.endswith("/stats"):
+        data = profiler.dump(route)
+        if data is None:
+            return jsonify({"error": "No profiled requests yet"}), 404
+        name = "".join(char if char.isalnum() else "_" for char in route or "all").strip("_")
+        response = Response(data, mimetype="application/octet-stream")
+        response.headers["Content-Disposition"] = f'attachment; filename="profile-{name}.pstats"'
+        return response
+
+    sort = request.args.get("sort", "cumulative")
+    if sort not in SORT_KEYS:
+        return jsonify({"error": f"sort must be one of {', '.join(SORT_KEYS)}"}), 400
+    report = profiler.report(route, sort=sort, limit=request.args.get("limit", 30, type=int))
+    if report is None:
+        return jsonify({"error": "No profiled requests yet"}), 404
+    return Response(report, mimetype="text/plain")
+
+
+# GET /admin/profile/memory  -> lines holding the most memory (tracemalloc)
+@api.route("/admin/profile/memory", methods=["GET"])
+def admin_profile_memory():
+    denied = admin_denied()
+    if denied is not None:
+        return denied
+
+    report = profiler.memory_report(limit=request.args.get("limit", 20, type=int))
+    if report is None:
+        return jsonify({"error": "tracemalloc is off, turn it on with POST /admin/profile"}), 409
+    return Response(report, mimetype="text/plain")
+
+
+# GET /cache/stats  -> hit / miss / eviction counters of the lookup cache
+@api.route("/cache/stats", methods=["GET"])
+def get_cache_stats():
+    stats = lookup_cache.stats()
+    if resolve(dump_index) is not None:
+        stats["dump_index"] = dump_index.stats()
+    return jsonify(stats), 200
+
+# Page sizes for GET /inventory?limit=
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+# Helper functions for the opaque pagination cursor
+# The cursor is just the last id of the page, base64 encoded so clients
+# do not depend on what is inside it.
+def encode_cursor(last_id):
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return the id stored in a cursor, or None if it is not valid."""
     try:
-        # timeout=5 means: wait max 5 seconds for response
-        response = requests.get(url, timeout=5)
-    except requests.RequestException:
-        # Network error
+        last_id = int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+    if last_id < 0:
         return None
+    return last_id
+
+
+# Cursors of price / stock range pages hold the (value, id) key of the
+# last item (see range_index.py)
+def encode_range_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode()
+
 
-    if response.status_code != 200:
-        # Bad HTTP status
+def decode_range_cursor(cursor):
+    """Return the (value, id) key stored in a range cursor, or None if it is not valid."""
+    try:
+        value, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (ValueError, TypeError, binascii.Error, UnicodeDecodeError):
+        return None
+    if range_value(value) is None or not isinstance(last_id, int) or isinstance(last_id, bool):
         return None
+    return value, last_id
+
+
+# Helper to stream items as NDJSON (one JSON object per line)
+# Projected items (?fields=) are not in the response cache.
+def generate_ndjson(items, projected=False):
+    if projected and default_json_settings():
+        for item in items:
+            yield encode_fast(item) + b"\n"
+        return
+    if not projected and use_response_cache():
+        for item in items:
+            yield response_cache.fragment(item) + b"\n"
+        return
+
+    for item in items:
+        yield json.dumps(item, sort_keys=True, separators=(",", ":")) + "\n"
 
-    data = response.json()
 
-    # OpenFoodFacts uses "status" 1 when product is found
-    if data.get("status") != 1:
+def wants_ndjson():
+    if request.args.get("format") == "ndjson":
+        return True
+    best = request.accept_mimetypes.best_match(["application/json", "application/x-ndjson"])
+    return best == "application/x-ndjson"
+
+
+# Helper functions for ETags
+# A list ETag changes whenever anything in the store changes; an item
+# ETag changes when that item changes. The epoch is part of both so
+# versions from before a restart never match.
+def list_etag(version, mode):
+    return f"{inventory.epoch}-{version}-{mode}"
+
+
+def item_etag(version):
+    return f"{inventory.epoch}-{version}"
+
+
+def fields_tag(fields):
+    # each ?fields= list is a different representation, so it gets its own ETag
+    return "" if fields is None else "-" + ".".join(fields)
+
+
+def not_modified(etag):
+    """Return a 304 response if the client already has this version, else None."""
+    # compressed responses carry "<etag>-gzip" (see compress_response)
+    for candidate in (etag,) + tuple(f"{etag}-{encoding}" for encoding in available_encodings()):
+        if request.if_none_match.contains_weak(candidate):
+            response = Response(status=304)
+            response.set_etag(candidate)
+            return response
+    return None
+
+
+def with_etag(response, etag):
+    response.set_etag(etag)
+    return response
+
+
+def expected_versions_from_if_match():
+    """
+    Turn an If-Match header into the set of item versions it allows.
+    Return None when there is no header or it is "*".
+    """
+    if not request.if_match or request.if_match.star_tag:
         return None
 
-    product = data.get("product", {})
+    versions = set()
+    prefix = f"{inventory.epoch}-"
+    for tag in request.if_match.as_set():
+        # the ETag of a ?fields= or compressed response has more after
+        # the version ("<epoch>-<version>-gzip"); it is the same version
+        version = tag[len(prefix):].split("-", 1)[0]
+        if tag.startswith(prefix) and version.isdigit():
+            versions.add(int(version))
+    return versions
 
-    # only pick basic fields like the example
-    return {
-        "product_name": product.get("product_name"),
-        "brands": product.get("brands"),
-        "ingredients_text": product.get("ingredients_text"),
-    }
 
+def version_conflict(item_id):
+    response = jsonify({"error": "Item was changed by someone else"})
+    current = inventory.item_version(item_id)
+    if current is not None:
+        response.set_etag(item_etag(current))
+    return response, 412
 
-# Basic test route 
-@app.route("/")
-def home():
-    # text to see that the app runs
-    return "Inventory API is running."
 
 # GET /inventory  -> Fetch all items
-@app.route("/inventory", methods=["GET"])
+# Optional filters (can be combined):
+#   ?barcode=1234567890   exact barcode
+#   ?brand=Silk           one of the item's brands (case-insensitive)
+#   ?name_prefix=gran     start of product_name (case-insensitive)
+# Optional modes:
+#   ?limit=100&cursor=... one page: {"items": [...], "next_cursor": ...}
+#   Accept: application/x-ndjson (or ?format=ndjson) streams every item
+#   ?fields=id,product_name,price,stock  only these keys of each item
+#                         (id is always there; others are product keys)
+# Price and stock ranges (bounds are inclusive, see range_index.py):
+#   ?min_price=2&max_price=5  ?min_stock=&max_stock=
+#   ?sort=price (or stock, -price, -stock for highest first)
+#   with ?limit= the cursor holds how many results were already returned
+# Send If-None-Match with the last ETag to get 304 if nothing changed.
+@api.route("/inventory", methods=["GET"])
 def get_inventory():
-    # Return the whole inventory list as JSON
-    return jsonify(inventory), 200
+    barcode = request.args.get("barcode")
+    brand = request.args.get("brand")
+    name_prefix = request.args.get("name_prefix")
+    filtered = barcode is not None or brand is not None or name_prefix is not None
+
+    fields = None
+    if "fields" in request.args:
+        try:
+            fields = parse_fields(request.args["fields"])
+        except ValueError as error:
+            return jsonify({"error": str(error)}), 400
+
+    try:
+        ranges = parse_range_args()
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+
+    # read the version before the data, so the ETag is never newer than the body
+    version = inventory.version
+
+    if ranges:
+        filters = {"barcode": barcode, "brand": brand, "name_prefix": name_prefix} if filtered else None
+        return get_inventory_range(ranges, filters, fields, version)
+
+    if wants_ndjson():
+        etag = list_etag(version, "ndjson" + fields_tag(fields))
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+
+        if filtered:
+            items = inventory.find(barcode=barcode, brand=brand, name_prefix=name_prefix, fields=fields)
+        else:
+            # read the store page by page so memory stays flat
+            items = inventory.iter_pages(fields=fields)
+        response = Response(
+            stream_with_context(generate_ndjson(items, fields is not None)), mimetype="application/x-ndjson"
+        )
+        response.vary.add("Accept")
+        return with_etag(response, etag)
+
+    if "limit" in request.args or "cursor" in request.args:
+        limit = request.args.get("limit", DEFAULT_PAGE_SIZE, type=int)
+        if limit is None or limit < 1:
+            return jsonify({"error": "limit must be a positive integer"}), 400
+        limit = min(limit, MAX_PAGE_SIZE)
+
+        after_id = 0
+        if "cursor" in request.args:
+            after_id = decode_cursor(request.args["cursor"])
+            if after_id is None:
+                return jsonify({"error": "Invalid cursor"}), 400
+
+        etag = list_etag(version, "page" + fields_tag(fields))
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+
+        if filtered:
+            items = inventory.find(barcode=barcode, brand=brand, name_prefix=name_prefix, fields=fields)
+            items = [item for item in items if item["id"] > after_id][:limit + 1]
+        else:
+            # ask for one extra item to know if there is a next page
+            items = inventory.page(after_id, limit + 1, fields)
+
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = encode_cursor(items[-1]["id"])
+
+        if fields is None and use_response_cache():
+            response = cached_json_response(response_cache.page_body(items, next_cursor))
+        else:
+            response = json_response({"items": items, "next_cursor": next_cursor})
+        response.vary.add("Accept")
+        return with_etag(response, etag), 200
+
+    etag = list_etag(version, "json" + fields_tag(fields))
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    if not filtered:
+        # Return the whole inventory list as JSON
+        if use_response_cache():
+            if fields is None:
+                response = cached_json_response(response_cache.full_list_body())
+            else:
+                response = cached_json_response(response_cache.projected_list_body(fields))
+        else:
+            response = json_response(inventory.all(fields))
+    else:
+        # Use the store indexes instead of filtering the whole list
+        items = inventory.find(barcode=barcode, brand=brand, name_prefix=name_prefix, fields=fields)
+        if fields is None and use_response_cache():
+            response = cached_json_response(response_cache.list_body(items))
+        else:
+            response = json_response(items)
+    response.vary.add("Accept")
+    return with_etag(response, etag), 200
+
+
+RANGE_ARGS = ("min_price", "max_price", "min_stock", "max_stock")
+
+
+def parse_range_args():
+    """
+    Read ?min_price= ... ?max_stock= and ?sort= into keyword arguments
+    for range_query(). Return {} when none of them is given.
+    Raise ValueError (with a message for the client) for bad values.
+    """
+    ranges = {}
+    for name in RANGE_ARGS:
+        if name in request.args:
+            try:
+                value = float(request.args[name])
+            except ValueError:
+                value = math.nan
+            if not math.isfinite(value):
+                raise ValueError(f"{name} must be a number")
+            ranges[name] = value
+
+    if "sort" in request.args:
+        sort = request.args["sort"]
+        if sort not in SORT_ORDERS:
+            raise ValueError("sort must be one of " + ", ".join(SORT_ORDERS))
+        ranges["sort"] = sort
+    return ranges
+
+
+def get_inventory_range(ranges, filters, fields, version):
+    """GET /inventory with price / stock bounds or a sort order."""
+    paged = "limit" in request.args or "cursor" in request.args
+    limit = None
+    after = None
+    if paged:
+        limit = request.args.get("limit", DEFAULT_PAGE_SIZE, type=int)
+        if limit is None or limit < 1:
+            return jsonify({"error": "limit must be a positive integer"}), 400
+        limit = min(limit, MAX_PAGE_SIZE)
+        if "cursor" in request.args:
+            after = decode_range_cursor(request.args["cursor"])
+            if after is None:
+                return jsonify({"error": "Invalid cursor"}), 400
+
+    ndjson = wants_ndjson()
+    etag = list_etag(version, ("ndjson" if ndjson else "page" if paged else "json") + fields_tag(fields))
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    # ask for one extra item to know if there is a next page
+    wanted = None if limit is None else limit + 1
+    if filters is not None:
+        # the barcode / brand / name indexes usually leave only a few
+        # items, so those are filtered and sorted directly
+        matches = scan_range(inventory.find(**filters), **ranges, after=after)[:wanted]
+        keys = [range_key(item, **ranges) for item in matches]
+    else:
+        keys = range_index.range_keys(**ranges, limit=wanted, after=after)
+
+    next_cursor = None
+    if limit is not None and len(keys) > limit:
+        keys = keys[:limit]
+        next_cursor = encode_range_cursor(keys[-1])
+    items = inventory.get_many([item_id for _, item_id in keys], fields)
+
+    if ndjson:
+        response = Response(
+            stream_with_context(generate_ndjson(items, fields is not None)), mimetype="application/x-ndjson"
+        )
+    elif paged:
+        if fields is None and use_response_cache():
+            response = cached_json_response(response_cache.page_body(items, next_cursor))
+        else:
+            response = json_response({"items": items, "next_cursor": next_cursor})
+    elif fields is None and use_response_cache():
+        response = cached_json_response(response_cache.list_body(items))
+    else:
+        response = json_response(items)
+    response.vary.add("Accept")
+    return with_etag(response, etag), 200
+
+
+# GET /inventory/stats  -> total value, units and per-brand rollups
+#   ?recompute=true  add them up from every item instead of using the
+#                    running totals (to check them)
+@api.route("/inventory/stats", methods=["GET"])
+def get_inventory_stats():
+    recompute = request.args.get("recompute", "").lower() in ("1", "true", "yes")
+    version = inventory.version
+    etag = list_etag(version, "stats-full" if recompute else "stats")
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    if recompute:
+        stats = compute_stats(inventory.all())
+    else:
+        stats = inventory_stats.stats()
+    return with_etag(jsonify(stats), etag), 200
+
+
+# Page size for GET /inventory/search
+DEFAULT_SEARCH_PAGE_SIZE = 20
+
+
+# GET /inventory/search?q=almond  -> items matching every word, best first
+# Words match product_name, brands and ingredients_text, case-insensitive,
+# and also match longer words ("almond" finds "almonds").
+#   ?limit=20&cursor=...  one page: {"items": [...], "next_cursor": ...}
+@api.route("/inventory/search", methods=["GET"])
+def search_inventory():
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "q is required"}), 400
+
+    limit = request.args.get("limit", DEFAULT_SEARCH_PAGE_SIZE, type=int)
+    if limit is None or limit < 1:
+        return jsonify({"error": "limit must be a positive integer"}), 400
+    limit = min(limit, MAX_PAGE_SIZE)
 
+    # here the cursor holds how many results were already returned
+    offset = 0
+    if "cursor" in request.args:
+        offset = decode_cursor(request.args["cursor"])
+        if offset is None:
+            return jsonify({"error": "Invalid cursor"}), 400
+
+    version = inventory.version
+    etag = list_etag(version, "search")
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    # ask for one extra item to know if there is a next page
+    items = search_index.search(query, limit + 1, offset)
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(offset + limit)
+
+    if use_response_cache():
+        response = cached_json_response(response_cache.page_body(items, next_cursor))
+    else:
+        response = jsonify({"items": items, "next_cursor": next_cursor})
+    return with_etag(response, etag), 200
+
+
+# Default for GET /inventory/low-stock?threshold=
+DEFAULT_LOW_STOCK_THRESHOLD = 5
+
+
+# GET /inventory/low-stock  -> items with stock <= threshold, lowest first
+#   ?threshold=5  ?limit=100
+@api.route("/inventory/low-stock", methods=["GET"])
+def get_low_stock():
+    try:
+        threshold = float(request.args.get("threshold", DEFAULT_LOW_STOCK_THRESHOLD))
+    except ValueError:
+        threshold = math.nan
+    if not math.isfinite(threshold):
+        return jsonify({"error": "threshold must be a number"}), 400
+    limit = request.args.get("limit", DEFAULT_PAGE_SIZE, type=int)
+    if limit is None or limit < 1:
+        return jsonify({"error": "limit must be a positive integer"}), 400
+    limit = min(limit, MAX_PAGE_SIZE)
+
+    version = inventory.version
+    etag = list_etag(version, "low-stock")
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    items = inventory_stats.low_stock(threshold, limit)
+    return with_etag(jsonify({"threshold": threshold, "items": items}), etag), 200
+
+
+# Limits for GET /inventory/changes
+#   MAX_CHANGES_WAIT   longest long poll, in seconds
+#   SSE_HEARTBEAT      seconds between keep-alive comments on a quiet stream
+# (how long one stream stays open is INVENTORY_SSE_SECONDS in CONFIG_DEFAULTS)
+MAX_CHANGES_WAIT = 30
+SSE_HEARTBEAT = 15
+
+
+def parse_change_position(value):
+    """
+    Parse "<seq>" or "<epoch>-<seq>" (the SSE event id).
+    Return (epoch or None, seq), or None if it is not valid.
+    """
+    epoch, _, seq = value.rpartition("-")
+    try:
+        seq = int(seq)
+    except ValueError:
+        return None
+    if seq < 0:
+        return None
+    return epoch or None, seq
+
+
+def resync_required(last_seq):
+    return jsonify({
+        "error": "Changes are no longer available, fetch GET /inventory again",
+        "resync": True,
+        "epoch": change_feed.epoch,
+        "last_seq": last_seq,
+    }), 410
+
+
+def wants_event_stream():
+    if request.args.get("format") == "sse":
+        return True
+    best = request.accept_mimetypes.best_match(["application/json", "text/event-stream"])
+    return best == "text/event-stream"
+
+
+def sse_message(event, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append("data: " + json.dumps(data, sort_keys=True, separators=(",", ":")))
+    return "\n".join(lines) + "\n\n"
+
+
+def generate_change_stream(since):
+    # runs after the view returned, so it must not use `request`
+    deadline = time.monotonic() + float(setting("INVENTORY_SSE_SECONDS"))
+    yield f"retry: {SSE_HEARTBEAT * 1000}\n\n"
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        try:
+            events, since = change_feed.changes(since, MAX_PAGE_SIZE, min(SSE_HEARTBEAT, remaining))
+        except ResyncRequired as error:
+            yield sse_message("resync", {"epoch": change_feed.epoch, "last_seq": error.last_seq})
+            return
+        if not events:
+            # a comment line, keeps proxies from closing a quiet connection
+            yield ": keep-alive\n\n"
+        for event in events:
+            yield sse_message("change", event, f"{change_feed.epoch}-{event['seq']}")
+
+
+# GET /inventory/changes  -> what changed since the client last asked
+#   no since              {"epoch", "last_seq", "changes": []}: where to start
+#   ?since=41             the changes after 41, oldest first (?limit=1000)
+#   ?since=41&wait=25     long poll: wait up to 25 s when nothing changed yet
+#   ?epoch=...            410 if the server restarted since that epoch
+#   Accept: text/event-stream (or ?format=sse)  Server-Sent Events stream,
+#                         resumes from the Last-Event-ID header
+# 410 Gone {"resync": true, "last_seq": N} means the changes the client
+# needs are gone: fetch GET /inventory again, then follow from N.
+@api.route("/inventory/changes", methods=["GET"])
+def get_inventory_changes():
+    position = request.headers.get("Last-Event-ID") or request.args.get("since")
+    epoch = request.args.get("epoch")
+    since = None
+    if position is not None:
+        parsed = parse_change_position(position)
+        if parsed is None:
+            return jsonify({"error": "since must be a change number"}), 400
+        epoch = parsed[0] or epoch
+        since = parsed[1]
+    if epoch is not None and epoch != change_feed.epoch:
+        return resync_required(change_feed.last_seq)
+
+    if wants_event_stream():
+        if since is None:
+            since = change_feed.last_seq
+        response = Response(stream_with_context(generate_change_stream(since)), mimetype="text/event-stream")
+        response.headers["Cache-Control"] = "no-cache"
+        # tell nginx not to buffer the stream
+        response.headers["X-Accel-Buffering"] = "no"
+        return response
+
+    if since is None:
+        return jsonify({"epoch": change_feed.epoch, "last_seq": change_feed.last_seq, "changes": []}), 200
+
+    limit = request.args.get("limit", MAX_PAGE_SIZE, type=int)
+    if limit is None or limit < 1:
+        return jsonify({"error": "limit must be a positive integer"}), 400
+    limit = min(limit, MAX_PAGE_SIZE)
+    try:
+        wait = float(request.args.get("wait", 0))
+    except ValueError:
+        wait = math.nan
+    if not 0 <= wait <= MAX_CHANGES_WAIT:
+        return jsonify({"error": f"wait must be between 0 and {MAX_CHANGES_WAIT} seconds"}), 400
+
+    try:
+        events, last_seq = change_feed.changes(since, limit, wait)
+    except ResyncRequired as error:
+        return resync_required(error.last_seq)
+    return jsonify({"epoch": change_feed.epoch, "last_seq": last_seq, "changes": events}), 200
 
 
 # GET /inventory/<id>  -> Fetch one item by id
-@app.route("/inventory/<int:item_id>", methods=["GET"])
+#   ?fields=product_name,price  only these keys (like GET /inventory)
+@api.route("/inventory/<int:item_id>", methods=["GET"])
 def get_inventory_item(item_id):
+    fields = None
+    if "fields" in request.args:
+        try:
+            fields = parse_fields(request.args["fields"])
+        except ValueError as error:
+            return jsonify({"error": str(error)}), 400
+
+    # read the version first, so the ETag is never newer than the body
+    version = inventory.item_version(item_id)
+    etag = item_etag(version) + fields_tag(fields)
+    if version is not None:
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+
+    if fields is not None:
+        item = inventory.get(item_id, fields)
+        if item is None:
+            return jsonify({"error": "Item not found"}), 404
+        return with_etag(json_response(item), etag), 200
+
     # find the item by id
     item = find_item_by_id(item_id)
     if item is None:
@@ -106,11 +1275,27 @@ def get_inventory_item(item_id):
         return jsonify({"error": "Item not found"}), 404
 
     # If found, return the item
-    return jsonify(item), 200
+    if use_response_cache():
+        response = cached_json_response(response_cache.item_body(item))
+    else:
+        response = jsonify(item)
+    return with_etag(response, etag), 200
+
+
+# Helper to build a product dict from the data sent by the client
+def build_product(data):
+    return {
+        "product_name": data.get("product_name", "Unknown Product"),
+        "brands": data.get("brands", "Unknown Brand"),
+        "ingredients_text": data.get("ingredients_text", ""),
+        "price": data.get("price", 0.0),
+        "stock": data.get("stock", 0),
+        "barcode": data.get("barcode", "")
+    }
 
 
 # POST /inventory  -> Add a new item 
-@app.route("/inventory", methods=["POST"])
+@api.route("/inventory", methods=["POST"])
 def add_inventory_item():
     # Get JSON data sent by the client
     data = request.get_json()
@@ -119,35 +1304,19 @@ def add_inventory_item():
     if not data:
         return jsonify({"error": "No data provided"}), 400
 
-    # Create a new id (max existing id + 1 or 1 if list is empty)
-    if inventory:
-        new_id = max(item["id"] for item in inventory) + 1
-    else:
-        new_id = 1
+    # Build the product with a structure similar to OpenFoodFacts
+    product = build_product(data)
 
-    # Build the new item with a structure similar to OpenFoodFacts
-    new_item = {
-        "id": new_id,
-        "status": 1,  # pretend it is "found"
-        "product": {
-            "product_name": data.get("product_name", "Unknown Product"),
-            "brands": data.get("brands", "Unknown Brand"),
-            "ingredients_text": data.get("ingredients_text", ""),
-            "price": data.get("price", 0.0),
-            "stock": data.get("stock", 0),
-            "barcode": data.get("barcode", "")
-        }
-    }
-
-    # Add to "database" (list)
-    inventory.append(new_item)
+    # Add to "database" (the store gives the item a new id)
+    new_item = inventory.add(product, status=1)  # pretend it is "found"
+    version = inventory.item_version(new_item["id"])
 
     # Return the new item with status code 201 
-    return jsonify(new_item), 201
+    return with_etag(jsonify(new_item), item_etag(version)), 201
 
 
 # PATCH /inventory/<id>  -> Update part of an item
-@app.route("/inventory/<int:item_id>", methods=["PATCH"])
+@api.route("/inventory/<int:item_id>", methods=["PATCH"])
 def update_inventory_item(item_id):
     item = find_item_by_id(item_id)
     if item is None:
@@ -157,74 +1326,329 @@ def update_inventory_item(item_id):
     if not data:
         return jsonify({"error": "No data provided"}), 400
 
-    #only update fields inside "product"
-    product = item["product"]
-
-    # Loop through the keys sent in the request and update if they exist
-    for key, value in data.items():
-        # Example: if data = {"price": 4.50}, set product["price"] = 4.50
-        product[key] = value
+    # only update fields inside "product"
+    # Example: if data = {"price": 4.50}, set product["price"] = 4.50
+    # With If-Match, only update if the item is still at that version
+    try:
+        item = inventory.update(item_id, data, expected_versions=expected_versions_from_if_match())
+    except VersionConflictError:
+        return version_conflict(item_id)
+    if item is None:
+        return jsonify({"error": "Item not found"}), 404
 
     # Return the updated item
+    response = jsonify(item)
+    version = inventory.item_version(item_id)
+    if version is not None:
+        response.set_etag(item_etag(version))
+    return response, 200
+
+
+# POST /inventory/<id>/adjust  -> Atomically add a delta to stock
+# Body: {"delta": -2, "fail_if_negative": true}
+# Use this instead of reading stock and PATCHing a new value, which can
+# lose updates when two clients do it at the same time.
+@api.route("/inventory/<int:item_id>/adjust", methods=["POST"])
+def adjust_inventory_stock(item_id):
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({"error": "No data provided"}), 400
+    if not isinstance(data, dict):
+        return jsonify({"error": "Body must be a JSON object"}), 400
+
+    delta = data.get("delta")
+    if not isinstance(delta, int) or isinstance(delta, bool):
+        return jsonify({"error": "delta must be an integer"}), 400
+
+    fail_if_negative = data.get("fail_if_negative", False)
+    if not isinstance(fail_if_negative, bool):
+        return jsonify({"error": "fail_if_negative must be true or false"}), 400
+
+    try:
+        item = inventory.adjust_stock(item_id, delta, fail_if_negative=fail_if_negative)
+    except InsufficientStockError as error:
+        return jsonify({"error": "Not enough stock", "stock": error.stock}), 409
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 409
+
+    if item is None:
+        return jsonify({"error": "Item not found"}), 404
     return jsonify(item), 200
 
 
+# Helper to check one bulk operation and turn it into the form the store expects
+# Return (operation, None) or (None, error message)
+def parse_bulk_operation(raw):
+    if not isinstance(raw, dict):
+        return None, "Operation must be an object"
+
+    op = raw.get("op")
+    if op == "create":
+        data = raw.get("product")
+        if not isinstance(data, dict) or not data:
+            return None, "create needs a non-empty product"
+        return {"op": "create", "product": build_product(data)}, None
+
+    if op not in ("patch", "delete"):
+        return None, "op must be create, patch or delete"
+
+    item_id = raw.get("id")
+    if not isinstance(item_id, int) or isinstance(item_id, bool):
+        return None, f"{op} needs an integer id"
+
+    if op == "delete":
+        return {"op": "delete", "id": item_id}, None
+
+    fields = raw.get("fields")
+    if not isinstance(fields, dict) or not fields:
+        return None, "patch needs non-empty fields"
+    return {"op": "patch", "id": item_id, "fields": fields}, None
+
+
+# POST /inventory/bulk  -> Apply many create / patch / delete operations
+# Body: {"operations": [{"op": "create", "product": {...}},
+#                       {"op": "patch", "id": 3, "fields": {"price": 2.5}},
+#                       {"op": "delete", "id": 4}],
+#        "atomic": false}
+# Every operation is validated first; then they are applied in one pass.
+# With "atomic": true nothing is applied if any operation would fail.
+@api.route("/inventory/bulk", methods=["POST"])
+def bulk_inventory_operations():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get("operations"), list) or not data["operations"]:
+        return jsonify({"error": "Provide a non-empty list of operations"}), 400
+
+    max_operations = int(setting("INVENTORY_BULK_MAX"))
+    if len(data["operations"]) > max_operations:
+        return jsonify({"error": f"At most {max_operations} operations per request"}), 400
+
+    operations = []
+    invalid = []
+    for index, raw in enumerate(data["operations"]):
+        operation, error = parse_bulk_operation(raw)
+        if error:
+            invalid.append({"index": index, "error": error})
+        operations.append(operation)
+
+    if invalid:
+        # nothing is applied when the request itself is malformed
+        return jsonify({"error": "Invalid operations", "invalid": invalid}), 400
+
+    atomic = data.get("atomic", False)
+    if not isinstance(atomic, bool):
+        return jsonify({"error": "atomic must be true or false"}), 400
+
+    ok, results = inventory.apply_batch(operations, atomic=atomic)
+
+    applied = sum(1 for result in results if result["status"] == "ok")
+    body = {"results": results, "applied": applied, "failed": len(results) - applied}
+    if atomic and not ok:
+        # the whole batch was rolled back
+        return jsonify(body), 409
+    return jsonify(body), 200
+
+
 # DELETE /inventory/<id>  -> Remove an item
-@app.route("/inventory/<int:item_id>", methods=["DELETE"])
+@api.route("/inventory/<int:item_id>", methods=["DELETE"])
 def delete_inventory_item(item_id):
-    item = find_item_by_id(item_id)
+    # Remove the item from the store (no second scan needed)
+    # With If-Match, only delete if the item is still at that version
+    try:
+        item = inventory.delete(item_id, expected_versions=expected_versions_from_if_match())
+    except VersionConflictError:
+        return version_conflict(item_id)
     if item is None:
         return jsonify({"error": "Item not found"}), 404
 
-    # Remove the item from the list
-    inventory.remove(item)
-
     # Return a message
     return jsonify({"message": "Item deleted"}), 200
 
 
+# Helper to build our product dict from the external API data
+def build_product_from_api(barcode, api_product):
+    return {
+        # use values from API; if something missing, use default string
+        "product_name": api_product.get("product_name") or "Unknown Product",
+        "brands": api_product.get("brands") or "Unknown Brand",
+        "ingredients_text": api_product.get("ingredients_text") or "",
+        # price and stock are still our own fields 
+        "price": 0.0,
+        "stock": 0,
+        "barcode": barcode
+    }
+
+
+def wants_async_fetch():
+    if "async" in request.args:
+        return request.args["async"].lower() in ("1", "true", "yes")
+    # RFC 7240 "Prefer: respond-async"
+    if "respond-async" in request.headers.get("Prefer", ""):
+        return True
+    return setting_flag(setting("OFF_FETCH_ASYNC"))
+
+
+def enrich_item(item_id, barcode, placeholder_version):
+    """Background job: look the barcode up and fill in the placeholder item."""
+    api_product = fetch_openfoodfacts_product(barcode)
+
+    if api_product is None:
+        # like the sync route, a product that is not found leaves no item
+        # behind, unless someone changed the placeholder in the meantime
+        try:
+            inventory.delete(item_id, expected_versions={placeholder_version})
+        except VersionConflictError:
+            pass
+        raise JobError("Product not found in external API")
+
+    product = build_product_from_api(barcode, api_product)
+    fields = {field: product[field] for field in ("product_name", "brands", "ingredients_text")}
+    item = inventory.update(item_id, fields)
+    if item is None:
+        raise JobError(f"Item {item_id} was deleted before the lookup finished")
+    return {"item": item}
+
+
+def start_barcode_job(barcode):
+    # placeholder with our defaults, filled in by enrich_item()
+    placeholder = inventory.add(build_product_from_api(barcode, {}), status=1)
+    version = inventory.item_version(placeholder["id"])
+    try:
+        enrich = with_app_context(enrich_item)
+        job = jobs.submit(
+            lambda: enrich(placeholder["id"], barcode, version),
+            {"type": "barcode_lookup", "barcode": barcode, "item_id": placeholder["id"]},
+        )
+    except QueueFull:
+        inventory.delete(placeholder["id"])
+        response = jsonify({"error": "Too many lookups in progress, try again later"})
+        response.headers["Retry-After"] = "5"
+        return response, 503
+
+    response = jsonify({"job": job, "item": placeholder})
+    response.headers["Location"] = f"/jobs/{job['id']}"
+    return response, 202
+
+
 # POST /inventory/fetch/<barcode>
 # Use OpenFoodFacts to create a new item in our inventory
+#
+# Async mode (?async=true, "Prefer: respond-async" or OFF_FETCH_ASYNC=1):
+# the item is created right away with placeholder text and the lookup
+# runs in the background, so a slow OpenFoodFacts does not hold this
+# request thread. The answer is 202 {"job": {...}, "item": {...}}; follow
+# the job with GET /jobs/<id>. Barcodes already in the offline dump or
+# the lookup cache are answered at once with 201, like the sync mode.
 
-@app.route("/inventory/fetch/<barcode>", methods=["POST"])
+@api.route("/inventory/fetch/<barcode>", methods=["POST"])
 def add_item_from_barcode(barcode):
 
-    # Call the external API
-    api_product = fetch_openfoodfacts_product(barcode)
+    if wants_async_fetch():
+        # answers we already have locally do not need a job
+        api_product = dump_index.get(barcode) if resolve(dump_index) is not None else None
+        if api_product is None:
+            found, api_product = lookup_cache.get(barcode)
+            if not found:
+                return start_barcode_job(barcode)
+    else:
+        # Call the external API
+        api_product = fetch_openfoodfacts_product(barcode)
 
     if api_product is None:
         # If external API did not find anything or there was an error
         return jsonify({"error": "Product not found in external API"}), 404
 
-    # Create a new id for local inventory
-    if inventory:
-        new_id = max(item["id"] for item in inventory) + 1
-    else:
-        new_id = 1
-
-    # Build a new item using the external API data
-    new_item = {
-        "id": new_id,
-        "status": 1,  # product found
-        "product": {
-            # use values from API; if something missing, use default string
-            "product_name": api_product.get("product_name") or "Unknown Product",
-            "brands": api_product.get("brands") or "Unknown Brand",
-            "ingredients_text": api_product.get("ingredients_text") or "",
-            # price and stock are still our own fields 
-            "price": 0.0,
-            "stock": 0,
-            "barcode": barcode
-        }
-    }
+    # Build a new product using the external API data
+    product = build_product_from_api(barcode, api_product)
 
-    # Save new item into fake "database"
-    inventory.append(new_item)
+    # Save new item into fake "database" (the store creates the id)
+    new_item = inventory.add(product, status=1)  # product found
 
     # Return the newly created item
     return jsonify(new_item), 201
 
 
+# POST /inventory/fetch/batch
+# Body: {"barcodes": ["123", "456", ...], "concurrency": 4 (optional)}
+# Looks the barcodes up in parallel (each unique barcode only once),
+# then adds every found product and reports a result for each barcode.
+
+@api.route("/inventory/fetch/batch", methods=["POST"])
+def add_items_from_barcodes():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get("barcodes"), list) or not data["barcodes"]:
+        return jsonify({"error": "Provide a non-empty list of barcodes"}), 400
+
+    barcodes = data["barcodes"]
+    if not all(isinstance(barcode, str) and barcode for barcode in barcodes):
+        return jsonify({"error": "Every barcode must be a non-empty string"}), 400
+    max_size = int(setting("OFF_BATCH_MAX_SIZE"))
+    if len(barcodes) > max_size:
+        return jsonify({"error": f"At most {max_size} barcodes per batch"}), 400
+
+    max_concurrency = int(setting("OFF_BATCH_CONCURRENCY"))
+    concurrency = data.get("concurrency", max_concurrency)
+    if not isinstance(concurrency, int) or isinstance(concurrency, bool) or concurrency < 1:
+        return jsonify({"error": "concurrency must be a positive integer"}), 400
+    concurrency = min(concurrency, max_concurrency)
+
+    # dict.fromkeys drops duplicates and keeps the original order
+    unique_barcodes = list(dict.fromkeys(barcodes))
+
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(unique_barcodes))) as pool:
+        lookup = with_app_context(fetch_openfoodfacts_product)
+        api_products = dict(zip(unique_barcodes, pool.map(lookup, unique_barcodes)))
+
+    # add every found product in one batch (one lock / transaction), in
+    # the order they were sent
+    found = [barcode for barcode in unique_barcodes if api_products[barcode] is not None]
+    operations = [
+        {"op": "create", "product": build_product_from_api(barcode, api_products[barcode]), "status": 1}
+        for barcode in found
+    ]
+    created = {}
+    if operations:
+        _, batch_results = inventory.apply_batch(operations)
+        created = {barcode: result["id"] for barcode, result in zip(found, batch_results)}
+
+    results = []
+    reported = set()
+    for barcode in barcodes:
+        if barcode in reported:
+            status = "duplicate"
+        elif barcode in created:
+            status = "created"
+        else:
+            status = "not_found"
+        reported.add(barcode)
+
+        result = {"barcode": barcode, "status": status}
+        if barcode in created:
+            result["id"] = created[barcode]
+        results.append(result)
+
+    return jsonify({
+        "results": results,
+        "created": len(created),
+        "not_found": len(unique_barcodes) - len(created),
+    }), 200
+
+
+# GET /jobs/<id>  -> status of a background job
+# "status" is queued, running, succeeded or failed; "result" and "error"
+# are set when it finished.
+@api.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job), 200
+
+
+# The default app, used by `flask --app app run`, the tests and the
+# benchmarks (building it is cheap, see create_app)
+app = create_app()
+
+
 # Run the app
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,80 @@
+"""
+Measure how much memory the in-memory store uses per item.
+
+Compares the old layout (one nested dict item per SKU) with the compact
+ItemRecord objects, using tracemalloc. The "store" row also counts the
+id, barcode, brand and name indexes, so it is the real cost of one item.
+
+Run from the project folder:
+    python benchmarks/bench_memory.py --sizes 100000 1000000
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from store import InventoryStore, ItemRecord  # noqa: E402
+
+
+def make_product(i):
+    return {
+        "product_name": f"Product {i}",
+        "brands": f"Brand {i % 100}",
+        "ingredients_text": "Filtered water, almonds, cane sugar",
+        "price": round(1 + (i % 500) / 100, 2),
+        "stock": i % 50,
+        "barcode": f"{i:013d}",
+    }
+
+
+def build_dicts(size):
+    # the old layout: id -> {"id", "status", "product": {...}}
+    items = {}
+    for i in range(1, size + 1):
+        items[i] = {"id": i, "status": 1, "product": make_product(i)}
+    return items
+
+
+def build_records(size):
+    items = {}
+    for i in range(1, size + 1):
+        items[i] = ItemRecord(i, 1, make_product(i))
+    return items
+
+
+def build_store(size):
+    store = InventoryStore()
+    for i in range(size):
+        store.add(make_product(i))
+    return store
+
+
+def measure(build, size):
+    gc.collect()
+    tracemalloc.start()
+    result = build(size)
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return used
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'items':>9} {'layout':<12} {'MB':>9} {'bytes/item':>11}")
+    for size in args.sizes:
+        for name, build in (("dicts", build_dicts), ("records", build_records), ("store", build_store)):
+            used = measure(build, size)
+            print(f"{size:>9} {name:<12} {used / 1e6:>9.1f} {used / size:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Measure the cost of the request metrics (metrics.py).
+
+1. Micro: nanoseconds per Counter.inc, Histogram.observe and per call of
+   a store method wrapped by instrument().
+2. Requests: time per request through the Flask test client with the
+   metrics on and off (INVENTORY_METRICS=1 / 0), each in its own process.
+   The two are run in turns --rounds times and the best time is kept,
+   so noise from other programs does not count as overhead.
+
+Run from the project folder:
+    python benchmarks/bench_metrics.py --requests 20000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import timeit
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from metrics import Registry, instrument  # noqa: E402
+from store import InventoryStore  # noqa: E402
+
+
+def nanoseconds(statement, number=200_000):
+    return min(timeit.repeat(statement, number=number, repeat=5)) / number * 1e9
+
+
+def micro():
+    registry = Registry()
+    counter = registry.counter("c", "C.", ("method", "route", "status"))
+    histogram = registry.histogram("h", "H.", ("method", "route"))
+
+    store = InventoryStore()
+    store.add({"product_name": "Milk"})
+    timed_store = InventoryStore()
+    timed_store.add({"product_name": "Milk"})
+    instrument(timed_store, ["get"], registry.histogram("s", "S.", ("operation",)))
+
+    print(f"{'operation':<28} {'ns':>8}")
+    print(f"{'Counter.inc':<28} {nanoseconds(lambda: counter.inc('GET', '/inventory', '200')):>8.0f}")
+    print(f"{'Histogram.observe':<28} {nanoseconds(lambda: histogram.observe(0.003, 'GET', '/inventory')):>8.0f}")
+    plain = nanoseconds(lambda: store.get(1))
+    timed = nanoseconds(lambda: timed_store.get(1))
+    print(f"{'store.get':<28} {plain:>8.0f}")
+    print(f"{'store.get (instrumented)':<28} {timed:>8.0f}")
+
+
+ROUTES = {
+    "GET /inventory/<id>": ("GET", "/inventory/1", None),
+    "GET /inventory?limit=100": ("GET", "/inventory?limit=100", None),
+    "PATCH /inventory/<id>": ("PATCH", "/inventory/1", {"price": 2.5}),
+}
+
+
+def child(requests):
+    import app as app_module
+
+    # some items so the list route has work to do
+    for i in range(200):
+        app_module.inventory.add({"product_name": f"Item {i}", "price": 1.0, "stock": 1})
+    client = app_module.app.test_client()
+
+    results = {}
+    for name, (method, path, body) in ROUTES.items():
+        for _ in range(200):
+            client.open(path, method=method, json=body)
+        start = time.perf_counter()
+        for _ in range(requests):
+            client.open(path, method=method, json=body)
+        results[name] = (time.perf_counter() - start) / requests * 1e6
+    print(json.dumps(results))
+
+
+def run_child(enabled, requests):
+    env = dict(os.environ, INVENTORY_METRICS="1" if enabled else "0", INVENTORY_BACKEND="memory")
+    env.pop("INVENTORY_DATA_DIR", None)
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", "--requests", str(requests)],
+        env=env, cwd=PROJECT_DIR, stdout=subprocess.PIPE, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=10_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.requests)
+        return
+
+    micro()
+
+    off = {}
+    on = {}
+    for _ in range(args.rounds):
+        for enabled, best in ((False, off), (True, on)):
+            for name, value in run_child(enabled, args.requests).items():
+                best[name] = min(value, best.get(name, value))
+    print(f"\n{'route':<26} {'off us':>8} {'on us':>8} {'overhead':>9}")
+    for name in ROUTES:
+        overhead = on[name] - off[name]
+        print(f"{name:<26} {off[name]:>8.1f} {on[name]:>8.1f} {overhead / off[name]:>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Compare OpenFoodFacts lookup latency with and without connection reuse.
+
+Both runs talk to the local stub server (off_stub.py):
+- "per call": a bare requests.get for every lookup (old behaviour)
+- "session":  OpenFoodFactsClient with its shared keep-alive session
+
+Run from the project folder:
+    python benchmarks/bench_off_client.py --lookups 2000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from off_client import OpenFoodFactsClient  # noqa: E402
+from off_stub import StubServer  # noqa: E402
+
+
+def measure(lookup, lookups):
+    latencies = []
+    for i in range(lookups):
+        start = time.perf_counter()
+        lookup(str(i % 100))
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(name, latencies, connections):
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1e6
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1e6
+    print(f"{name:<10} p50 {p50:8.0f} us   p99 {p99:8.0f} us   connections {connections}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lookups", type=int, default=1000)
+    args = parser.parse_args()
+
+    products = {str(i): {"product_name": f"Product {i}"} for i in range(100)}
+
+    with StubServer(products=products) as stub:
+        def per_call(barcode):
+            requests.get(f"{stub.url}/api/v0/product/{barcode}.json", timeout=5).json()
+
+        latencies = measure(per_call, args.lookups)
+        report("per call", latencies, stub.connections)
+
+    with StubServer(products=products) as stub:
+        client = OpenFoodFactsClient(base_url=stub.url)
+        latencies = measure(client.fetch_product, args.lookups)
+        report("session", latencies, stub.connections)
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Measure building and reading the offline OpenFoodFacts index (off_dump.py).
+
+Writes a made-up gzip JSONL dump with --products products (with the
+extra fields a real export has, so lines are a realistic size), then
+prints:
+- the ingest rate (products and MB of dump per second) and the peak
+  memory of the process (max RSS), which stays flat as the dump grows
+- the index file size
+- p50 / p99 latency of lookups for barcodes that are in the dump and
+  barcodes that are not
+
+Run from the project folder:
+    python benchmarks/bench_off_dump.py --products 100000 1000000
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from off_dump import DumpIndex, build_index  # noqa: E402
+
+
+def barcode(i):
+    # spread out like real EAN-13 codes, in random order in the file
+    return f"{(i * 7_919_993) % 10**13:013d}"
+
+
+def write_dump(path, products, seed=1):
+    rng = random.Random(seed)
+    order = list(range(products))
+    rng.shuffle(order)
+    with gzip.open(path, "wt", encoding="utf-8", compresslevel=1) as file:
+        for i in order:
+            file.write(json.dumps({
+                "code": barcode(i),
+                "product_name": f"Product {i}",
+                "brands": f"Brand {i % 1000}",
+                "ingredients_text": "Filtered water, almonds, cane sugar, sea salt, natural flavors",
+                "categories_tags": ["en:plant-based-foods", "en:beverages", "en:milks"],
+                "nutriments": {"energy_100g": 120, "sugars_100g": 4.1, "salt_100g": 0.2},
+                "countries_tags": ["en:france", "en:united-states"],
+            }) + "\n")
+
+
+def lookup_latencies(index, codes):
+    latencies = []
+    for code in codes:
+        start = time.perf_counter()
+        index.get(code)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return statistics.median(latencies) * 1e6, latencies[int(len(latencies) * 0.99) - 1] * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, nargs="+", default=[100_000])
+    parser.add_argument("--lookups", type=int, default=20_000)
+    parser.add_argument("--run-size", type=int, default=100_000)
+    args = parser.parse_args()
+
+    print(f"{'products':>9} {'dump MB':>8} {'ingest/s':>9} {'MB/s':>6} {'max RSS MB':>10} {'index MB':>9} "
+          f"{'hit p50 us':>10} {'hit p99 us':>10} {'miss p50 us':>11}")
+    for products in args.products:
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, "dump.jsonl.gz")
+            output = os.path.join(directory, "off.idx")
+            write_dump(source, products)
+            dump_mb = os.path.getsize(source) / 1e6
+
+            start = time.perf_counter()
+            build_index(source, output, run_size=args.run_size)
+            seconds = time.perf_counter() - start
+            # ru_maxrss is in KB on Linux
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+            index = DumpIndex(output)
+            rng = random.Random(2)
+            hits = [barcode(rng.randrange(products)) for _ in range(args.lookups)]
+            misses = [f"{rng.randrange(10**13):013d}" for _ in range(args.lookups)]
+            hit_p50, hit_p99 = lookup_latencies(index, hits)
+            miss_p50, _ = lookup_latencies(index, misses)
+            index_mb = os.path.getsize(output) / 1e6
+            index.close()
+
+        print(f"{products:>9} {dump_mb:>8.1f} {products / seconds:>9.0f} {dump_mb / seconds:>6.1f} "
+              f"{peak:>10.1f} {index_mb:>9.1f} {hit_p50:>10.1f} {hit_p99:>10.1f} {miss_p50:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
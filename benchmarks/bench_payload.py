@@ -0,0 +1,125 @@
+"""
+Measure bytes on the wire and end-to-end latency of GET /inventory with
+and without ?fields= projection and gzip / brotli compression.
+
+The app runs on a local threaded server, seeded with --items made-up
+items that have realistic, long ingredients_text. Each variant is
+fetched --repeat times with requests; the time includes reading,
+decompressing and parsing the body, like a real client. With --mutate
+an item is changed before every request, so no cached body can be
+reused (the worst case).
+
+Run from the project folder:
+    python benchmarks/bench_payload.py --items 100000
+    python benchmarks/bench_payload.py --items 100000 --mutate
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module  # noqa: E402
+from compression import available_encodings  # noqa: E402
+
+
+INGREDIENTS = (
+    "Filtered water, almonds (2%), cane sugar, calcium carbonate, sea salt, potassium citrate, "
+    "sunflower lecithin, gellan gum, vitamin A palmitate, vitamin D2, natural flavor, vitamin E"
+)
+LIST_FIELDS = "id,product_name,price,stock"
+
+
+def seed(items):
+    for i in range(items):
+        app_module.inventory.add({
+            "product_name": f"Almond Milk {i}",
+            "brands": f"Brand{i % 200}",
+            "ingredients_text": INGREDIENTS,
+            "price": round(1 + (i % 500) / 100, 2),
+            "stock": i % 50,
+            "barcode": f"{i:013d}",
+        })
+
+
+def variants(args):
+    encodings = ("identity",) + available_encodings()
+    for query in ("", f"?fields={LIST_FIELDS}"):
+        for encoding in encodings:
+            yield f"/inventory{query}", encoding
+    if args.ndjson:
+        for encoding in ("identity", "gzip"):
+            yield f"/inventory?format=ndjson&fields={LIST_FIELDS}", encoding
+
+
+def fetch(session, url, encoding):
+    """Return (bytes on the wire, seconds until the body is parsed)."""
+    start = time.perf_counter()
+    response = session.get(url, headers={"Accept-Encoding": encoding}, stream=True)
+    # count what came over the socket, before decompression
+    wire = 0
+    chunks = []
+    for chunk in response.raw.stream(65536, decode_content=False):
+        wire += len(chunk)
+        chunks.append(chunk)
+    body = b"".join(chunks)
+    content_encoding = response.headers.get("Content-Encoding")
+    if content_encoding == "gzip":
+        body = gzip.decompress(body)
+    elif content_encoding == "br":
+        import brotli
+        body = brotli.decompress(body)
+    if "ndjson" in url:
+        [json.loads(line) for line in body.splitlines()]
+    else:
+        json.loads(body)
+    return wire, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--mutate", action="store_true", help="change an item before every request")
+    parser.add_argument("--ndjson", action="store_true", help="also measure the NDJSON stream")
+    args = parser.parse_args()
+
+    seed(args.items)
+    from werkzeug.serving import make_server
+
+    # no access log line per request
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    server = make_server("127.0.0.1", 0, app_module.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    session = requests.Session()
+
+    print(f"{args.items} items, mutate={args.mutate}, gzip level {app_module.app.config['INVENTORY_GZIP_LEVEL']}")
+    print(f"{'route':<60} {'encoding':<9} {'wire KB':>9} {'p50 ms':>8} {'min ms':>8}")
+    for path, encoding in variants(args):
+        sizes = []
+        timings = []
+        for _ in range(args.repeat):
+            if args.mutate:
+                app_module.inventory.adjust_stock(1, 1)
+            wire, seconds = fetch(session, base_url + path, encoding)
+            sizes.append(wire)
+            timings.append(seconds * 1000)
+        print(f"{path:<60} {encoding:<9} {statistics.median(sizes) / 1024:>9.0f} "
+              f"{statistics.median(timings):>8.1f} {min(timings):>8.1f}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Measure price / stock range queries (range_index.py) against the
+scan-and-sort baseline (range_index.scan_range over store.all()).
+
+For each store size it prints the index build time, the cost of a price
+update with and without the index listening, and the median / p95
+latency of a few typical queries (first page of 100 results):
+- a narrow price band, cheapest first
+- low stock, sorted by stock
+- most expensive items
+- a price band sorted by stock (the stock bound is checked per item)
+
+Run from the project folder:
+    python benchmarks/bench_range.py --sizes 100000 1000000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from range_index import RangeIndex, scan_range  # noqa: E402
+from store import InventoryStore  # noqa: E402
+
+
+QUERIES = {
+    "price 2-5": {"min_price": 2, "max_price": 5, "sort": "price"},
+    "stock < 20": {"max_stock": 19, "sort": "stock"},
+    "top price": {"sort": "-price"},
+    "price by stock": {"min_price": 2, "max_price": 2.5, "sort": "-stock"},
+}
+
+
+def make_store(size, seed=1):
+    rng = random.Random(seed)
+    store = InventoryStore()
+    for i in range(size):
+        store.add({
+            "product_name": f"Product {i}",
+            "price": round(rng.uniform(0.5, 50), 2),
+            "stock": rng.randrange(500),
+        })
+    return store
+
+
+def latencies(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[max(int(len(timings) * 0.95) - 1, 0)]
+
+
+def update_cost(store, size, repeat=20_000):
+    # microseconds per price update
+    rng = random.Random(3)
+    ids = [rng.randrange(1, size + 1) for _ in range(repeat)]
+    start = time.perf_counter()
+    for item_id in ids:
+        store.update(item_id, {"price": round(rng.uniform(0.5, 50), 2)})
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{'items':>9} {'query':<16} {'index p50 ms':>12} {'index p95 ms':>12} {'scan p50 ms':>11} {'speed-up':>8}")
+    for size in args.sizes:
+        store = make_store(size)
+        plain_update = update_cost(store, size)
+        start = time.perf_counter()
+        index = RangeIndex(store)
+        build = (time.perf_counter() - start) * 1000
+        indexed_update = update_cost(store, size)
+        print(f"{size:>9} {'(build)':<16} {build:>12.0f}")
+        print(f"{size:>9} {'(update us)':<16} {indexed_update:>12.1f} {'':>12} {plain_update:>11.1f}")
+
+        for name, query in QUERIES.items():
+            index_p50, index_p95 = latencies(lambda: index.range_query(**query, limit=args.limit), args.repeat)
+            # the baseline is what a client (or a route without the
+            # index) would do: every item, filtered and sorted
+            scan_p50, _ = latencies(lambda: scan_range(store.all(), **query)[:args.limit], max(args.repeat // 4, 3))
+            print(f"{size:>9} {name:<16} {index_p50:>12.2f} {index_p95:>12.2f} {scan_p50:>11.0f} "
+                  f"{scan_p50 / index_p50:>7.0f}x")
+
+        del index, store
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Measure restart time of the journaled memory store.
+
+Compares replaying the whole history from the log with loading a
+snapshot and replaying only the log tail written after it.
+
+Run from the project folder (the full size run needs a few GB of disk):
+    python benchmarks/bench_recovery.py --items 1000000 --mutations 10000000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from journal import Journal, encode  # noqa: E402
+from store import InventoryStore  # noqa: E402
+
+
+def write_history(folder, items, mutations):
+    """Write a log with `items` adds followed by `mutations` price/stock updates."""
+    with open(os.path.join(folder, "wal-0.log"), "w", encoding="utf-8") as log:
+        for i in range(1, items + 1):
+            product = {"product_name": f"Product {i}", "brands": f"Brand {i % 100}",
+                       "price": 1.0, "stock": 10, "barcode": f"{i:013d}"}
+            log.write(encode(["a", {"id": i, "status": 1, "product": product}]))
+        for _ in range(mutations):
+            item_id = random.randint(1, items)
+            log.write(encode(["u", item_id, {"stock": random.randint(0, 99)}]))
+
+
+def timed_recover(folder):
+    store = InventoryStore()
+    journal = Journal(folder, fsync="never")
+    start = time.perf_counter()
+    journal.recover(store)
+    return time.perf_counter() - start, store, journal
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--mutations", type=int, default=1_000_000)
+    parser.add_argument("--tail", type=int, default=10_000, help="log records written after the snapshot")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        write_history(folder, args.items, args.mutations)
+        size = os.path.getsize(os.path.join(folder, "wal-0.log"))
+        print(f"log: {args.items + args.mutations:,} records, {size / 1e6:,.0f} MB")
+
+        seconds, store, journal = timed_recover(folder)
+        print(f"full log replay:        {seconds:8.2f} s")
+
+        # take a snapshot, then write a short tail after it
+        journal.attach(store)
+        journal.snapshot()
+        for _ in range(args.tail):
+            store.update(random.randint(1, args.items), {"price": 2.0})
+        journal.close()
+
+        seconds, _, _ = timed_recover(folder)
+        print(f"snapshot + {args.tail:,} tail: {seconds:8.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,450 @@
+"""
+Load test the API routes and save the results as JSON.
+
+For each store size the store is seeded with made-up items, then every
+route in ROUTES (list pages, filters, ?fields=, price ranges, gzip, get,
+search pages, stats, change feed, metrics, create, patch, adjust, bulk,
+delete, barcode fetch, async fetch...) gets the same list of requests:
+- test-client: through Flask's test client, one request at a time
+- server:      through a real local server, with several clients at once
+
+Each run happens in a fresh child process, so one run never sees the
+changes of another. Barcode lookups go to a local stand-in for the
+OpenFoodFacts API (off_stub.py). The same --seed gives the same requests.
+
+Not covered: GET /jobs/<id> (the job ids come from earlier responses),
+the Server-Sent Events streams and the /admin routes.
+
+Prints throughput and p50/p95/p99 latency per route and writes them to
+a JSON file. With --compare, a previous results file is used as the
+baseline and the script exits with status 1 if a route got slower.
+
+Run from the project folder:
+    python benchmarks/bench_routes.py --items 1000 100000
+    python benchmarks/bench_routes.py --items 1000000 --modes server --concurrency 16
+    python benchmarks/bench_routes.py --compare bench_results/routes-old.json
+"""
+
+import argparse
+import base64
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from off_stub import StubServer  # noqa: E402
+
+
+BRANDS = 200
+WORDS = ["almond", "oat", "honey", "rice", "cocoa", "peanut", "vanilla", "coconut", "berry", "granola"]
+
+# Barcodes the stub knows; "fetch" and "fetch_batch" use different ones
+# so every lookup misses the lookup cache, like new products would
+FETCH_BARCODE = 2_000_000_000_000
+BATCH_BARCODE = 3_000_000_000_000
+ASYNC_BARCODE = 4_000_000_000_000
+BATCH_SIZE = 10
+
+
+def make_product(i):
+    return {
+        "product_name": f"{WORDS[i % len(WORDS)].title()} Product {i}",
+        "brands": f"Brand{i % BRANDS}",
+        "ingredients_text": f"water, {WORDS[(i * 7) % len(WORDS)]}, sugar",
+        "price": round(1 + (i % 500) / 100, 2),
+        "stock": i % 50,
+        "barcode": f"{i:013d}",
+    }
+
+
+def cursor_for(item_id):
+    # same as app.encode_cursor
+    return base64.urlsafe_b64encode(str(item_id).encode()).decode()
+
+
+# Every route: name -> function(rng, ids, count) that returns the
+# requests to send as (method, path, json body) or (method, path, json
+# body, headers). Requests without headers ask for an uncompressed answer.
+def _random_ids(rng, ids, count):
+    return [rng.choice(ids) for _ in range(count)]
+
+
+ROUTES = {
+    "home": lambda rng, ids, count: [("GET", "/", None)] * count,
+    "list_page": lambda rng, ids, count: [
+        ("GET", f"/inventory?limit=100&cursor={cursor_for(item_id)}", None)
+        for item_id in _random_ids(rng, ids, count)
+    ],
+    "list_full": lambda rng, ids, count: [("GET", "/inventory", None)] * count,
+    "list_filter": lambda rng, ids, count: [
+        ("GET", f"/inventory?brand=Brand{rng.randrange(BRANDS)}&limit=100", None) for _ in range(count)
+    ],
+    "list_fields": lambda rng, ids, count: [
+        ("GET", f"/inventory?limit=100&fields=product_name,price&cursor={cursor_for(item_id)}", None)
+        for item_id in _random_ids(rng, ids, count)
+    ],
+    "list_range": lambda rng, ids, count: [
+        ("GET", f"/inventory?min_price={low}&max_price={low + 0.5}&sort=-stock&limit=100", None)
+        for low in (round(rng.uniform(1, 5), 2) for _ in range(count))
+    ],
+    "list_gzip": lambda rng, ids, count: [
+        ("GET", f"/inventory?limit=1000&cursor={cursor_for(item_id)}", None, {"Accept-Encoding": "gzip"})
+        for item_id in _random_ids(rng, ids, count)
+    ],
+    "get": lambda rng, ids, count: [
+        ("GET", f"/inventory/{item_id}", None) for item_id in _random_ids(rng, ids, count)
+    ],
+    "search": lambda rng, ids, count: [
+        ("GET", f"/inventory/search?q={rng.choice(WORDS)}", None) for _ in range(count)
+    ],
+    # the search cursor is the number of results already returned
+    "search_page": lambda rng, ids, count: [
+        ("GET", f"/inventory/search?q={rng.choice(WORDS)}&cursor={cursor_for(rng.randrange(1, 200))}", None)
+        for _ in range(count)
+    ],
+    "stats": lambda rng, ids, count: [("GET", "/inventory/stats", None)] * count,
+    "low_stock": lambda rng, ids, count: [("GET", "/inventory/low-stock?threshold=2", None)] * count,
+    "cache_stats": lambda rng, ids, count: [("GET", "/cache/stats", None)] * count,
+    # seeding made one change per item, so the feed holds len(ids)
+    # changes; ask for up to the last 100 (before any route writes)
+    "changes": lambda rng, ids, count: [
+        ("GET", f"/inventory/changes?since={max(0, len(ids) - rng.randrange(1, 100))}", None)
+        for _ in range(count)
+    ],
+    "metrics": lambda rng, ids, count: [("GET", "/metrics", None)] * count,
+    "create": lambda rng, ids, count: [
+        ("POST", "/inventory", make_product(rng.randrange(10**6))) for _ in range(count)
+    ],
+    "patch": lambda rng, ids, count: [
+        ("PATCH", f"/inventory/{item_id}", {"price": round(rng.uniform(1, 10), 2)})
+        for item_id in _random_ids(rng, ids, count)
+    ],
+    "adjust": lambda rng, ids, count: [
+        ("POST", f"/inventory/{item_id}/adjust", {"delta": 1}) for item_id in _random_ids(rng, ids, count)
+    ],
+    "bulk": lambda rng, ids, count: [
+        ("POST", "/inventory/bulk", {"operations": [
+            {"op": "patch", "id": item_id, "fields": {"stock": rng.randrange(100)}}
+            for item_id in _random_ids(rng, ids, BATCH_SIZE)
+        ]})
+        for _ in range(count)
+    ],
+    "fetch": lambda rng, ids, count: [
+        ("POST", f"/inventory/fetch/{FETCH_BARCODE + k}", None) for k in range(count)
+    ],
+    "fetch_batch": lambda rng, ids, count: [
+        ("POST", "/inventory/fetch/batch", {"barcodes": [
+            str(BATCH_BARCODE + k * BATCH_SIZE + j) for j in range(BATCH_SIZE)
+        ]})
+        for k in range(count)
+    ],
+    # answers 202 and runs the lookup as a background job
+    "fetch_async": lambda rng, ids, count: [
+        ("POST", f"/inventory/fetch/{ASYNC_BARCODE + k}?async=true", None) for k in range(count)
+    ],
+    # last, so no other route asks for a deleted item
+    "delete": lambda rng, ids, count: [
+        ("DELETE", f"/inventory/{item_id}", None) for item_id in rng.sample(ids, min(count, len(ids)))
+    ],
+}
+
+
+def build_requests(route, args, first_id, last_id):
+    """The requests for one route: the same for every mode with the same seed."""
+    rng = random.Random(f"{args.seed}-{route}")
+    ids = range(first_id, last_id + 1)
+    return ROUTES[route](rng, ids, args.warmup + args.requests)
+
+
+def selected_routes(args, items):
+    routes = args.routes or list(ROUTES)
+    if items > args.full_list_max:
+        # the whole list is too big to fetch hundreds of times
+        routes = [route for route in routes if route != "list_full"]
+    return routes
+
+
+# Child process: seed the store, then run the test client or serve
+
+def seed_store(store, items):
+    """Add `items` products in batches and return (first id, last id)."""
+    first_id = last_id = None
+    for start in range(0, items, 1000):
+        operations = [
+            {"op": "create", "product": make_product(i)} for i in range(start, min(start + 1000, items))
+        ]
+        ok, results = store.apply_batch(operations)
+        if first_id is None:
+            first_id = results[0]["id"]
+        last_id = results[-1]["id"]
+    return first_id, last_id
+
+
+def child(args):
+    import app as app_module
+
+    first_id, last_id = seed_store(app_module.inventory, args.items)
+
+    if args.child == "serve":
+        import logging
+
+        from werkzeug.serving import make_server
+
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        server = make_server("127.0.0.1", 0, app_module.app, threaded=True)
+        print(json.dumps({"port": server.server_port, "first_id": first_id, "last_id": last_id}), flush=True)
+        server.serve_forever()
+        return
+
+    client = app_module.app.test_client()
+
+    def send(method, path, body, headers=None):
+        return client.open(path, method=method, json=body, headers=headers).status_code
+
+    results = []
+    for route in selected_routes(args, args.items):
+        results.append(run_route(route, build_requests(route, args, first_id, last_id), args, [send], 1))
+    print(json.dumps({"results": results}), flush=True)
+
+
+# Running the requests and measuring them
+
+def percentile(sorted_values, percent):
+    # nearest-rank percentile
+    index = max(0, math.ceil(percent / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def run_route(route, specs, args, senders, concurrency):
+    """Send the requests of one route and return its result dict."""
+    warmup, timed = specs[:args.warmup], specs[args.warmup:]
+    for spec in warmup:
+        senders[0](*spec)
+
+    latencies = [[] for _ in range(concurrency)]
+    errors = [0] * concurrency
+
+    def worker(number):
+        send = senders[number]
+        # each client sends every `concurrency`-th request
+        for spec in timed[number::concurrency]:
+            start = time.perf_counter()
+            status = send(*spec)
+            latencies[number].append(time.perf_counter() - start)
+            if status >= 400:
+                errors[number] += 1
+
+    start = time.perf_counter()
+    if concurrency == 1:
+        worker(0)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(worker, range(concurrency)))
+    seconds = time.perf_counter() - start
+
+    values = sorted(value * 1000 for worker_latencies in latencies for value in worker_latencies)
+    return {
+        "route": route,
+        "method": timed[0][0],
+        "requests": len(values),
+        "concurrency": concurrency,
+        "errors": sum(errors),
+        "seconds": round(seconds, 4),
+        "throughput_rps": round(len(values) / seconds, 1),
+        "mean_ms": round(sum(values) / len(values), 3),
+        "p50_ms": round(percentile(values, 50), 3),
+        "p95_ms": round(percentile(values, 95), 3),
+        "p99_ms": round(percentile(values, 99), 3),
+        "max_ms": round(values[-1], 3),
+    }
+
+
+def child_command(args, mode, items):
+    command = [
+        sys.executable, os.path.abspath(__file__), "--child", mode, "--items", str(items),
+        "--requests", str(args.requests), "--warmup", str(args.warmup), "--seed", str(args.seed),
+        "--full-list-max", str(args.full_list_max),
+    ]
+    if args.routes:
+        command += ["--routes", *args.routes]
+    return command
+
+
+def child_env(args, stub, data_dir):
+    env = dict(os.environ)
+    env["OFF_BASE_URL"] = stub.url
+    env["INVENTORY_BACKEND"] = args.backend
+    env["INVENTORY_DB"] = os.path.join(data_dir, "inventory.db")
+    env.pop("INVENTORY_DATA_DIR", None)
+    return env
+
+
+def run_test_client(args, stub, items):
+    with tempfile.TemporaryDirectory() as data_dir:
+        output = subprocess.run(
+            child_command(args, "test-client", items), env=child_env(args, stub, data_dir),
+            cwd=PROJECT_DIR, stdout=subprocess.PIPE, check=True, text=True,
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])["results"]
+
+
+def run_server(args, stub, items):
+    with tempfile.TemporaryDirectory() as data_dir:
+        process = subprocess.Popen(
+            child_command(args, "serve", items), env=child_env(args, stub, data_dir),
+            cwd=PROJECT_DIR, stdout=subprocess.PIPE, text=True,
+        )
+        try:
+            ready = json.loads(process.stdout.readline())
+            base_url = f"http://127.0.0.1:{ready['port']}"
+
+            # one keep-alive session per client thread; like the test
+            # client, only ask for gzip where the route says so
+            sessions = [requests.Session() for _ in range(args.concurrency)]
+            for session in sessions:
+                session.headers["Accept-Encoding"] = "identity"
+            senders = [
+                (lambda method, path, body, headers=None, session=session:
+                    session.request(method, base_url + path, json=body, headers=headers, timeout=60).status_code)
+                for session in sessions
+            ]
+
+            results = []
+            for route in selected_routes(args, items):
+                specs = build_requests(route, args, ready["first_id"], ready["last_id"])
+                results.append(run_route(route, specs, args, senders, args.concurrency))
+            for session in sessions:
+                session.close()
+            return results
+        finally:
+            process.terminate()
+            process.wait()
+
+
+# Comparing with a previous run
+
+def result_key(result):
+    return (result["backend"], result["mode"], result["items"], result["route"], result["concurrency"])
+
+
+def compare(results, baseline_path, tolerance):
+    """Print the routes that got slower than the baseline; return how many."""
+    with open(baseline_path, encoding="utf-8") as file:
+        baseline = {result_key(result): result for result in json.load(file)["results"]}
+
+    regressions = 0
+    print(f"\nCompared with {baseline_path} (tolerance {tolerance:.0%}):")
+    for result in results:
+        old = baseline.get(result_key(result))
+        if old is None:
+            continue
+        slower = result["p95_ms"] > old["p95_ms"] * (1 + tolerance)
+        fewer = result["throughput_rps"] < old["throughput_rps"] * (1 - tolerance)
+        if slower or fewer:
+            regressions += 1
+            print(
+                f"  REGRESSION {result['mode']:<11} {result['items']:>8} {result['route']:<12}"
+                f" p95 {old['p95_ms']:.2f} -> {result['p95_ms']:.2f} ms,"
+                f" {old['throughput_rps']:.0f} -> {result['throughput_rps']:.0f} req/s"
+            )
+    if not regressions:
+        print("  no regressions")
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_DIR,
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, nargs="+", default=[1_000, 100_000])
+    parser.add_argument("--modes", nargs="+", choices=["test-client", "server"], default=["test-client", "server"])
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--routes", nargs="+", choices=list(ROUTES))
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per route")
+    parser.add_argument("--warmup", type=int, default=20, help="untimed requests per route")
+    parser.add_argument("--concurrency", type=int, default=8, help="client threads in server mode")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--full-list-max", type=int, default=10_000,
+                        help="skip GET /inventory without a limit above this many items")
+    parser.add_argument("--output", help="results file (default: bench_results/routes-<time>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown, 0.2 = 20%%")
+    parser.add_argument("--child", choices=["test-client", "serve"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        args.items = args.items[0]
+        child(args)
+        return
+
+    # products for every barcode the fetch routes will ask for
+    count = args.warmup + args.requests
+    products = {str(FETCH_BARCODE + k): make_product(k) for k in range(count)}
+    products.update({str(BATCH_BARCODE + k): make_product(k) for k in range(count * BATCH_SIZE)})
+    products.update({str(ASYNC_BARCODE + k): make_product(k) for k in range(count)})
+
+    results = []
+    print(f"{'mode':<11} {'items':>8} {'route':<12} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>6}")
+    with StubServer(products=products) as stub:
+        for items in args.items:
+            for mode in args.modes:
+                started = time.perf_counter()
+                if mode == "test-client":
+                    mode_results = run_test_client(args, stub, items)
+                else:
+                    mode_results = run_server(args, stub, items)
+                for result in mode_results:
+                    result.update(backend=args.backend, mode=mode, items=items)
+                    results.append(result)
+                    print(
+                        f"{mode:<11} {items:>8} {result['route']:<12} {result['throughput_rps']:>9.0f}"
+                        f" {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f}"
+                        f" {result['errors']:>6}"
+                    )
+                print(f"({mode} with {items} items took {time.perf_counter() - started:.0f} s)")
+
+    output = args.output
+    if output is None:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        output = os.path.join("bench_results", f"routes-{stamp}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump({
+            "meta": {
+                "created": datetime.now(timezone.utc).isoformat(),
+                "commit": git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "args": {key: value for key, value in vars(args).items() if key != "child"},
+            },
+            "results": results,
+        }, file, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare and compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Measure full-text search latency (search.py) at different store sizes.
+
+The products are made up from word lists, so common words ("sugar")
+match many items and rare ones match few, like a real catalog. For each
+size it prints the build time and the median / p95 latency of a few
+kinds of queries for the first page (20 results).
+
+Run from the project folder:
+    python benchmarks/bench_search.py --sizes 100000 1000000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search import SearchIndex  # noqa: E402
+from store import InventoryStore  # noqa: E402
+
+
+FOODS = [
+    "almond", "oat", "soy", "rice", "coconut", "cashew", "granola", "muesli", "cracker", "cookie",
+    "bread", "bagel", "pasta", "noodle", "soup", "sauce", "salsa", "hummus", "yogurt", "cheese",
+    "butter", "milk", "cream", "juice", "tea", "coffee", "cocoa", "chocolate", "honey", "jam",
+    "peanut", "hazelnut", "walnut", "pecan", "raisin", "apple", "banana", "berry", "cherry", "mango",
+]
+KINDS = ["organic", "original", "classic", "light", "crunchy", "creamy", "spicy", "sweet", "salted", "vanilla"]
+INGREDIENTS = [
+    "water", "sugar", "salt", "oats", "almonds", "honey", "cane sugar", "sunflower oil", "palm oil",
+    "rice flour", "wheat flour", "cocoa butter", "milk powder", "soy lecithin", "natural flavors",
+    "citric acid", "sea salt", "brown rice syrup", "vanilla extract", "peanuts", "hazelnuts",
+    "dried cherries", "coconut oil", "baking soda", "yeast", "vinegar", "garlic", "onion", "pepper",
+    "tomatoes", "basil", "oregano", "cinnamon", "ginger", "turmeric", "molasses", "raisins", "dates",
+]
+
+QUERIES = {
+    "rare word": ["brand417", "brand088", "brand009"],
+    "common word": ["sugar", "water", "salt"],
+    "two words": ["almond milk", "honey oats", "chocolate cookie"],
+    "prefix": ["choc", "haz", "cinn"],
+}
+
+
+def make_store(size, seed=1):
+    rng = random.Random(seed)
+    store = InventoryStore()
+    for i in range(size):
+        store.add({
+            "product_name": f"{rng.choice(KINDS)} {rng.choice(FOODS)} {rng.choice(FOODS)}",
+            "brands": f"Brand{rng.randrange(1000):03d}",
+            "ingredients_text": ", ".join(rng.sample(INGREDIENTS, rng.randint(3, 8))),
+            "price": 1.0,
+            "stock": 1,
+        })
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'items':>9} {'query':<12} {'p50 ms':>8} {'p95 ms':>8}")
+    for size in args.sizes:
+        store = make_store(size)
+        start = time.perf_counter()
+        index = SearchIndex(store)
+        print(f"{size:>9} {'(build)':<12} {(time.perf_counter() - start) * 1000:>8.0f}")
+
+        for name, queries in QUERIES.items():
+            timings = []
+            for i in range(args.repeat):
+                query = queries[i % len(queries)]
+                start = time.perf_counter()
+                index.search(query, limit=20)
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            print(f"{size:>9} {name:<12} {statistics.median(timings):>8.2f} {p95:>8.2f}")
+
+        del index, store
+
+
+if __name__ == "__main__":
+    main()
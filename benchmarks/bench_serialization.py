@@ -0,0 +1,82 @@
+"""
+Compare GET /inventory body building with and without the response cache.
+
+For each size it measures wall time and CPU time per request for:
+- jsonify:         jsonify(store.all()) on every request (old behaviour)
+- cache, no write: the cached full list body
+- cache, 1 write:  one item changed before each request, so one fragment
+                   is re-encoded and the body is joined from fragments
+
+Run from the project folder:
+    python benchmarks/bench_serialization.py --sizes 10000 100000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from flask import Flask, jsonify
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from serializer import ResponseCache, orjson  # noqa: E402
+from store import InventoryStore  # noqa: E402
+
+
+def make_store(size):
+    store = InventoryStore()
+    for i in range(size):
+        store.add({
+            "product_name": f"Product {i}",
+            "brands": f"Brand {i % 100}",
+            "ingredients_text": "Filtered water, almonds, cane sugar",
+            "price": round(1 + (i % 500) / 100, 2),
+            "stock": i % 50,
+            "barcode": f"{i:013d}",
+        })
+    return store
+
+
+def measure(function, repeat):
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    for i in range(repeat):
+        function(i)
+    return (time.perf_counter() - wall) / repeat, (time.process_time() - cpu) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    print(f"orjson installed: {orjson is not None}")
+    print(f"{'items':>8} {'mode':<16} {'wall ms':>9} {'cpu ms':>9}")
+
+    for size in args.sizes:
+        store = make_store(size)
+        cache = ResponseCache(store)
+        cache.full_list_body()  # warm up the fragments
+
+        with app.app_context():
+            def baseline(i):
+                jsonify(store.all()).get_data()
+
+            def cached(i):
+                cache.full_list_body()
+
+            def cached_after_write(i):
+                store.update(1 + i % size, {"stock": i})
+                cache.full_list_body()
+
+            for name, function in (("jsonify", baseline), ("cache, no write", cached),
+                                   ("cache, 1 write", cached_after_write)):
+                wall, cpu = measure(function, args.repeat)
+                print(f"{size:>8} {name:<16} {wall * 1e3:9.2f} {cpu * 1e3:9.2f}")
+
+
+if __name__ == "__main__":
+    main()
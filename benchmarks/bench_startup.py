@@ -0,0 +1,140 @@
+"""
+Measure how fast a fresh process can serve its first requests.
+
+Each cold start is a new Python process that imports app.py, creates an
+app with create_app() and sends requests through the test client. The
+timings are:
+- import      `import app` (Flask, the blueprint and the default app)
+- create_app  a second app (nothing is built until it is used)
+- first GET   GET /inventory, which builds the store and its indexes
+- next GET    the same request again
+- first fetch POST /inventory/fetch/<barcode> against the local stub,
+              which imports requests and builds the OpenFoodFacts client
+- process     the whole process, as seen from outside
+
+It prints the median of --runs cold starts, and the modules that take
+longest to import (from `python -X importtime -c "import app"`). It exits
+with status 1 when the median import or first GET goes over its budget,
+so it can run in CI.
+
+Run from the project folder:
+    python benchmarks/bench_startup.py --runs 10
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from off_stub import StubServer  # noqa: E402
+
+
+# Runs in the child process; prints the timings (ms) as JSON
+CHILD = """
+import json, time
+start = time.perf_counter()
+import app
+timings = {"import": time.perf_counter() - start}
+
+start = time.perf_counter()
+test_app = app.create_app()
+timings["create_app"] = time.perf_counter() - start
+client = test_app.test_client()
+
+start = time.perf_counter()
+assert client.get("/inventory").status_code == 200
+timings["first GET"] = time.perf_counter() - start
+
+start = time.perf_counter()
+assert client.get("/inventory").status_code == 200
+timings["next GET"] = time.perf_counter() - start
+
+start = time.perf_counter()
+assert client.post("/inventory/fetch/3017620422003").status_code == 201
+timings["first fetch"] = time.perf_counter() - start
+print(json.dumps({name: seconds * 1000 for name, seconds in timings.items()}))
+"""
+
+STEPS = ("import", "create_app", "first GET", "next GET", "first fetch", "process")
+
+
+def cold_start(env):
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    timings = json.loads(result.stdout)
+    timings["process"] = (time.perf_counter() - start) * 1000
+    return timings
+
+
+def slowest_imports(env, count):
+    """Return [(cumulative ms, module)] of the top-level imports of app.py, slowest first."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"], cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    # a module is listed after everything it imported, indented two
+    # spaces deeper; app's own imports are the depth 1 lines before "app"
+    modules = []
+    for line in result.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            modules.append((int(parts[1]) / 1000, name.strip()))
+        elif depth == 0:
+            if name.strip() == "app":
+                modules.append((int(parts[1]) / 1000, "app (total)"))
+                return sorted(modules, reverse=True)[:count]
+            modules = []
+    return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to show")
+    parser.add_argument("--import-budget", type=float, default=500, help="ms for the median import")
+    parser.add_argument("--first-request-budget", type=float, default=100, help="ms for the median first GET")
+    args = parser.parse_args()
+
+    products = {"3017620422003": {"product_name": "Nutella", "brands": "Ferrero", "ingredients_text": "Sugar"}}
+    with StubServer(products=products) as stub:
+        # a fresh memory store, whatever the caller's environment says
+        env = dict(os.environ, OFF_BASE_URL=stub.url, INVENTORY_BACKEND="memory")
+        env.pop("INVENTORY_DATA_DIR", None)
+        runs = [cold_start(env) for _ in range(args.runs)]
+
+    print(f"{'step':<12} {'p50 ms':>8} {'min ms':>8} {'max ms':>8}")
+    medians = {}
+    for step in STEPS:
+        values = [run[step] for run in runs]
+        medians[step] = statistics.median(values)
+        print(f"{step:<12} {medians[step]:>8.1f} {min(values):>8.1f} {max(values):>8.1f}")
+
+    print("\nslowest imports of app.py (cumulative ms):")
+    for milliseconds, module in slowest_imports(env, args.top):
+        print(f"  {milliseconds:>7.1f}  {module}")
+
+    over = []
+    if medians["import"] > args.import_budget:
+        over.append(f"import {medians['import']:.0f} ms > {args.import_budget:.0f} ms")
+    if medians["first GET"] > args.first_request_budget:
+        over.append(f"first GET {medians['first GET']:.0f} ms > {args.first_request_budget:.0f} ms")
+    if over:
+        print("\nOVER BUDGET: " + "; ".join(over))
+        sys.exit(1)
+    print("\nwithin budget")
+
+
+if __name__ == "__main__":
+    main()
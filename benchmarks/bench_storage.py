@@ -0,0 +1,91 @@
+"""
+Compare read and write throughput of the memory and SQLite stores.
+
+Run from the project folder:
+    python benchmarks/bench_storage.py --items 100000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+# make the project modules importable when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlite_store import SQLiteInventoryStore  # noqa: E402
+from store import InventoryStore  # noqa: E402
+
+
+def make_product(i):
+    return {
+        "product_name": f"Product {i}",
+        "brands": f"Brand {i % 100}",
+        "ingredients_text": "Water, sugar",
+        "price": round(1 + (i % 500) / 100, 2),
+        "stock": i % 50,
+        "barcode": f"{i:013d}",
+    }
+
+
+def ops_per_second(count, seconds):
+    return count / seconds if seconds else float("inf")
+
+
+def run(store, items, operations):
+    results = {}
+
+    start = time.perf_counter()
+    for i in range(items):
+        store.add(make_product(i))
+    results["add"] = ops_per_second(items, time.perf_counter() - start)
+
+    ids = [random.randint(1, items) for _ in range(operations)]
+
+    start = time.perf_counter()
+    for item_id in ids:
+        store.get(item_id)
+    results["get"] = ops_per_second(operations, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for item_id in ids:
+        store.find_by_barcode(f"{item_id - 1:013d}")
+    results["barcode"] = ops_per_second(operations, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for item_id in ids:
+        store.update(item_id, {"price": 2.5})
+    results["update"] = ops_per_second(operations, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for item_id in set(ids):
+        store.delete(item_id)
+    results["delete"] = ops_per_second(len(set(ids)), time.perf_counter() - start)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=10_000)
+    parser.add_argument("--operations", type=int, default=5_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        stores = {
+            "memory": InventoryStore(),
+            "sqlite": SQLiteInventoryStore(os.path.join(folder, "bench.db")),
+        }
+
+        print(f"{'backend':<8} {'op':<8} {'ops/sec':>12}")
+        for name, store in stores.items():
+            for op, rate in run(store, args.items, args.operations).items():
+                print(f"{name:<8} {op:<8} {rate:>12,.0f}")
+
+        stores["sqlite"].close()
+
+
+if __name__ == "__main__":
+    main()
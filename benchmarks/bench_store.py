@@ -0,0 +1,67 @@
+"""
+Check that InventoryStore operations cost the same at any size.
+
+For each store size it times rounds of get / update / add / delete (best
+of 5) and prints the cost per round and the ratio to the smallest size.
+With the id index the ratio stays close to 1; a linear scan would make
+it grow with the store. It exits with status 1 when the ratio of the
+biggest size goes over --max-ratio, so it can run in CI.
+
+Run from the project folder:
+    python benchmarks/bench_store.py --sizes 1000 100000 1000000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from store import InventoryStore  # noqa: E402
+
+
+def make_store(size):
+    store = InventoryStore()
+    for i in range(size):
+        store.add({"product_name": f"Item {i}", "price": 1.0, "stock": 1})
+    return store
+
+
+def time_operations(store, rounds):
+    # microseconds per get/update/add/delete round, best of 5
+    best = None
+    for _ in range(5):
+        start = time.perf_counter()
+        for i in range(1, rounds + 1):
+            store.get(i)
+            store.update(i, {"price": 2.0})
+            new_item = store.add({})
+            store.delete(new_item["id"])
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best / rounds * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--rounds", type=int, default=1_000)
+    parser.add_argument("--max-ratio", type=float, default=5, help="allowed cost ratio, biggest / smallest size")
+    args = parser.parse_args()
+
+    print(f"{'items':>9} {'us/round':>9} {'ratio':>6}")
+    first = None
+    for size in args.sizes:
+        cost = time_operations(make_store(max(size, args.rounds)), args.rounds)
+        first = first or cost
+        print(f"{size:>9} {cost:>9.2f} {cost / first:>6.2f}")
+
+    if cost / first > args.max_ratio:
+        print(f"\nOVER BUDGET: ratio {cost / first:.1f} > {args.max_ratio:g}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+
+# Change feed for clients that keep a copy of the inventory
+#
+# Every change to the store gets a sequence number (1, 2, 3, ...) and is
+# kept in a ring buffer of the last `size` changes. A client remembers
+# the last number it has seen and asks for the changes after it, so
+# staying in sync costs as much as the number of changes, not the size
+# of the catalog.
+#
+# Events:
+#   {"seq": 7, "event": "add", "id": 3, "item": {...}}
+#   {"seq": 8, "event": "update", "id": 3, "item": {...}, "changes": {"price": 2.5}}
+#   {"seq": 9, "event": "delete", "id": 3}
+#   {"seq": 10, "event": "clear"}
+#
+# "add" and "update" carry the whole item, so applying an event twice
+# does no harm. A client that asks for changes that already fell out of
+# the buffer (or were made before a restart) gets ResyncRequired and
+# must fetch the full list again.
+
+import threading
+import time
+import uuid
+
+
+# How many changes are kept
+DEFAULT_SIZE = 10_000
+
+
+class ResyncRequired(Exception):
+    """Raised when the changes after `since` are no longer in the buffer."""
+
+    def __init__(self, since, last_seq):
+        super().__init__(f"Changes after {since} are gone, resync from {last_seq}")
+        self.since = since
+        self.last_seq = last_seq
+
+
+class ChangeFeed:
+    """
+    Sequenced ring buffer of the changes of a store.
+
+    The store must have subscribe() (both InventoryStore and
+    SQLiteInventoryStore do). Sequence numbers start at 1 every time the
+    app starts; `epoch` tells the runs apart.
+    """
+
+    def __init__(self, store, size=DEFAULT_SIZE):
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self.size = size
+        # new on every start; the SQLite store's epoch survives restarts
+        # but the buffer does not
+        self.epoch = uuid.uuid4().hex[:8]
+
+        # change seq lives at _buffer[seq % size]
+        self._buffer = [None] * size
+        self._last_seq = 0
+        # readers waiting for new changes sleep on this
+        self._changed = threading.Condition(threading.Lock())
+
+        store.subscribe(self._on_change)
+
+    @property
+    def last_seq(self):
+        """Sequence number of the newest change (0 if there is none yet)."""
+        return self._last_seq
+
+    @property
+    def first_seq(self):
+        """Sequence number of the oldest change still in the buffer."""
+        return max(1, self._last_seq - self.size + 1)
+
+    def _on_change(self, event, item, changes):
+        entry = {"event": event}
+        if item is not None:
+            entry["id"] = item["id"]
+            if event != "delete":
+                entry["item"] = item
+        if changes is not None:
+            # copy: the caller may reuse its dict
+            entry["changes"] = dict(changes)
+
+        with self._changed:
+            self._last_seq += 1
+            entry["seq"] = self._last_seq
+            self._buffer[self._last_seq % self.size] = entry
+            self._changed.notify_all()
+
+    def changes(self, since, limit=1000, timeout=0):
+        """
+        Return (events, last_seq): up to `limit` changes after `since`,
+        oldest first, and the seq to ask from next time.
+
+        With timeout > 0 and nothing new yet, wait up to that many seconds
+        for a change (long polling). Raise ResyncRequired if `since` is
+        older than the buffer or newer than the last change.
+        """
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while True:
+                if since > self._last_seq or since < self.first_seq - 1:
+                    raise ResyncRequired(since, self._last_seq)
+                if since < self._last_seq:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return [], since
+                self._changed.wait(remaining)
+
+            end = min(self._last_seq, since + limit)
+            events = [self._buffer[seq % self.size] for seq in range(since + 1, end + 1)]
+        return events, end
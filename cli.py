@@ -1,8 +1,90 @@
 
+# Command line client for the inventory API
+#
+# Without arguments it shows the interactive menu. With a command it runs
+# once, for scripts:
+#   python cli.py list [--fields id,price]       every item, one JSON per line
+#   python cli.py get 3
+#   python cli.py add --name "Oat Milk" --price 2.5 --stock 10
+#   python cli.py update 3 --price 2.99          or --file changes.csv
+#   python cli.py delete 3
+#   python cli.py fetch 3017620422003 [more barcodes...]
+#   python cli.py import items.csv               or items.ndjson
+#   python cli.py export items.csv               or items.ndjson
+# --base-url (or INVENTORY_URL) picks the server. Results go to stdout,
+# errors and progress to stderr, and the exit code is 1 if anything failed.
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
 import requests  # used to call the Flask API
+from requests.adapters import HTTPAdapter
 
 # Base URL of the Flask server
-BASE_URL = "http://127.0.0.1:5000"
+BASE_URL = os.environ.get("INVENTORY_URL", "http://127.0.0.1:5000")
+
+# Requests at the same time for bulk commands, and operations per
+# POST /inventory/bulk request
+DEFAULT_WORKERS = 4
+DEFAULT_BATCH_SIZE = 500
+
+# One shared session for every call, so connections are kept alive and
+# reused instead of opening a new one per request
+session = requests.Session()
+
+
+def configure_session(pool_size):
+    """Keep up to pool_size connections open (one per worker thread)."""
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+
+configure_session(DEFAULT_WORKERS)
+
+# How many items to ask for per page when listing the inventory
+PAGE_SIZE = 50
+
+# The fields the list view prints; the server leaves out the rest
+# (like the long ingredients_text)
+LIST_FIELDS = "id,product_name,brands,price,stock,barcode"
+
+# Last ETag and body for each GET we made: (path, params) -> (etag, data)
+# If the server answers 304 Not Modified we reuse the saved body.
+response_cache = {}
+
+
+def get_json_cached(path, params=None):
+    """
+    GET a JSON resource, sending If-None-Match with the ETag we saw last time.
+    Return (status_code, data); a 304 is returned as 200 with the saved data.
+    """
+    key = (path, tuple(sorted((params or {}).items())))
+    cached = response_cache.get(key)
+
+    headers = {}
+    if cached:
+        headers["If-None-Match"] = cached[0]
+
+    response = session.get(f"{BASE_URL}{path}", params=params, headers=headers)
+
+    if response.status_code == 304 and cached:
+        return 200, cached[1]
+
+    if response.status_code != 200:
+        return response.status_code, None
+
+    data = response.json()
+    etag = response.headers.get("ETag")
+    if etag:
+        response_cache[key] = (etag, data)
+    return 200, data
 
 
 def print_menu():
@@ -14,18 +96,27 @@ def print_menu():
     print("4. Update item price or stock")
     print("5. Delete an item")
     print("6. Add item from OpenFoodFacts by barcode")
+    print("7. Search items")
     print("0. Exit")
 
 
 def view_all_items():
-    """Call GET /inventory to see all items."""
+    """Call GET /inventory page by page to see all items."""
+    cursor = None
+    print("\n--- Inventory Items ---")
     try:
-        response = requests.get(f"{BASE_URL}/inventory")
-        # If the response status code is 200, show the items
-        if response.status_code == 200:
-            items = response.json()
-            print("\n--- Inventory Items ---")
-            for item in items:
+        while True:
+            params = {"limit": PAGE_SIZE, "fields": LIST_FIELDS}
+            if cursor:
+                params["cursor"] = cursor
+            status_code, page = get_json_cached("/inventory", params)
+
+            # If the response status code is 200, show the items of this page
+            if status_code != 200:
+                print("Error: Could not fetch inventory.")
+                return
+
+            for item in page["items"]:
                 print(f"ID: {item['id']}")
                 print(f"  Name: {item['product'].get('product_name')}")
                 print(f"  Brand: {item['product'].get('brands')}")
@@ -33,8 +124,11 @@ def view_all_items():
                 print(f"  Stock: {item['product'].get('stock')}")
                 print(f"  Barcode: {item['product'].get('barcode')}")
                 print("------------------------")
-        else:
-            print("Error: Could not fetch inventory.")
+
+            # stop when the server says there are no more pages
+            cursor = page.get("next_cursor")
+            if not cursor:
+                break
     except requests.RequestException:
         # if the server is not running or there is a connection problem
         print("Error: Could not connect to the API. Is the Flask app running?")
@@ -46,9 +140,8 @@ def view_single_item():
 
     # Build the URL with the item ID
     try:
-        response = requests.get(f"{BASE_URL}/inventory/{item_id}")
-        if response.status_code == 200:
-            item = response.json()
+        status_code, item = get_json_cached(f"/inventory/{item_id}")
+        if status_code == 200:
             print("\n--- Item Details ---")
             print(f"ID: {item['id']}")
             print(f"Name: {item['product'].get('product_name')}")
@@ -58,7 +151,7 @@ def view_single_item():
             print(f"Barcode: {item['product'].get('barcode')}")
             print(f"Ingredients: {item['product'].get('ingredients_text')}")
             print("---------------------")
-        elif response.status_code == 404:
+        elif status_code == 404:
             print("Item not found.")
         else:
             print("Error: Could not fetch item.")
@@ -100,7 +193,7 @@ def add_new_item():
     }
 
     try:
-        response = requests.post(f"{BASE_URL}/inventory", json=data)
+        response = session.post(f"{BASE_URL}/inventory", json=data)
         if response.status_code == 201:
             item = response.json()
             print("\nNew item added:")
@@ -146,7 +239,7 @@ def update_item_price_or_stock():
 
     # Send PATCH request to the API
     try:
-        response = requests.patch(f"{BASE_URL}/inventory/{item_id}", json=data)
+        response = session.patch(f"{BASE_URL}/inventory/{item_id}", json=data)
         if response.status_code == 200:
             item = response.json()
             print("\nItem updated:")
@@ -167,7 +260,7 @@ def delete_item():
     item_id = input("Enter the item ID to delete: ")
 
     try:
-        response = requests.delete(f"{BASE_URL}/inventory/{item_id}")
+        response = session.delete(f"{BASE_URL}/inventory/{item_id}")
         if response.status_code == 200:
             print("Item deleted successfully.")
         elif response.status_code == 404:
@@ -184,7 +277,7 @@ def add_item_from_barcode():
 
     # send a POST request to the special route that uses the external API
     try:
-        response = requests.post(f"{BASE_URL}/inventory/fetch/{barcode}")
+        response = session.post(f"{BASE_URL}/inventory/fetch/{barcode}")
         if response.status_code == 201:
             item = response.json()
             print("\nItem added from OpenFoodFacts:")
@@ -200,8 +293,41 @@ def add_item_from_barcode():
         print("Error: Could not connect to the API.")
 
 
-def main():
-    """Main loop of the CLI application."""
+def search_items():
+    """Call GET /inventory/search to find items by name, brand or ingredients."""
+    query = input("Search for: ").strip()
+    if not query:
+        print("Please enter something to search for.")
+        return
+
+    cursor = None
+    try:
+        while True:
+            params = {"q": query, "limit": PAGE_SIZE}
+            if cursor:
+                params["cursor"] = cursor
+            status_code, page = get_json_cached("/inventory/search", params)
+            if status_code != 200:
+                print("Error: Could not search the inventory.")
+                return
+
+            if not page["items"] and not cursor:
+                print("No items found.")
+                return
+
+            # best matches first
+            for item in page["items"]:
+                print(f"ID: {item['id']}  {item['product'].get('product_name')} ({item['product'].get('brands')})")
+
+            cursor = page.get("next_cursor")
+            if not cursor or input("Show more results? (y/n): ").strip().lower() != "y":
+                break
+    except requests.RequestException:
+        print("Error: Could not connect to the API.")
+
+
+def menu():
+    """Main loop of the interactive CLI."""
     while True:
         print_menu()
         choice = input("Choose an option: ")
@@ -218,6 +344,8 @@ def main():
             delete_item()
         elif choice == "6":
             add_item_from_barcode()
+        elif choice == "7":
+            search_items()
         elif choice == "0":
             print("Goodbye!")
             break
@@ -225,6 +353,340 @@ def main():
             print("Invalid choice. Please try again.")
 
 
+# Scripting mode (python cli.py <command> ...)
+
+# Columns of a CSV export; a CSV import accepts any product field
+CSV_COLUMNS = ("id", "product_name", "brands", "ingredients_text", "price", "stock", "barcode")
+
+
+def print_json(data):
+    print(json.dumps(data))
+
+
+def error(message):
+    print(f"Error: {message}", file=sys.stderr)
+
+
+def api_error(response):
+    """Return the error message of a failed API response."""
+    try:
+        return response.json().get("error", response.reason)
+    except ValueError:
+        return f"{response.status_code} {response.reason}"
+
+
+class Progress:
+    """Print how many operations are done, and how fast, on stderr."""
+
+    def __init__(self, label, every=0.5):
+        self.label = label
+        self.every = every
+        self.done = 0
+        self.failed = 0
+        self.start = time.perf_counter()
+        self._printed = self.start
+
+    def add(self, done, failed=0):
+        self.done += done
+        self.failed += failed
+        now = time.perf_counter()
+        if now - self._printed >= self.every:
+            self._printed = now
+            print(f"\r{self.line()}", end="", file=sys.stderr, flush=True)
+
+    def line(self):
+        seconds = max(time.perf_counter() - self.start, 1e-9)
+        total = self.done + self.failed
+        return f"{self.label}: {self.done} done, {self.failed} failed, {total / seconds:.0f}/s"
+
+    def finish(self):
+        print(f"\r{self.line()} in {time.perf_counter() - self.start:.1f} s", file=sys.stderr)
+        return 1 if self.failed else 0
+
+
+def run_tasks(function, tasks, workers, progress):
+    """
+    Call function(task) for every task on `workers` threads. At most
+    workers * 2 tasks wait at a time, so a big file is read as it goes,
+    not all at once. function returns (done, failed) counts for progress.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for task in tasks:
+            if len(pending) >= workers * 2:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    progress.add(*future.result())
+            pending.add(pool.submit(function, task))
+        for future in pending:
+            progress.add(*future.result())
+
+
+def send_bulk(operations):
+    """POST one batch to /inventory/bulk and return (applied, failed)."""
+    try:
+        response = session.post(f"{BASE_URL}/inventory/bulk", json={"operations": operations})
+    except requests.RequestException as exception:
+        error(f"Could not connect to the API ({exception})")
+        return 0, len(operations)
+    if response.status_code != 200:
+        error(api_error(response))
+        return 0, len(operations)
+
+    body = response.json()
+    for result in body["results"]:
+        if result["status"] == "error":
+            error(f"{result['op']} {result.get('id', '')}: {result['error']}")
+    return body["applied"], body["failed"]
+
+
+def batches(iterable, size):
+    """Yield lists of up to `size` values."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def csv_value(column, text):
+    """Turn a CSV cell into the JSON value the API expects (None if empty)."""
+    if text is None or text == "":
+        return None
+    if column == "price":
+        return float(text)
+    if column in ("id", "stock"):
+        return float(text) if "." in text else int(text)
+    return text
+
+
+def read_rows(path):
+    """Yield one dict per row of a .csv file, or per line of an .ndjson / .jsonl file."""
+    with open(path, newline="", encoding="utf-8") as file:
+        if path.endswith(".csv"):
+            for row in csv.DictReader(file):
+                values = {column: csv_value(column, text) for column, text in row.items() if column}
+                yield {column: value for column, value in values.items() if value is not None}
+        else:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def row_product(row):
+    """The product part of a row: its "product" object (like an export), or its other keys."""
+    if isinstance(row.get("product"), dict):
+        return dict(row["product"])
+    return {key: value for key, value in row.items() if key not in ("id", "status")}
+
+
+def command_list(args):
+    params = {"format": "ndjson"}
+    if args.fields:
+        params["fields"] = args.fields
+    response = session.get(f"{BASE_URL}/inventory", params=params, stream=True)
+    if response.status_code != 200:
+        error(api_error(response))
+        return 1
+    # the server streams one item per line; pass the lines on as they come
+    for line in response.iter_lines():
+        if line:
+            print(line.decode("utf-8"))
+    return 0
+
+
+def command_get(args):
+    response = session.get(f"{BASE_URL}/inventory/{args.id}")
+    if response.status_code != 200:
+        error(api_error(response))
+        return 1
+    print_json(response.json())
+    return 0
+
+
+def command_add(args):
+    product = {
+        "product_name": args.name,
+        "brands": args.brand,
+        "ingredients_text": args.ingredients,
+        "price": args.price,
+        "stock": args.stock,
+        "barcode": args.barcode,
+    }
+    response = session.post(
+        f"{BASE_URL}/inventory", json={key: value for key, value in product.items() if value is not None}
+    )
+    if response.status_code != 201:
+        error(api_error(response))
+        return 1
+    print_json(response.json())
+    return 0
+
+
+def command_update(args):
+    if args.file:
+        # every row needs the id of the item; the other keys are the new values
+        operations = (
+            {"op": "patch", "id": int(row["id"]), "fields": row_product(row)} for row in read_rows(args.file)
+        )
+        progress = Progress("update")
+        run_tasks(send_bulk, batches(operations, args.batch_size), args.workers, progress)
+        return progress.finish()
+
+    fields = {key: value for key, value in (("price", args.price), ("stock", args.stock)) if value is not None}
+    if args.id is None or not fields:
+        error("give an item ID and --price and/or --stock, or --file")
+        return 1
+    response = session.patch(f"{BASE_URL}/inventory/{args.id}", json=fields)
+    if response.status_code != 200:
+        error(api_error(response))
+        return 1
+    print_json(response.json())
+    return 0
+
+
+def command_delete(args):
+    response = session.delete(f"{BASE_URL}/inventory/{args.id}")
+    if response.status_code != 200:
+        error(api_error(response))
+        return 1
+    return 0
+
+
+def fetch_barcode(barcode):
+    """POST /inventory/fetch/<barcode>, print the new item, return (done, failed)."""
+    try:
+        response = session.post(f"{BASE_URL}/inventory/fetch/{barcode}")
+    except requests.RequestException as exception:
+        error(f"{barcode}: could not connect to the API ({exception})")
+        return 0, 1
+    if response.status_code not in (201, 202):
+        error(f"{barcode}: {api_error(response)}")
+        return 0, 1
+    print_json(response.json())
+    return 1, 0
+
+
+def command_fetch(args):
+    progress = Progress("fetch")
+    run_tasks(fetch_barcode, args.barcodes, args.workers, progress)
+    return progress.finish()
+
+
+def command_import(args):
+    operations = ({"op": "create", "product": row_product(row)} for row in read_rows(args.file))
+    progress = Progress("import")
+    run_tasks(send_bulk, batches(operations, args.batch_size), args.workers, progress)
+    return progress.finish()
+
+
+def command_export(args):
+    params = {"format": "ndjson"}
+    if args.fields:
+        params["fields"] = args.fields
+    response = session.get(f"{BASE_URL}/inventory", params=params, stream=True)
+    if response.status_code != 200:
+        error(api_error(response))
+        return 1
+
+    progress = Progress("export")
+    lines = (line for line in response.iter_lines() if line)
+    with open(args.file, "w", newline="", encoding="utf-8") as file:
+        if args.file.endswith(".csv"):
+            columns = CSV_COLUMNS
+            if args.fields:
+                names = [name.strip() for name in args.fields.split(",")]
+                columns = ["id"] + [name for name in names if name not in ("id", "status", "product")]
+            writer = csv.DictWriter(file, fieldnames=columns, extrasaction="ignore")
+            writer.writeheader()
+            for line in lines:
+                item = json.loads(line)
+                writer.writerow({"id": item["id"], **item.get("product", {})})
+                progress.add(1)
+        else:
+            for line in lines:
+                file.write(line.decode("utf-8") + "\n")
+                progress.add(1)
+    return progress.finish()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Inventory API client. Without a command, show the menu.")
+    parser.add_argument("--base-url", default=BASE_URL, help=f"API server (default {BASE_URL}, or INVENTORY_URL)")
+    commands = parser.add_subparsers(dest="command")
+
+    # options shared by the commands that send many requests
+    bulk = argparse.ArgumentParser(add_help=False)
+    bulk.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="requests at the same time")
+    bulk.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                      help="operations per POST /inventory/bulk request")
+
+    command = commands.add_parser("list", help="print every item, one JSON object per line")
+    command.add_argument("--fields", help="only these fields, like id,product_name,price")
+    command.set_defaults(run=command_list)
+
+    command = commands.add_parser("get", help="print one item")
+    command.add_argument("id", type=int)
+    command.set_defaults(run=command_get)
+
+    command = commands.add_parser("add", help="add an item")
+    command.add_argument("--name", required=True)
+    command.add_argument("--brand")
+    command.add_argument("--ingredients")
+    command.add_argument("--price", type=float)
+    command.add_argument("--stock", type=int)
+    command.add_argument("--barcode")
+    command.set_defaults(run=command_add)
+
+    command = commands.add_parser("update", parents=[bulk], help="change the price or stock of items")
+    command.add_argument("id", type=int, nargs="?")
+    command.add_argument("--price", type=float)
+    command.add_argument("--stock", type=int)
+    command.add_argument("--file", help=".csv or .ndjson file with an id column and the new values")
+    command.set_defaults(run=command_update)
+
+    command = commands.add_parser("delete", help="delete an item")
+    command.add_argument("id", type=int)
+    command.set_defaults(run=command_delete)
+
+    command = commands.add_parser("fetch", parents=[bulk], help="add items from OpenFoodFacts by barcode")
+    command.add_argument("barcodes", nargs="+")
+    command.set_defaults(run=command_fetch)
+
+    command = commands.add_parser("import", parents=[bulk], help="add the items of a .csv or .ndjson file")
+    command.add_argument("file")
+    command.set_defaults(run=command_import)
+
+    command = commands.add_parser("export", help="write every item to a .csv or .ndjson file")
+    command.add_argument("file")
+    command.add_argument("--fields", help="only these fields, like id,product_name,price")
+    command.set_defaults(run=command_export)
+    return parser
+
+
+def main(argv=None):
+    """Run one command, or the interactive menu when there is none."""
+    global BASE_URL
+
+    args = build_parser().parse_args(argv)
+    BASE_URL = args.base_url.rstrip("/")
+    if args.command is None:
+        menu()
+        return 0
+
+    configure_session(max(getattr(args, "workers", 1), 1))
+    try:
+        return args.run(args)
+    except requests.RequestException as exception:
+        error(f"Could not connect to the API ({exception})")
+        return 1
+    except (OSError, ValueError, KeyError) as exception:
+        # a missing file, or a row that is not valid JSON / has no id
+        error(str(exception))
+        return 1
+
+
 # Run the CLI only if this file is executed directly
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
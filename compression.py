@@ -0,0 +1,84 @@
+
+# Response compression
+#
+# JSON lists compress very well (the full inventory shrinks 5-10x with
+# gzip), which matters for handheld scanners on store Wi-Fi. The client
+# says what it can decode in Accept-Encoding. We use brotli when the
+# optional "brotli" package is installed and the client accepts it, and
+# gzip otherwise. Bodies smaller than a minimum size are sent as they
+# are, because compressing them costs more time than the bytes save.
+#
+# Streamed responses (NDJSON) are compressed chunk by chunk as they are
+# sent, so memory stays flat.
+
+import gzip
+import threading
+import zlib
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:  # optional, gzip is used without it
+    brotli = None
+
+
+# brotli quality 4 is about as fast as gzip level 6 and smaller; the
+# maximum (11) is far too slow to run per request
+BROTLI_QUALITY = 4
+
+
+def available_encodings():
+    """Content codings we can produce, best first."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def compress(data, encoding, level=6):
+    """Compress bytes with "gzip" (at this level) or "br"."""
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    # mtime=0 so the same body always gives the same bytes
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def compress_stream(chunks, encoding, level=6):
+    """Compress an iterable of byte chunks while it is being sent."""
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        compress_chunk, finish = compressor.process, compressor.finish
+    else:
+        # wbits 31 = deflate with a gzip header and trailer
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        compress_chunk, finish = compressor.compress, compressor.flush
+
+    for chunk in chunks:
+        data = compress_chunk(chunk)
+        # the compressor buffers small chunks, only send what it gave back
+        if data:
+            yield data
+    yield finish()
+
+
+class CompressedCache:
+    """
+    The last few compressed bodies, so a big response that did not change
+    (same URL and ETag) is compressed only once.
+    """
+
+    def __init__(self, max_entries=16):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def put(self, key, data):
+        with self._lock:
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
@@ -0,0 +1,24 @@
+# Fixtures shared by the test files
+
+import pytest
+
+
+class FakeClock:
+    """A clock for code that takes clock=; tests move it with clock.now += seconds."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def ids():
+    """ids(items) gives the ids of a list of items, in order."""
+    return lambda items: [item["id"] for item in items]
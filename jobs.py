@@ -0,0 +1,99 @@
+
+# Background jobs with a status the client can poll
+#
+# JobQueue runs functions on a small pool of worker threads and keeps a
+# record of each one (queued -> running -> succeeded / failed), so a
+# route can answer "202 Accepted" right away and the client can follow
+# the work with GET /jobs/<id>.
+#
+# - at most `workers` jobs run at the same time
+# - at most `max_pending` jobs wait or run; submit() raises QueueFull
+#   past that, so a slow upstream cannot pile up unbounded work
+# - the last `max_finished` finished jobs are kept for polling, older
+#   ones are forgotten
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFull(Exception):
+    """Raised by submit() when too many jobs are waiting or running."""
+
+
+class JobError(Exception):
+    """Raise from a job to fail it with this message (an expected failure)."""
+
+
+class JobQueue:
+    """Run functions in background threads and remember how they went."""
+
+    def __init__(self, workers=4, max_pending=1000, max_finished=10_000):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+
+        self._jobs = {}  # id -> job dict, for queued and running jobs
+        self._finished = OrderedDict()  # id -> job dict, oldest first
+        self._lock = threading.Lock()
+        # threads are started on the first submit
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+
+    def pending(self):
+        """Number of jobs waiting or running."""
+        return len(self._jobs)
+
+    def submit(self, function, info=None):
+        """
+        Run function() in the background and return the new job (a copy).
+        info is a dict of extra keys shown with the job (like the barcode).
+        function's return value becomes the job's "result".
+        """
+        with self._lock:
+            if len(self._jobs) >= self.max_pending:
+                raise QueueFull(f"{len(self._jobs)} jobs are already pending")
+            job = dict(info or {})
+            job.update(
+                id=uuid.uuid4().hex,
+                status="queued",
+                created_at=time.time(),
+                started_at=None,
+                finished_at=None,
+                result=None,
+                error=None,
+            )
+            self._jobs[job["id"]] = job
+            view = dict(job)
+        self._pool.submit(self._run, job, function)
+        return view
+
+    def get(self, job_id):
+        """Return a copy of the job, or None if it is unknown (or forgotten)."""
+        with self._lock:
+            job = self._jobs.get(job_id) or self._finished.get(job_id)
+            return dict(job) if job is not None else None
+
+    def _run(self, job, function):
+        with self._lock:
+            job["status"] = "running"
+            job["started_at"] = time.time()
+        try:
+            result = function()
+        except JobError as error:
+            status, result, message = "failed", None, str(error)
+        except Exception as error:  # a bug in the job must not kill the worker
+            status, result, message = "failed", None, f"{type(error).__name__}: {error}"
+        else:
+            status, message = "succeeded", None
+
+        with self._lock:
+            job.update(status=status, result=result, error=message, finished_at=time.time())
+            del self._jobs[job["id"]]
+            self._finished[job["id"]] = job
+            while len(self._finished) > self.max_finished:
+                self._finished.popitem(last=False)
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,293 @@
+
+# Write-ahead log ("journal") for the in-memory store
+#
+# Every change to the store is appended to a log file as one short JSON
+# line. A background thread writes the lines in groups (group commit)
+# and, from time to time, writes a snapshot of the whole store and
+# starts a new, empty log. On startup we load the latest snapshot and
+# replay only the log written after it.
+#
+# Files inside the data folder:
+#   snapshot.json     first line is a header, then one item per line
+#   wal-<gen>.log     log records written after snapshot <gen>
+#
+# Log records:
+#   ["a", item]             item added
+#   ["u", id, fields]       fields of the item's product updated
+#   ["d", id]               item deleted
+#   ["c"]                   store cleared
+
+import atexit
+import json
+import mmap
+import os
+import threading
+
+
+SNAPSHOT_NAME = "snapshot.json"
+
+# How records reach the disk:
+#   "always"   every change waits until its record is fsynced
+#              (concurrent changes share one fsync)
+#   "interval" the background thread writes and fsyncs every `interval` seconds
+#   "never"    the background thread writes, the OS decides when to sync
+FSYNC_POLICIES = ("always", "interval", "never")
+
+
+def encode(record):
+    return json.dumps(record, separators=(",", ":")) + "\n"
+
+
+def apply_record(store, record):
+    """Apply one log record to a store."""
+    op = record[0]
+    if op == "a":
+        item = record[1]
+        # a record can be in the log and in the snapshot (it was written
+        # while the snapshot was taken), so adding it twice is a no-op
+        if item["id"] not in store:
+            store.insert(item)
+    elif op == "u":
+        store.update(record[1], record[2])
+    elif op == "d":
+        store.delete(record[1])
+    elif op == "c":
+        store.clear()
+    else:
+        raise ValueError(f"Unknown log record: {record!r}")
+
+
+class Journal:
+    """
+    Append-only log plus periodic snapshots for an InventoryStore.
+
+    Usage:
+        journal = Journal("data")
+        journal.recover(store)   # load snapshot + replay the log
+        journal.attach(store)    # log every change from now on
+    """
+
+    def __init__(self, directory, fsync="interval", interval=0.05, snapshot_every=100_000):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}, got {fsync!r}")
+
+        self.directory = directory
+        self.fsync = fsync
+        self.interval = interval
+        # write a snapshot after this many records
+        self.snapshot_every = snapshot_every
+
+        os.makedirs(directory, exist_ok=True)
+
+        self._store = None
+        self._generation = 0
+        self._file = None
+
+        # _lock protects the buffer and the current file;
+        # _flush_lock makes sure only one thread writes to disk at a time
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._buffer = []
+        self._appended = 0       # records appended so far
+        self._synced = 0         # records known to be on disk
+        self._since_snapshot = 0
+        # per thread: sequence of the last record its change is waiting for
+        self._local = threading.local()
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    # Startup
+
+    def _log_path(self, generation):
+        return os.path.join(self.directory, f"wal-{generation}.log")
+
+    def _log_generations(self):
+        generations = []
+        for name in os.listdir(self.directory):
+            if name.startswith("wal-") and name.endswith(".log"):
+                try:
+                    generations.append(int(name[4:-4]))
+                except ValueError:
+                    pass
+        return sorted(generations)
+
+    def recover(self, store):
+        """
+        Load the snapshot and replay the log into store.
+        Return the number of items loaded plus records replayed (0 means
+        there was nothing to recover).
+        """
+        loaded = 0
+        first_generation = 0
+
+        snapshot_path = os.path.join(self.directory, SNAPSHOT_NAME)
+        if os.path.exists(snapshot_path) and os.path.getsize(snapshot_path) > 0:
+            with open(snapshot_path, "rb") as snapshot, \
+                    mmap.mmap(snapshot.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                header = json.loads(data.readline())
+                for line in iter(data.readline, b""):
+                    store.insert(json.loads(line))
+                    loaded += 1
+            store.ensure_next_id(header["next_id"])
+            first_generation = header["generation"]
+
+        generations = [g for g in self._log_generations() if g >= first_generation]
+        for generation in generations:
+            loaded += self._replay(self._log_path(generation), store)
+
+        # always continue in a fresh log file, so a half written last
+        # line in the old file can never end up in the middle of a log
+        if generations:
+            self._generation = generations[-1] + 1
+        else:
+            self._generation = first_generation
+        return loaded
+
+    @staticmethod
+    def _replay(path, store):
+        replayed = 0
+        with open(path, "rb") as log:
+            for line in log:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # the last line was cut off by a crash; it never finished
+                    # being written, so the change it describes is lost
+                    break
+                apply_record(store, record)
+                replayed += 1
+        return replayed
+
+    def attach(self, store):
+        """Start logging every change of store and start the background thread."""
+        self._store = store
+        self._file = open(self._log_path(self._generation), "a", encoding="utf-8")
+        store.subscribe(self._on_change)
+        store.on_commit(self._on_commit)
+
+        self._thread = threading.Thread(target=self._run, name="journal", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # Writing
+
+    def _on_change(self, event, item, changes):
+        if event == "add":
+            record = ["a", item]
+        elif event == "update":
+            record = ["u", item["id"], changes]
+        elif event == "delete":
+            record = ["d", item["id"]]
+        else:
+            record = ["c"]
+        # the store still holds its lock here, so the record only goes in
+        # the buffer (in the order of the changes); with "always" the
+        # change waits for the disk in _on_commit, after the store let go,
+        # so writers from other threads can add their records meanwhile
+        # and share the same fsync
+        sequence = self._queue(record)
+        if self.fsync == "always":
+            self._local.sequence = sequence
+
+    def _on_commit(self):
+        sequence = getattr(self._local, "sequence", None)
+        if sequence is not None:
+            self._local.sequence = None
+            self.flush(sequence)
+
+    def append(self, record):
+        """Add a record to the log (and wait for it with fsync="always")."""
+        sequence = self._queue(record)
+        if self.fsync == "always":
+            self.flush(sequence)
+
+    def _queue(self, record):
+        # return the record's sequence number, for flush()
+        line = encode(record)
+        with self._lock:
+            self._buffer.append(line)
+            self._appended += 1
+            self._since_snapshot += 1
+            return self._appended
+
+    def flush(self, sequence=None):
+        """
+        Write buffered records to the log (and fsync unless the policy is "never").
+        If sequence is given and another thread already wrote it, return at once.
+        """
+        with self._flush_lock:
+            if sequence is not None and self._synced >= sequence:
+                # group commit: someone else's flush covered our record
+                return
+            self._write_buffer()
+
+    def _write_buffer(self):
+        # caller holds _flush_lock
+        with self._lock:
+            lines = self._buffer
+            self._buffer = []
+            sequence = self._appended
+            log = self._file
+
+        if lines and log is not None:
+            log.write("".join(lines))
+            log.flush()
+            if self.fsync != "never":
+                os.fsync(log.fileno())
+        self._synced = sequence
+
+    # Snapshots
+
+    def snapshot(self):
+        """Write a snapshot of the store and delete the logs it replaces."""
+        store = self._store
+
+        with self._flush_lock:
+            self._write_buffer()
+            with self._lock:
+                # copy the items while no record can be appended, so every
+                # record in the old log is part of the copy (all() returns
+                # new dicts, so later changes do not leak into the copy)
+                items = store.all()
+                next_id = store.next_id
+
+                # switch to a new log file; records from now on go there
+                self._generation += 1
+                generation = self._generation
+                self._file.close()
+                self._file = open(self._log_path(generation), "a", encoding="utf-8")
+                self._since_snapshot = 0
+
+        # writing the snapshot file happens without holding any lock
+        path = os.path.join(self.directory, SNAPSHOT_NAME)
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as snapshot:
+            snapshot.write(encode({"generation": generation, "next_id": next_id, "count": len(items)}))
+            for item in items:
+                snapshot.write(encode(item))
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+        os.replace(temp_path, path)
+
+        # the old logs are now covered by the snapshot
+        for old in self._log_generations():
+            if old < generation:
+                os.remove(self._log_path(old))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+            if self._since_snapshot >= self.snapshot_every:
+                self.snapshot()
+
+    def close(self):
+        """Stop the background thread and write everything that is left."""
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.flush()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
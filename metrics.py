@@ -0,0 +1,205 @@
+
+# Small Prometheus-style metrics for the API
+#
+# Counter, Histogram and Gauge keep their numbers in plain dicts keyed by
+# the label values, and Registry.render() writes them in the Prometheus
+# text format (version 0.0.4) for GET /metrics.
+#
+# Recording a value is a dict lookup, a bisect and a few additions under
+# a lock, so it is cheap enough to leave on all the time
+# (benchmarks/bench_metrics.py measures it).
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+
+# Upper bounds (in seconds) of the latency buckets, from 0.5 ms to 10 s
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """A number that only goes up, one per combination of label values."""
+
+    type = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            yield self.name, _format_labels(self.labels, label_values), value
+
+
+class Histogram:
+    """
+    Counts values in buckets (like latencies), one histogram per
+    combination of label values. Also keeps the sum and the count.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [count per bucket (last one is +Inf), sum]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    @contextmanager
+    def time(self, *label_values):
+        """Observe how long the block inside the with statement takes."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def count(self, *label_values):
+        entry = self._values.get(label_values)
+        return sum(entry[0]) if entry else 0
+
+    def samples(self):
+        with self._lock:
+            values = {key: (list(entry[0]), entry[1]) for key, entry in self._values.items()}
+        bounds = self.buckets + (float("inf"),)
+        for label_values, (counts, total) in sorted(values.items()):
+            # Prometheus buckets are cumulative: "how many were <= le"
+            running = 0
+            for bound, count in zip(bounds, counts):
+                running += count
+                le = f'le="{_format_value(bound)}"'
+                yield self.name + "_bucket", _format_labels(self.labels, label_values, le), running
+            labels = _format_labels(self.labels, label_values)
+            yield self.name + "_sum", labels, total
+            yield self.name + "_count", labels, running
+
+
+class Gauge:
+    """
+    A value read when /metrics is scraped. function() returns a number,
+    or a dict of label values -> number when the gauge has labels.
+    Use type="counter" for totals that are kept somewhere else.
+    """
+
+    def __init__(self, name, help, function, labels=(), type="gauge"):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.function = function
+        self.type = type
+
+    def samples(self):
+        value = self.function()
+        if not self.labels:
+            yield self.name, "", value
+            return
+        for label_values, number in sorted(value.items()):
+            if not isinstance(label_values, tuple):
+                label_values = (label_values,)
+            yield self.name, _format_labels(self.labels, label_values), number
+
+
+class Registry:
+    """A list of metrics that can be written out together."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self.register(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def gauge(self, name, help, function, labels=(), type="gauge"):
+        return self.register(Gauge(name, help, function, labels, type))
+
+    def render(self):
+        """Return every metric in the Prometheus text format."""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def instrument(target, method_names, histogram):
+    """
+    Time calls to some methods of one object, e.g. the store.
+
+    Each method is replaced on the object itself by a wrapper that
+    observes its duration in histogram, labelled with the method name.
+    The class and other objects are not changed.
+    """
+    for method_name in method_names:
+        method = getattr(target, method_name, None)
+        if method is None:
+            continue
+        setattr(target, method_name, _timed(method, method_name, histogram))
+
+
+def _timed(method, method_name, histogram):
+    perf_counter = time.perf_counter
+    observe = histogram.observe
+
+    def wrapper(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            observe(perf_counter() - start, method_name)
+
+    wrapper.__name__ = method_name
+    wrapper.__wrapped__ = method
+    return wrapper
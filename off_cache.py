@@ -0,0 +1,171 @@
+
+# Cache for OpenFoodFacts lookups
+#
+# Two tiers:
+# 1. an in-process LRU (OrderedDict) with a size limit and a TTL
+# 2. an optional SQLite file, so lookups survive a restart
+#
+# "Not found" and error results are cached too (negative caching), but
+# with a shorter TTL, so a barcode that was missing gets retried sooner.
+#
+# SingleFlight makes threads that ask for the same barcode at the same
+# time share one lookup instead of each calling the API.
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class LookupCache:
+    """
+    Remember OpenFoodFacts results by barcode.
+
+    get() returns (True, value) on a hit, where value may be None for a
+    cached "not found", and (False, None) on a miss.
+    """
+
+    def __init__(self, max_size=10_000, ttl=24 * 3600, negative_ttl=300, path=None, clock=time.time):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.path = path
+        self._clock = clock
+
+        # barcode -> (value, expires_at), least recently used first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_hits = 0
+
+        self._disk = None
+        if path:
+            self._disk = sqlite3.connect(path, check_same_thread=False)
+            with self._disk:
+                self._disk.execute(
+                    "CREATE TABLE IF NOT EXISTS lookups ("
+                    "barcode TEXT PRIMARY KEY, value TEXT, expires_at REAL NOT NULL)"
+                )
+
+    def get(self, barcode):
+        now = self._clock()
+
+        with self._lock:
+            entry = self._entries.get(barcode)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(barcode)
+                    self.hits += 1
+                    return True, value
+                # expired
+                del self._entries[barcode]
+
+            if self._disk is not None:
+                row = self._disk.execute(
+                    "SELECT value, expires_at FROM lookups WHERE barcode = ?", (barcode,)
+                ).fetchone()
+                if row is not None and row[1] > now:
+                    value = json.loads(row[0])
+                    # promote to the memory tier
+                    self._remember(barcode, value, row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return True, value
+
+            self.misses += 1
+            return False, None
+
+    def put(self, barcode, value):
+        """Cache a lookup result (None means "not found" or error)."""
+        ttl = self.ttl if value is not None else self.negative_ttl
+        expires_at = self._clock() + ttl
+
+        with self._lock:
+            self._remember(barcode, value, expires_at)
+            if self._disk is not None:
+                with self._disk:
+                    self._disk.execute(
+                        "INSERT OR REPLACE INTO lookups (barcode, value, expires_at) VALUES (?, ?, ?)",
+                        (barcode, json.dumps(value), expires_at),
+                    )
+
+    def _remember(self, barcode, value, expires_at):
+        # caller holds _lock
+        self._entries[barcode] = (value, expires_at)
+        self._entries.move_to_end(barcode)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._disk is not None:
+                with self._disk:
+                    self._disk.execute("DELETE FROM lookups")
+
+    def stats(self):
+        """Return the counters as a dict."""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "disk_hits": self.disk_hits,
+            }
+
+
+class SingleFlight:
+    """
+    Make sure only one lookup per key runs at a time.
+
+    If a thread asks for a key that another thread is already looking up,
+    it waits for that result instead of calling the API again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> _Call in progress
+
+    def do(self, key, function):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function()
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
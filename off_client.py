@@ -0,0 +1,174 @@
+
+# OpenFoodFacts HTTP client
+#
+# - one shared requests.Session, so connections are kept alive and reused
+# - a sized connection pool (one pool per host)
+# - separate connect and read timeouts
+# - retries with jittered exponential backoff for transient errors
+# - a circuit breaker: after several failures in a row we stop calling the
+#   API for a while and fail fast, then let one "probe" request through
+
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+DEFAULT_BASE_URL = "https://world.openfoodfacts.org"
+
+# HTTP status codes worth retrying
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+
+class CircuitOpenError(Exception):
+    """Raised when the circuit breaker is open and the call is skipped."""
+
+
+class CircuitBreaker:
+    """
+    Three states:
+    - "closed":    calls go through; failures are counted
+    - "open":      calls fail fast until reset_timeout has passed
+    - "half-open": one probe call goes through; success closes the
+                   circuit, failure opens it again
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == "open" and self._clock() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return self._state
+
+    def before_call(self):
+        """Raise CircuitOpenError if the call should not be made."""
+        with self._lock:
+            if self._state == "closed":
+                return
+            if self._state == "open":
+                if self._clock() - self._opened_at < self.reset_timeout:
+                    raise CircuitOpenError("OpenFoodFacts circuit is open")
+                self._state = "half-open"
+                self._probing = False
+            # half-open: only one probe at a time
+            if self._probing:
+                raise CircuitOpenError("OpenFoodFacts circuit is half-open, probe in progress")
+            self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            self._state = "closed"
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == "half-open" or self._failures >= self.failure_threshold:
+                self._state = "open"
+                self._opened_at = self._clock()
+            self._probing = False
+
+
+class OpenFoodFactsClient:
+    """Look up products on OpenFoodFacts by barcode."""
+
+    def __init__(
+        self,
+        base_url=DEFAULT_BASE_URL,
+        pool_size=10,
+        connect_timeout=3.05,
+        read_timeout=5.0,
+        retries=2,
+        backoff=0.2,
+        breaker=None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _sleep_before_retry(self, attempt):
+        # "full jitter": a random wait between 0 and backoff * 2^attempt
+        time.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+
+    def _get(self, url):
+        """
+        GET with retries. Return the response, or None if every attempt
+        failed with a network error or a transient status code.
+        """
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self._sleep_before_retry(attempt - 1)
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+            except requests.RequestException:
+                continue
+            if response.status_code in RETRY_STATUSES:
+                continue
+            return response
+        return None
+
+    def fetch_product(self, barcode):
+        """
+        Return a dict with product_name, brands and ingredients_text,
+        or None if the product is not found, the API fails, or the
+        circuit breaker is open.
+        """
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            return None
+
+        # endpoint for product by barcode
+        response = self._get(f"{self.base_url}/api/v0/product/{barcode}.json")
+        if response is None or response.status_code >= 500:
+            self.breaker.record_failure()
+            return None
+
+        # the API answered, so it is up (even if the product is missing)
+        self.breaker.record_success()
+
+        if response.status_code != 200:
+            # Bad HTTP status
+            return None
+
+        try:
+            data = response.json()
+        except ValueError:
+            return None
+
+        # OpenFoodFacts uses "status" 1 when product is found
+        if data.get("status") != 1:
+            return None
+
+        product = data.get("product", {})
+
+        # only pick basic fields
+        return {
+            "product_name": product.get("product_name"),
+            "brands": product.get("brands"),
+            "ingredients_text": product.get("ingredients_text"),
+        }
+
+    def close(self):
+        self.session.close()
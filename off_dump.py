@@ -0,0 +1,283 @@
+
+# Offline OpenFoodFacts lookups from a bulk export
+#
+# OpenFoodFacts publishes its whole database as a gzip JSONL or CSV file
+# (several GB). build_index() streams it once, keeps only the fields the
+# app uses, and writes a compact file with the products sorted by
+# barcode. DumpIndex memory-maps that file and finds a barcode with a
+# binary search, so a lookup takes microseconds and the OS only pages in
+# the parts that are read.
+#
+# Building runs in constant memory (an external merge sort): the dump is
+# read in runs of `run_size` products, each run is sorted and written to
+# a temporary file, and the runs are merged into the index.
+#
+# File layout (little endian):
+#   header   magic "OFFIDX01", product count (u64), index offset (u64),
+#            key size (u32)
+#   records  one JSON array [product_name, brands, ingredients_text] per
+#            product, in barcode order
+#   index    one entry per product, sorted: barcode padded with zero
+#            bytes to KEY_SIZE, record offset (u64), record length (u32)
+#
+# Build one with:
+#   python off_dump.py openfoodfacts-products.jsonl.gz off.idx
+# and point OFF_DUMP_INDEX at off.idx.
+
+import argparse
+import csv
+import gzip
+import heapq
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+
+# Fields kept from each product (what off_client.fetch_product returns)
+FIELDS = ("product_name", "brands", "ingredients_text")
+
+MAGIC = b"OFFIDX01"
+HEADER = struct.Struct("<8sQQI")
+# longer barcodes are skipped; real ones are 8 to 14 digits
+KEY_SIZE = 24
+ENTRY = struct.Struct(f"<{KEY_SIZE}sQI")
+
+# products sorted in memory at once while building
+DEFAULT_RUN_SIZE = 100_000
+
+# JSON lines are parsed straight from bytes (no text decoding step)
+if orjson is not None:
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+else:
+    _loads = json.loads
+
+    def _dumps(value):
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _open(path, binary):
+    opener = gzip.open if path.endswith(".gz") else open
+    if binary:
+        return opener(path, "rb")
+    return opener(path, "rt", encoding="utf-8", errors="replace", newline="")
+
+
+def read_products(path):
+    """
+    Yield (barcode, [product_name, brands, ingredients_text]) for every
+    product of a JSONL or CSV (tab or comma separated) dump, gzipped or not.
+    Lines that cannot be parsed are skipped.
+    """
+    name = path[:-3] if path.endswith(".gz") else path
+    if name.endswith((".csv", ".tsv")):
+        with _open(path, binary=False) as file:
+            yield from _read_csv(file)
+    else:
+        with _open(path, binary=True) as file:
+            yield from _read_jsonl(file)
+
+
+def _read_jsonl(file):
+    for line in file:
+        try:
+            product = _loads(line)
+        except ValueError:  # orjson.JSONDecodeError is a ValueError too
+            continue
+        if isinstance(product, dict):
+            yield product.get("code"), [product.get(field) for field in FIELDS]
+
+
+def _read_csv(file):
+    # the OpenFoodFacts CSV is tab separated and has very long fields
+    csv.field_size_limit(sys.maxsize)
+    header = file.readline()
+    delimiter = "\t" if "\t" in header else ","
+    columns = next(csv.reader([header], delimiter=delimiter))
+    # the tab separated export does not quote fields
+    quoting = csv.QUOTE_NONE if delimiter == "\t" else csv.QUOTE_MINIMAL
+    reader = csv.DictReader(file, fieldnames=columns, delimiter=delimiter, quoting=quoting)
+    for row in reader:
+        # empty cells mean "no value", like a missing key in the API
+        yield row.get("code"), [row.get(field) or None for field in FIELDS]
+
+
+def _key(barcode):
+    """Return the barcode as index key bytes, or None if it cannot be indexed."""
+    if not isinstance(barcode, str):
+        return None
+    key = barcode.strip().encode("utf-8")
+    if not key or len(key) > KEY_SIZE or b"\t" in key or b"\n" in key or b"\0" in key:
+        return None
+    return key
+
+
+def _write_run(run, directory):
+    # a run file has one "barcode<TAB>record" line per product, sorted;
+    # the sort is stable, so the first copy of a duplicate stays first
+    run.sort(key=lambda entry: entry[0])
+    file = tempfile.TemporaryFile(dir=directory)
+    file.writelines(key + b"\t" + record + b"\n" for key, record in run)
+    file.seek(0)
+    return file
+
+
+def _read_run(file):
+    for line in file:
+        key, _, record = line.rstrip(b"\n").partition(b"\t")
+        yield key, record
+
+
+def build_index(source, output, run_size=DEFAULT_RUN_SIZE, temp_dir=None):
+    """
+    Build the index file `output` from the dump `source`.
+    Return {"products": written, "duplicates": ..., "skipped": ...}.
+    """
+    directory = temp_dir or os.path.dirname(os.path.abspath(output))
+    runs = []
+    run = []
+    skipped = 0
+    try:
+        for barcode, values in read_products(source):
+            key = _key(barcode)
+            if key is None:
+                skipped += 1
+                continue
+            try:
+                record = _dumps(values)
+            except TypeError:
+                # e.g. a number too big for orjson where text was expected
+                skipped += 1
+                continue
+            run.append((key, record))
+            if len(run) >= run_size:
+                runs.append(_write_run(run, directory))
+                run = []
+        if run:
+            runs.append(_write_run(run, directory))
+        del run
+
+        count, duplicates = _merge_runs(runs, output, directory)
+    finally:
+        for file in runs:
+            file.close()
+    return {"products": count, "duplicates": duplicates, "skipped": skipped}
+
+
+def _merge_runs(runs, output, directory):
+    # write to a temporary name and rename at the end, so a running app
+    # never sees a half-written index
+    partial = output + ".tmp"
+    count = 0
+    duplicates = 0
+    previous = None
+    with open(partial, "wb") as out, tempfile.TemporaryFile(dir=directory) as index:
+        out.write(HEADER.pack(MAGIC, 0, 0, KEY_SIZE))
+        offset = HEADER.size
+        # heapq.merge keeps runs in order for equal keys, so the first
+        # copy of a barcode in the dump wins
+        for key, record in heapq.merge(*(_read_run(file) for file in runs), key=lambda entry: entry[0]):
+            if key == previous:
+                duplicates += 1
+                continue
+            previous = key
+            out.write(record)
+            index.write(ENTRY.pack(key, offset, len(record)))
+            offset += len(record)
+            count += 1
+
+        index.seek(0)
+        shutil.copyfileobj(index, out)
+        out.seek(0)
+        out.write(HEADER.pack(MAGIC, count, offset, KEY_SIZE))
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(partial, output)
+    return count, duplicates
+
+
+class DumpIndex:
+    """Read-only barcode lookups in a file made by build_index()."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            # the mapping stays valid after the file is closed
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count, self._index_offset, key_size = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or key_size != KEY_SIZE:
+            self._map.close()
+            raise ValueError(f"{path} is not an OpenFoodFacts dump index")
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return self._count
+
+    def get(self, barcode):
+        """Return {product_name, brands, ingredients_text} or None if the barcode is not in the dump."""
+        key = _key(barcode)
+        if key is None:
+            self.misses += 1
+            return None
+        key = key.ljust(KEY_SIZE, b"\0")
+
+        # binary search over the fixed-size index entries; slicing the
+        # mmap only touches the pages that are read
+        data = self._map
+        base = self._index_offset
+        size = ENTRY.size
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            position = base + middle * size
+            if data[position:position + KEY_SIZE] < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        if low < self._count:
+            found, offset, length = ENTRY.unpack_from(data, base + low * size)
+            if found == key:
+                self.hits += 1
+                return dict(zip(FIELDS, _loads(data[offset:offset + length])))
+        self.misses += 1
+        return None
+
+    def stats(self):
+        return {"products": self._count, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        self._map.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build an offline barcode index from an OpenFoodFacts dump.")
+    parser.add_argument("source", help="dump file: .jsonl, .csv or .tsv, optionally .gz")
+    parser.add_argument("output", help="index file to write")
+    parser.add_argument("--run-size", type=int, default=DEFAULT_RUN_SIZE,
+                        help="products sorted in memory at once")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    result = build_index(args.source, args.output, run_size=args.run_size)
+    seconds = time.perf_counter() - start
+    print(
+        f"{result['products']} products in {seconds:.1f} s "
+        f"({result['duplicates']} duplicates, {result['skipped']} without a usable barcode)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+
+# Local stand-in for the OpenFoodFacts API, used by tests and benchmarks
+#
+# Serves GET /api/v0/product/<barcode>.json on 127.0.0.1 with HTTP/1.1
+# keep-alive, so it behaves like the real API for connection reuse.
+#
+#   with StubServer(products={"123": {"product_name": "Milk"}}) as stub:
+#       client = OpenFoodFactsClient(base_url=stub.url)
+
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+PRODUCT_PATH = re.compile(r"^/api/v0/product/([^/]+)\.json$")
+
+
+class StubServer:
+    """
+    A tiny threaded HTTP server that answers like OpenFoodFacts.
+
+    - products: barcode -> product dict (unknown barcodes get status 0)
+    - delay: seconds to wait before every answer (a slow upstream)
+    - fail_next: list of HTTP status codes to return for the next requests
+    - down: when True every request gets a 503
+    """
+
+    def __init__(self, products=None, delay=0.0):
+        self.products = dict(products or {})
+        self.delay = delay
+        self.fail_next = []
+        self.down = False
+
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # send small answers right away (no Nagle delay on keep-alive)
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests += 1
+                    status = stub.fail_next.pop(0) if stub.fail_next else None
+
+                if stub.delay:
+                    time.sleep(stub.delay)
+
+                if stub.down:
+                    status = 503
+
+                match = PRODUCT_PATH.match(self.path)
+                if status is None and match is None:
+                    status = 404
+
+                if status is not None:
+                    self._send(status, {"status": 0})
+                    return
+
+                product = stub.products.get(match.group(1))
+                if product is None:
+                    self._send(200, {"status": 0, "status_verbose": "product not found"})
+                else:
+                    self._send(200, {"status": 1, "product": product})
+
+            def _send(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                # keep test output quiet
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,144 @@
+
+# On-demand profiling for a running server
+#
+# Off by default. When it is on, a fraction of the requests (sample_rate)
+# run under cProfile and the stats are added up per route, so a slow
+# route can be found on a live instance without attaching a profiler.
+# tracemalloc can be turned on too, to see which lines allocate the most
+# memory. It slows everything down a lot, so it has its own switch.
+#
+# When profiling is off, a request only pays one attribute check.
+
+import cProfile
+import io
+import marshal
+import pstats
+import random
+import threading
+import tracemalloc
+
+
+SORT_KEYS = ("cumulative", "tottime", "calls", "ncalls", "time", "filename", "name")
+
+
+class Profiler:
+    """Sampled per-route cProfile stats and tracemalloc snapshots."""
+
+    def __init__(self, enabled=False, sample_rate=0.01, traceback_frames=10):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.traceback_frames = traceback_frames
+
+        self._lock = threading.Lock()
+        self._stats = {}  # route -> pstats.Stats with every sampled request added up
+        self._samples = {}  # route -> number of profiled requests
+        self._last_snapshot = None
+
+    # cProfile
+
+    def start(self):
+        """Return a running cProfile.Profile for this request, or None if it is not sampled."""
+        if not self.enabled or random.random() >= self.sample_rate:
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # another profiler is already running in this thread
+            return None
+        return profile
+
+    def finish(self, route, profile):
+        """Stop the profile and add it to the stats of the route."""
+        profile.disable()
+        with self._lock:
+            stats = self._stats.get(route)
+            if stats is None:
+                self._stats[route] = pstats.Stats(profile)
+            else:
+                stats.add(profile)
+            self._samples[route] = self._samples.get(route, 0) + 1
+
+    def routes(self):
+        """Return {route: number of profiled requests}."""
+        with self._lock:
+            return dict(self._samples)
+
+    def _combined(self, route):
+        # caller holds _lock; None when nothing was profiled
+        if route is not None:
+            return self._stats.get(route)
+        if not self._stats:
+            return None
+        combined = pstats.Stats()
+        for stats in self._stats.values():
+            combined.add(stats)
+        return combined
+
+    def report(self, route=None, sort="cumulative", limit=30):
+        """Text report for one route (or every route), like pstats print_stats."""
+        if sort not in SORT_KEYS:
+            raise ValueError(f"sort must be one of {', '.join(SORT_KEYS)}")
+        with self._lock:
+            stats = self._combined(route)
+            if stats is None:
+                return None
+            stream = io.StringIO()
+            # print_stats writes to the stream the Stats object was made with
+            stats.stream = stream
+            stats.sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+    def dump(self, route=None):
+        """The stats in the .pstats file format (load with pstats.Stats(path))."""
+        with self._lock:
+            stats = self._combined(route)
+            if stats is None:
+                return None
+            return marshal.dumps(stats.stats)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._samples.clear()
+            self._last_snapshot = None
+
+    # tracemalloc
+
+    @property
+    def tracing_memory(self):
+        return tracemalloc.is_tracing()
+
+    def set_tracemalloc(self, on):
+        if on and not tracemalloc.is_tracing():
+            tracemalloc.start(self.traceback_frames)
+        elif not on and tracemalloc.is_tracing():
+            tracemalloc.stop()
+            with self._lock:
+                self._last_snapshot = None
+
+    def memory_report(self, limit=20, key="lineno"):
+        """
+        Text list of the lines that hold the most memory, and how much each
+        one grew since the previous report. None if tracemalloc is off.
+        """
+        if not tracemalloc.is_tracing():
+            return None
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        with self._lock:
+            previous, self._last_snapshot = self._last_snapshot, snapshot
+
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"traced memory: {current / 1e6:.1f} MB now, {peak / 1e6:.1f} MB peak", ""]
+        lines.append(f"top {limit} by size:")
+        for stat in snapshot.statistics(key)[:limit]:
+            lines.append(f"  {stat}")
+        if previous is not None:
+            lines.append("")
+            lines.append(f"top {limit} by growth since the last report:")
+            for stat in snapshot.compare_to(previous, key)[:limit]:
+                lines.append(f"  {stat}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,196 @@
+# Price and stock ranges for GET /inventory
+#
+# RangeIndex listens to the memory store and keeps two sorted indexes of
+# (price, id) and (stock, id). A query like "price between 2 and 5,
+# cheapest first" finds the start with a binary search and then reads
+# only the items it returns, O(log n + k), instead of sorting every item.
+# Only adds, deletes and updates that change price or stock touch the
+# indexes.
+#
+# - min_* / max_* bounds are inclusive
+# - sort is "price", "stock", "-price" or "-stock" (highest first); ties
+#   go by id, in the same direction
+# - without sort, results come in the order of the filtered field
+#   (price when both are filtered), lowest first
+# - items whose price (or stock) is not a number are left out of price
+#   (stock) filters and sorts
+# - pages resume after the (value, id) key of the last item of the
+#   previous page (range_key), so items added, deleted or moved in the
+#   meantime never make a client skip or repeat the others
+#
+# scan_range() answers the same query by looking at every item. It is
+# used when other filters (barcode, brand, name prefix) already narrowed
+# the items down, and as the baseline in the benchmark.
+#
+# The SQLite store does the same with indexes on its price and stock
+# columns (see sqlite_store.py).
+
+import math
+import threading
+
+from store import SortedIndex
+
+
+RANGE_FIELDS = ("price", "stock")
+SORT_ORDERS = ("price", "-price", "stock", "-stock")
+
+
+def range_value(value):
+    """Return value if it is a finite number (not a bool), else None."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value):
+        return value
+    return None
+
+
+def _bounds(min_price, max_price, min_stock, max_stock):
+    # field -> (low, high), only for fields that have a bound
+    bounds = {}
+    if min_price is not None or max_price is not None:
+        bounds["price"] = (min_price, max_price)
+    if min_stock is not None or max_stock is not None:
+        bounds["stock"] = (min_stock, max_stock)
+    return bounds
+
+
+def _sort_order(sort, bounds):
+    """Return (field, descending) of the order the results come in."""
+    if sort is not None:
+        return sort.lstrip("-"), sort.startswith("-")
+    return ("price" if "price" in bounds else "stock"), False
+
+
+def _inside(value, bound):
+    low, high = bound
+    return value is not None and (low is None or value >= low) and (high is None or value <= high)
+
+
+def range_key(item, min_price=None, max_price=None, min_stock=None, max_stock=None, sort=None):
+    """Return the (value, id) key that orders item in this query (what `after` takes)."""
+    field, _ = _sort_order(sort, _bounds(min_price, max_price, min_stock, max_stock))
+    return range_value(item["product"].get(field)), item["id"]
+
+
+def scan_range(items, min_price=None, max_price=None, min_stock=None, max_stock=None, sort=None, after=None):
+    """Filter and sort a list of items the slow way (every item is checked)."""
+    bounds = _bounds(min_price, max_price, min_stock, max_stock)
+    field, descending = _sort_order(sort, bounds)
+    bounds.setdefault(field, (None, None))
+
+    matches = []
+    for item in items:
+        product = item["product"]
+        values = {name: range_value(product.get(name)) for name in bounds}
+        if all(_inside(values[name], bound) for name, bound in bounds.items()):
+            key = (values[field], item["id"])
+            if after is None or (key < after if descending else key > after):
+                matches.append((key, item))
+    matches.sort(key=lambda match: match[0], reverse=descending)
+    return [item for _, item in matches]
+
+
+class RangeIndex:
+    """Sorted price and stock indexes for an InventoryStore."""
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+
+        self._indexes = {field: SortedIndex() for field in RANGE_FIELDS}  # field -> (value, id)
+        # id -> {field: value} last indexed, to find the old entry on change
+        self._values = {}
+
+        store.follow(self._on_change)
+
+    def _on_change(self, event, item, changes):
+        if event == "update" and not any(field in changes for field in RANGE_FIELDS):
+            # name, brand... changes do not move the item in the indexes
+            return
+        with self._lock:
+            if event == "clear":
+                for index in self._indexes.values():
+                    index.clear()
+                self._values.clear()
+                return
+            if event == "add":
+                self._values[item["id"]] = {}
+                self._move(item, RANGE_FIELDS)
+            elif event == "update":
+                self._move(item, changes)
+            else:
+                self._remove(item["id"])
+
+    def _move(self, item, changed):
+        # re-key only the fields that changed
+        item_id = item["id"]
+        values = self._values.get(item_id)
+        if values is None:
+            return
+        for field in RANGE_FIELDS:
+            if field not in changed:
+                continue
+            old = values.pop(field, None)
+            if old is not None:
+                self._indexes[field].remove((old, item_id))
+            value = range_value(item["product"].get(field))
+            if value is not None:
+                self._indexes[field].add((value, item_id))
+                values[field] = value
+
+    def _remove(self, item_id):
+        values = self._values.pop(item_id, None)
+        if values is None:
+            return
+        for field, value in values.items():
+            self._indexes[field].remove((value, item_id))
+
+    def range_keys(self, min_price=None, max_price=None, min_stock=None, max_stock=None,
+                   sort=None, limit=None, after=None):
+        """
+        Return the (value, id) keys of the items inside every given bound,
+        in `sort` order, starting after the key `after` (None: from the
+        start) and at most `limit` of them (None means no limit).
+        """
+        bounds = _bounds(min_price, max_price, min_stock, max_stock)
+        field, descending = _sort_order(sort, bounds)
+        low, high = bounds.pop(field, (None, None))
+        index = self._indexes[field]
+
+        with self._lock:
+            # walk the sorted field from the first key inside its bound
+            # (or after `after`) and stop at the first one past it
+            if descending:
+                stop = (math.inf if high is None else high, math.inf)
+                if after is not None and after < stop:
+                    stop = after
+                entries = index.irange_reverse(stop)
+            else:
+                start = (-math.inf if low is None else low,)
+                if after is not None and after > start:
+                    start = after
+                entries = index.irange(start)
+
+            keys = []
+            for key in entries:
+                value, item_id = key
+                if (high is not None and value > high) or (low is not None and value < low):
+                    break
+                if key == after:
+                    continue
+                # the other field's bound is checked item by item
+                if bounds and not all(
+                    _inside(self._values[item_id].get(name), bound) for name, bound in bounds.items()
+                ):
+                    continue
+                if limit is not None and len(keys) >= limit:
+                    break
+                keys.append(key)
+        return keys
+
+    def range_query(self, min_price=None, max_price=None, min_stock=None, max_stock=None,
+                    sort=None, limit=None, after=None, fields=None):
+        """
+        Return the items of range_keys() with the same arguments. fields
+        works like in InventoryStore.get.
+        """
+        keys = self.range_keys(min_price, max_price, min_stock, max_stock, sort, limit, after)
+        return self.store.get_many([item_id for _, item_id in keys], fields)
@@ -0,0 +1,300 @@
+
+# Full-text search over product_name, brands and ingredients_text
+#
+# SearchIndex listens to the memory store and keeps an inverted index:
+# term -> the ids of the items that contain it. Every add, update and
+# delete changes only the terms of that one item, so the index is never
+# rebuilt.
+#
+# - tokens are runs of letters and digits, case folded, with accents
+#   removed ("Crème" -> "creme")
+# - every word of the query must match (AND), and a word matches every
+#   term that starts with it ("almond" finds "almonds")
+# - results are ranked with BM25, best first, ties by id; each query word
+#   counts with its best matching term
+#
+# The SQLite store does the same with an FTS5 table (see sqlite_store.py).
+
+import heapq
+import math
+import re
+import sys
+import threading
+import unicodedata
+
+from store import SortedIndex
+
+
+# Fields that are searched
+SEARCH_FIELDS = ("product_name", "brands", "ingredients_text")
+
+# BM25 settings (the usual defaults)
+K1 = 1.2
+B = 0.75
+
+# A short query word like "a" could match thousands of terms; only the
+# first ones (in sorted order) are used
+MAX_PREFIX_TERMS = 50
+
+TOKEN = re.compile(r"[^\W_]+")
+
+
+def tokenize(text):
+    """Split text into case-folded words without accents."""
+    text = str(text).casefold()
+    if not text.isascii():
+        # "é" -> "e" + accent, then drop the accent
+        text = "".join(
+            char for char in unicodedata.normalize("NFKD", text) if not unicodedata.combining(char)
+        )
+    return TOKEN.findall(text)
+
+
+def product_tokens(product):
+    tokens = []
+    for field in SEARCH_FIELDS:
+        value = product.get(field)
+        if value:
+            tokens.extend(tokenize(value))
+    return tokens
+
+
+class SearchIndex:
+    """Inverted index over the items of an InventoryStore."""
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+
+        self._term_ids = {}  # term -> set of ids of the items with it
+        # term -> {(count, length): set of ids}
+        # The BM25 score of a term in an item only depends on how many
+        # times the term is in the item and how long the item is, so the
+        # items in one group all have the same score for that term.
+        self._groups = {}
+        self._terms = SortedIndex()  # every term, for prefix matching
+        self._documents = {}  # id -> (length, terms, counts), to undo it on change
+        self._total_length = 0
+
+        store.follow(self._on_change)
+
+    def __len__(self):
+        return len(self._documents)
+
+    def _on_change(self, event, item, changes):
+        if event == "update" and not any(field in changes for field in SEARCH_FIELDS):
+            # price and stock changes do not touch the index
+            return
+        with self._lock:
+            if event == "clear":
+                self._term_ids.clear()
+                self._groups.clear()
+                self._terms.clear()
+                self._documents.clear()
+                self._total_length = 0
+                return
+            if event in ("update", "delete"):
+                self._remove(item["id"])
+            if event in ("add", "update"):
+                self._add(item)
+
+    def _add(self, item):
+        item_id = item["id"]
+        tokens = product_tokens(item["product"])
+        length = len(tokens)
+
+        counts = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+
+        terms = []
+        for term, count in counts.items():
+            # intern so every item with this word shares one string
+            term = sys.intern(term)
+            ids = self._term_ids.get(term)
+            if ids is None:
+                ids = self._term_ids[term] = set()
+                self._groups[term] = {}
+                self._terms.add(term)
+            ids.add(item_id)
+            self._groups[term].setdefault((count, length), set()).add(item_id)
+            terms.append(term)
+
+        self._documents[item_id] = (length, tuple(terms), tuple(counts.values()))
+        self._total_length += length
+
+    def _remove(self, item_id):
+        document = self._documents.pop(item_id, None)
+        if document is None:
+            return
+        length, terms, counts = document
+        self._total_length -= length
+
+        for term, count in zip(terms, counts):
+            groups = self._groups[term]
+            group = groups[(count, length)]
+            group.discard(item_id)
+            if not group:
+                del groups[(count, length)]
+
+            ids = self._term_ids[term]
+            ids.discard(item_id)
+            # drop terms no item uses any more
+            if not ids:
+                del self._term_ids[term]
+                del self._groups[term]
+                self._terms.remove(term)
+
+    def _expand(self, word):
+        """Return the terms that start with word (at most MAX_PREFIX_TERMS)."""
+        terms = []
+        for term in self._terms.irange(word):
+            if not term.startswith(word) or len(terms) >= MAX_PREFIX_TERMS:
+                break
+            terms.append(term)
+        return terms
+
+    def search(self, query, limit=20, offset=0):
+        """
+        Return the items ranked offset .. offset + limit - 1 for the query,
+        best first.
+        """
+        with self._lock:
+            ranked = self._rank(query, offset + limit)
+        return self.store.get_many([item_id for score, item_id in ranked[offset:]])
+
+    def _rank(self, query, count):
+        """Return the best `count` matches as [(score, id), ...], best first."""
+        words = list(dict.fromkeys(tokenize(query)))
+        if not words or not self._documents or count < 1:
+            return []
+
+        word_terms = [self._expand(word) for word in words]
+        if not all(word_terms):
+            return []
+
+        document_count = len(self._documents)
+        average_length = self._total_length / document_count
+        idfs = {}
+        for found in word_terms:
+            for term in found:
+                frequency = len(self._term_ids[term])
+                idfs[term] = math.log(1 + (document_count - frequency + 0.5) / (frequency + 0.5))
+
+        def term_score(term, term_count, length):
+            norm = K1 * (1 - B + B * length / average_length)
+            return idfs[term] * term_count * (K1 + 1) / (term_count + norm)
+
+        # term -> the words it matches ("mil" and "milk" both match "milk")
+        term_words = {}
+        for index, found in enumerate(word_terms):
+            for term in found:
+                term_words.setdefault(term, []).append(index)
+
+        def score_item(item_id):
+            # for each word the BM25 score of its best matching term, added up
+            length, item_terms, counts = self._documents[item_id]
+            word_scores = [0.0] * len(words)
+            for term, term_count in zip(item_terms, counts):
+                indexes = term_words.get(term)
+                if indexes is None:
+                    continue
+                score = term_score(term, term_count, length)
+                for index in indexes:
+                    if score > word_scores[index]:
+                        word_scores[index] = score
+            return sum(word_scores)
+
+        best = []  # min-heap of (score, -id): the results so far
+
+        def offer(score, item_id):
+            entry = (score, -item_id)
+            if len(best) < count:
+                heapq.heappush(best, entry)
+            elif entry > best[0]:
+                heapq.heapreplace(best, entry)
+
+        candidates = None
+        if len(words) > 1:
+            candidates = self._matching_ids(word_terms)
+            if len(candidates) <= count * 20:
+                # few matches: just score them all
+                for item_id in candidates:
+                    offer(score_item(item_id), item_id)
+                return sorted(((score, -negative_id) for score, negative_id in best), key=rank_key)
+
+        self._walk_groups(word_terms, candidates, term_score, score_item, offer, best, count)
+        return sorted(((score, -negative_id) for score, negative_id in best), key=rank_key)
+
+    def _matching_ids(self, word_terms):
+        """Return the ids of the items that match every word."""
+        # start with the rarest word so the sets stay small; the set
+        # operations run in C
+        word_terms = sorted(
+            word_terms, key=lambda found: sum(len(self._term_ids[term]) for term in found)
+        )
+        first, rest = word_terms[0], word_terms[1:]
+
+        matches = []
+        for term in first:
+            ids = self._term_ids[term]
+            for found in rest:
+                if len(found) == 1:
+                    ids = ids & self._term_ids[found[0]]
+                else:
+                    ids = set().union(*(ids & self._term_ids[other] for other in found))
+                if not ids:
+                    break
+            matches.append(ids)
+        return set().union(*matches)
+
+    def _walk_groups(self, word_terms, candidates, term_score, score_item, offer, best, count):
+        # Walk the groups of every word from the best score down and stop
+        # as soon as no unseen item can beat the results we have (the
+        # "threshold algorithm"), so common words do not score every item.
+        lists = []
+        for found in word_terms:
+            scored = [
+                (term_score(term, term_count, length), ids)
+                for term in found
+                for (term_count, length), ids in self._groups[term].items()
+            ]
+            scored.sort(key=lambda entry: entry[0], reverse=True)
+            lists.append(scored)
+        positions = [0] * len(lists)
+        seen = set()
+
+        while True:
+            bounds = [
+                scored[position][0] if position < len(scored) else 0.0
+                for scored, position in zip(lists, positions)
+            ]
+            # an item we have not seen yet scores at most sum(bounds)
+            if len(best) >= count and best[0][0] > sum(bounds):
+                return
+            index = max(range(len(bounds)), key=bounds.__getitem__)
+            if positions[index] >= len(lists[index]):
+                return
+            score, ids = lists[index][positions[index]]
+            positions[index] += 1
+
+            if candidates is not None:
+                ids = ids & candidates
+            found = ids - seen
+            seen |= found
+
+            if candidates is None:
+                # one word: the first group an item shows up in has its
+                # best term, so that is its score. All items of the group
+                # have the same score, so only the lowest ids can make it.
+                for item_id in heapq.nsmallest(count, found):
+                    offer(score, item_id)
+            else:
+                for item_id in found:
+                    offer(score_item(item_id), item_id)
+
+
+def rank_key(entry):
+    # best score first, then lowest id
+    score, item_id = entry
+    return (-score, item_id)
@@ -0,0 +1,181 @@
+
+# Cache of already-encoded JSON for the read routes
+#
+# GET /inventory used to run jsonify() over every item on every request.
+# Here we keep the encoded bytes of each item ("fragments") and only
+# re-encode an item after it changes. List bodies are put together from
+# the fragments, and the full list body is kept until the store changes.
+#
+# The output is byte-for-byte what Flask's jsonify() gives with its
+# default settings: sorted keys, compact separators, ASCII only, and a
+# trailing newline.
+#
+# If orjson is installed it is used to encode items, except for values
+# where its output would differ from the stdlib (non-ASCII text or DEL,
+# very large/small floats, NaN, big ints); those items use the stdlib
+# encoder.
+
+import json
+import math
+import threading
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+
+_stdlib_encode = json.JSONEncoder(ensure_ascii=True, sort_keys=True, separators=(",", ":")).encode
+
+
+def encode_stdlib(value):
+    return _stdlib_encode(value).encode("ascii")
+
+
+def _same_as_stdlib(value):
+    """True if orjson encodes value exactly like the stdlib encoder."""
+    if isinstance(value, float):
+        # Python switches to exponent notation outside this range, orjson
+        # formats those numbers differently, and NaN/inf are not JSON
+        if not math.isfinite(value):
+            return False
+        return value == 0 or 1e-4 <= abs(value) < 1e16
+    if isinstance(value, dict):
+        return all(isinstance(key, str) and _same_as_stdlib(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return all(_same_as_stdlib(item) for item in value)
+    return True
+
+
+def encode_fast(value):
+    """Encode with orjson when that gives the same bytes, else with the stdlib."""
+    if orjson is not None and _same_as_stdlib(value):
+        try:
+            data = orjson.dumps(value, option=orjson.OPT_SORT_KEYS)
+        except TypeError:
+            # e.g. integers too big for 64 bits
+            return encode_stdlib(value)
+        # orjson leaves DEL (U+007F) as it is, the stdlib writes \u007f
+        if data.isascii() and b"\x7f" not in data:
+            return data
+    return encode_stdlib(value)
+
+
+# How many different ?fields= lists keep a cached full list body
+MAX_PROJECTIONS = 8
+
+
+class ResponseCache:
+    """
+    Encoded JSON for the items of a store.
+
+    Each fragment is saved with the item version it was built from, so a
+    fragment is reused only while the item is unchanged. The store must
+    have item_version(), get_versioned(), item_ids() and subscribe()
+    (the memory InventoryStore).
+    """
+
+    def __init__(self, store, encode=encode_fast):
+        self.store = store
+        self.encode = encode
+
+        self._fragments = {}  # id -> (item version, bytes)
+        self._list_body = None  # (store version, bytes)
+        # fields tuple -> (store version, bytes), for GET /inventory?fields=
+        self._projected_bodies = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+        store.subscribe(self._on_change)
+
+    def _on_change(self, event, item, changes):
+        # changed items are noticed through their version; we only need to
+        # forget items that are gone so the cache does not grow forever
+        if event == "delete":
+            self._fragments.pop(item["id"], None)
+        elif event == "clear":
+            self._fragments.clear()
+
+    def fragment(self, item):
+        """Return the encoded bytes of one item."""
+        return self.fragment_by_id(item["id"], item)
+
+    def fragment_by_id(self, item_id, item=None):
+        """
+        Return the encoded bytes of the item with this id.
+
+        On a miss the item is read again together with its version, so the
+        saved bytes always match the saved version. "item" is only used
+        when the item is gone from the store; without it the result is
+        None for a deleted item.
+        """
+        version = self.store.item_version(item_id)
+        cached = self._fragments.get(item_id)
+        if cached is not None and cached[0] == version:
+            self.hits += 1
+            return cached[1]
+
+        self.misses += 1
+        current, version = self.store.get_versioned(item_id)
+        if current is None:
+            return None if item is None else self.encode(item)
+        data = self.encode(current)
+        if version is not None:
+            self._fragments[item_id] = (version, data)
+        return data
+
+    def item_body(self, item):
+        """Body for GET /inventory/<id>."""
+        return self.fragment(item) + b"\n"
+
+    def list_body(self, items):
+        """Body for a JSON list of items."""
+        return b"[" + b",".join(self.fragment(item) for item in items) + b"]\n"
+
+    def full_list_body(self):
+        """Body for GET /inventory, rebuilt only after the store changed."""
+        version = self.store.version
+        with self._lock:
+            cached = self._list_body
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        # work from the ids: items are only turned into dicts on a miss
+        fragments = (self.fragment_by_id(item_id) for item_id in self.store.item_ids())
+        body = b"[" + b",".join(fragment for fragment in fragments if fragment is not None) + b"]\n"
+        # only keep it if nothing changed while it was being built
+        if self.store.version == version:
+            with self._lock:
+                self._list_body = (version, body)
+        return body
+
+    def projected_list_body(self, fields):
+        """
+        Body for GET /inventory?fields=..., rebuilt only after the store
+        changed. Only the asked keys are ever copied (store.all(fields)).
+        """
+        version = self.store.version
+        with self._lock:
+            cached = self._projected_bodies.get(fields)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        body = self.encode(self.store.all(fields)) + b"\n"
+        if self.store.version == version:
+            with self._lock:
+                if fields not in self._projected_bodies and len(self._projected_bodies) >= MAX_PROJECTIONS:
+                    # forget the oldest field list
+                    del self._projected_bodies[next(iter(self._projected_bodies))]
+                self._projected_bodies[fields] = (version, body)
+        return body
+
+    def page_body(self, items, next_cursor):
+        """Body for a page: {"items": [...], "next_cursor": ...}."""
+        fragments = b",".join(self.fragment(item) for item in items)
+        cursor = encode_stdlib(next_cursor)
+        return b'{"items":[' + fragments + b'],"next_cursor":' + cursor + b"}\n"
+
+    def stats(self):
+        return {"fragments": len(self._fragments), "hits": self.hits, "misses": self.misses}
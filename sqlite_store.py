@@ -0,0 +1,638 @@
+
+# SQLite inventory store
+#
+# Same methods as InventoryStore (store.py), but the items live in a
+# SQLite database file, so they survive a restart and several processes
+# can share them.
+#
+# - WAL journal mode: readers do not block the writer
+# - one connection per thread, opened on first use and then reused
+# - the SQL strings are constants, so sqlite3 keeps them prepared in
+#   its statement cache
+# - the known product fields are real columns, any other key sent by
+#   PATCH is kept in the "extra" JSON column
+# - every write bumps a version counter in the "meta" table and stamps
+#   the changed row with it (used for ETags and If-Match)
+# - subscribe() works like InventoryStore.subscribe, but only hears about
+#   changes made by this process
+
+import json
+import math
+import sqlite3
+import threading
+import uuid
+
+from analytics import format_stats
+from search import tokenize
+from store import (
+    INDEXED_FIELDS,
+    MISSING,
+    InsufficientStockError,
+    VersionConflictError,
+    batch_failure_results,
+    brand_keys,
+    name_key,
+)
+
+
+# Product fields that have their own column
+PRODUCT_COLUMNS = ("product_name", "brands", "ingredients_text", "price", "stock", "barcode")
+# column -> its position in a row read with SELECT_COLUMNS
+COLUMN_INDEX = {column: index + 2 for index, column in enumerate(PRODUCT_COLUMNS)}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    status INTEGER NOT NULL DEFAULT 1,
+    product_name TEXT,
+    brands TEXT,
+    ingredients_text TEXT,
+    price REAL,
+    stock INTEGER,
+    barcode TEXT,
+    name_key TEXT NOT NULL DEFAULT '',
+    extra TEXT NOT NULL DEFAULT '{}',
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS items_barcode ON items (barcode);
+CREATE INDEX IF NOT EXISTS items_name_key ON items (name_key, id);
+CREATE INDEX IF NOT EXISTS items_stock ON items (COALESCE(stock, 0), id);
+CREATE INDEX IF NOT EXISTS items_price_range ON items (price, id);
+CREATE INDEX IF NOT EXISTS items_stock_range ON items (stock, id);
+CREATE TABLE IF NOT EXISTS item_brands (
+    brand TEXT NOT NULL,
+    item_id INTEGER NOT NULL REFERENCES items (id) ON DELETE CASCADE,
+    PRIMARY KEY (brand, item_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS item_brands_item ON item_brands (item_id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0);
+"""
+
+# Full-text index for search(), kept up to date by triggers on items.
+# unicode61 folds case and removes accents like search.tokenize().
+SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS items_search USING fts5 (
+    product_name, brands, ingredients_text,
+    content = 'items', content_rowid = 'id',
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS items_search_insert AFTER INSERT ON items BEGIN
+    INSERT INTO items_search (rowid, product_name, brands, ingredients_text)
+    VALUES (new.id, new.product_name, new.brands, new.ingredients_text);
+END;
+CREATE TRIGGER IF NOT EXISTS items_search_delete AFTER DELETE ON items BEGIN
+    INSERT INTO items_search (items_search, rowid, product_name, brands, ingredients_text)
+    VALUES ('delete', old.id, old.product_name, old.brands, old.ingredients_text);
+END;
+CREATE TRIGGER IF NOT EXISTS items_search_update
+AFTER UPDATE OF product_name, brands, ingredients_text ON items BEGIN
+    INSERT INTO items_search (items_search, rowid, product_name, brands, ingredients_text)
+    VALUES ('delete', old.id, old.product_name, old.brands, old.ingredients_text);
+    INSERT INTO items_search (rowid, product_name, brands, ingredients_text)
+    VALUES (new.id, new.product_name, new.brands, new.ingredients_text);
+END;
+"""
+
+SELECT_COLUMNS = "id, status, " + ", ".join(PRODUCT_COLUMNS) + ", extra, version"
+
+SQL_GET = f"SELECT {SELECT_COLUMNS} FROM items WHERE id = ?"
+SQL_ALL = f"SELECT {SELECT_COLUMNS} FROM items ORDER BY id"
+SQL_PAGE = f"SELECT {SELECT_COLUMNS} FROM items WHERE id > ? ORDER BY id LIMIT ?"
+SQL_COUNT = "SELECT COUNT(*) FROM items"
+SQL_INSERT = (
+    "INSERT INTO items (id, status, " + ", ".join(PRODUCT_COLUMNS) + ", name_key, extra, version) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+SQL_UPDATE = (
+    "UPDATE items SET status = ?, " + ", ".join(f"{column} = ?" for column in PRODUCT_COLUMNS)
+    + ", name_key = ?, extra = ?, version = ? WHERE id = ?"
+)
+SQL_DELETE = "DELETE FROM items WHERE id = ?"
+SQL_ADJUST_STOCK = (
+    "UPDATE items SET stock = COALESCE(stock, 0) + ?, version = ? "
+    "WHERE id = ? AND (? = 0 OR COALESCE(stock, 0) + ? >= 0)"
+)
+SQL_DELETE_ALL = "DELETE FROM items"
+SQL_INSERT_BRAND = "INSERT OR IGNORE INTO item_brands (brand, item_id) VALUES (?, ?)"
+SQL_DELETE_BRANDS = "DELETE FROM item_brands WHERE item_id = ?"
+SQL_BUMP_VERSION = "UPDATE meta SET value = value + 1 WHERE key = 'version' RETURNING value"
+SQL_VERSION = "SELECT value FROM meta WHERE key = 'version'"
+SQL_ITEM_VERSION = "SELECT version FROM items WHERE id = ?"
+
+# stock and price that are not numbers count as 0 (like analytics.py)
+STOCK_NUMBER = "(CASE WHEN typeof(stock) IN ('integer', 'real') THEN stock ELSE 0 END)"
+PRICE_NUMBER = "(CASE WHEN typeof(price) IN ('integer', 'real') THEN price ELSE 0 END)"
+SQL_TOTALS = f"SELECT COUNT(*), TOTAL({STOCK_NUMBER}), TOTAL({PRICE_NUMBER} * {STOCK_NUMBER}) FROM items"
+SQL_BRAND_TOTALS = (
+    f"SELECT brand, COUNT(*), TOTAL({STOCK_NUMBER}), TOTAL({PRICE_NUMBER} * {STOCK_NUMBER}) "
+    "FROM item_brands JOIN items ON items.id = item_brands.item_id GROUP BY brand"
+)
+# the COALESCE expression matches the items_stock index, so this reads
+# only the rows it returns
+SQL_LOW_STOCK = (
+    f"SELECT {SELECT_COLUMNS} FROM items WHERE COALESCE(stock, 0) <= ? "
+    "ORDER BY COALESCE(stock, 0), id LIMIT ?"
+)
+
+# range_query() bounds; comparing with -inf / inf leaves out NULL and
+# text values (SQLite sorts them before and after every number)
+SQL_RANGE = "{field} >= ? AND {field} <= ?"
+# resume after the (value, id) key of the last item of the previous page
+SQL_RANGE_AFTER = "({field}, id) {operator} (?, ?)"
+
+# ids per query in get_many()
+GET_MANY_CHUNK = 500
+
+# bm25() is smaller for better matches
+SQL_SEARCH = (
+    "SELECT " + ", ".join(f"items.{column}" for column in SELECT_COLUMNS.split(", "))
+    + " FROM items_search JOIN items ON items.id = items_search.rowid"
+    " WHERE items_search MATCH ? ORDER BY bm25(items_search), items.id LIMIT ? OFFSET ?"
+)
+
+
+class _RollBack(Exception):
+    """Raised inside a transaction to roll it back."""
+
+
+class SQLiteInventoryStore:
+    """
+    Keep inventory items in a SQLite database.
+
+    Has the same methods as InventoryStore, so app.py can use either one.
+    """
+
+    def __init__(self, path, items=None):
+        self.path = path
+        self._local = threading.local()
+        # functions called after every change (see subscribe)
+        self._listeners = []
+
+        connection = self._connection()
+        with connection:
+            connection.executescript(SCHEMA)
+            searchable = connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'items_search'"
+            ).fetchone()
+            connection.executescript(SEARCH_SCHEMA)
+            if not searchable:
+                # databases created before search existed: index what is there
+                connection.execute("INSERT INTO items_search (items_search) VALUES ('rebuild')")
+            # databases created before versions existed
+            columns = [row[1] for row in connection.execute("PRAGMA table_info(items)")]
+            if "version" not in columns:
+                connection.execute("ALTER TABLE items ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+            connection.execute(
+                "INSERT OR IGNORE INTO meta (key, value) VALUES ('epoch', ?)", (uuid.uuid4().hex[:8],)
+            )
+            # the versions are stored, so the epoch stays the same across restarts
+            self.epoch = connection.execute("SELECT value FROM meta WHERE key = 'epoch'").fetchone()[0]
+
+        # only seed an empty database, otherwise we would add the
+        # example items again on every restart
+        if items and len(self) == 0:
+            for item in items:
+                self.insert(item)
+
+    def _connection(self):
+        # each thread opens its own connection once and then reuses it
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, cached_statements=128)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA foreign_keys=ON")
+            self._local.connection = connection
+        return connection
+
+    def close(self):
+        """Close the connection of the current thread."""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    # Conversions between rows and item dicts
+
+    @staticmethod
+    def _row_to_item(row, fields=None):
+        if fields is not None:
+            return SQLiteInventoryStore._project_row(row, fields)
+        product = dict(zip(PRODUCT_COLUMNS, row[2:8]))
+        product.update(json.loads(row[8]))
+        return {"id": row[0], "status": row[1], "product": product}
+
+    @staticmethod
+    def _project_row(row, fields):
+        # like ItemRecord.project: only the keys in fields; the "extra"
+        # JSON is only parsed when a key that is not a column is asked for
+        item = {}
+        product = None
+        extra = None
+        for name in fields:
+            if name == "id":
+                item["id"] = row[0]
+            elif name == "status":
+                item["status"] = row[1]
+            elif name == "product":
+                item["product"] = SQLiteInventoryStore._row_to_item(row)["product"]
+            else:
+                if product is None:
+                    product = item["product"] = {}
+                if name in COLUMN_INDEX:
+                    product[name] = row[COLUMN_INDEX[name]]
+                    continue
+                if extra is None:
+                    extra = json.loads(row[8])
+                value = extra.get(name, MISSING)
+                if value is not MISSING:
+                    product[name] = value
+        return item
+
+    @staticmethod
+    def _item_params(item):
+        product = item["product"]
+        columns = [product.get(column) for column in PRODUCT_COLUMNS]
+        extra = {key: value for key, value in product.items() if key not in PRODUCT_COLUMNS}
+        return [item.get("status", 1)] + columns + [name_key(product), json.dumps(extra)]
+
+    @staticmethod
+    def _bump_version(connection):
+        return connection.execute(SQL_BUMP_VERSION).fetchone()[0]
+
+    def subscribe(self, callback):
+        """
+        Call callback(event, item, changes) after every change made through
+        this object (like InventoryStore.subscribe). Changes made by other
+        processes sharing the file are not seen.
+        """
+        self._listeners.append(callback)
+
+    def _notify(self, events):
+        # called inside the write transaction, so events reach the
+        # listeners in the order the writes happened
+        for event, item, changes in events:
+            for callback in self._listeners:
+                callback(event, item, changes)
+
+    @staticmethod
+    def _check_version(row, expected_versions):
+        if expected_versions is not None and row[9] not in expected_versions:
+            raise VersionConflictError(row[0], row[9])
+
+    @property
+    def version(self):
+        """Store-wide version, goes up by one on every change."""
+        return self._connection().execute(SQL_VERSION).fetchone()[0]
+
+    def item_version(self, item_id):
+        """Version of the item's last change, or None if it does not exist."""
+        row = self._connection().execute(SQL_ITEM_VERSION, (item_id,)).fetchone()
+        return row[0] if row else None
+
+    def _write_brands(self, connection, item):
+        connection.execute(SQL_DELETE_BRANDS, (item["id"],))
+        connection.executemany(
+            SQL_INSERT_BRAND,
+            [(brand, item["id"]) for brand in brand_keys(item["product"])],
+        )
+
+    # Same methods as InventoryStore
+
+    def __len__(self):
+        return self._connection().execute(SQL_COUNT).fetchone()[0]
+
+    def __iter__(self):
+        # fetch everything first so callers can delete while looping
+        return iter(self.all())
+
+    def __contains__(self, item_id):
+        return self.get(item_id) is not None
+
+    # fields= works like in InventoryStore (see store.parse_fields)
+
+    def get(self, item_id, fields=None):
+        """Return the item with this id, or None if it does not exist."""
+        row = self._connection().execute(SQL_GET, (item_id,)).fetchone()
+        if row is None:
+            return None
+        return self._row_to_item(row, fields)
+
+    def get_many(self, item_ids, fields=None):
+        """Return the items with these ids, in the same order (missing ids are skipped)."""
+        item_ids = list(item_ids)
+        rows = {}
+        connection = self._connection()
+        # in chunks, to stay under SQLite's limit of ? parameters
+        for start in range(0, len(item_ids), GET_MANY_CHUNK):
+            chunk = item_ids[start:start + GET_MANY_CHUNK]
+            sql = f"SELECT {SELECT_COLUMNS} FROM items WHERE id IN ({', '.join('?' * len(chunk))})"
+            rows.update((row[0], row) for row in connection.execute(sql, chunk))
+        return [self._row_to_item(rows[item_id], fields) for item_id in item_ids if item_id in rows]
+
+    def all(self, fields=None):
+        """Return a list with every item, in id order."""
+        rows = self._connection().execute(SQL_ALL).fetchall()
+        return [self._row_to_item(row, fields) for row in rows]
+
+    def insert(self, item):
+        """Store an item that already has an id (used when seeding the store)."""
+        connection = self._connection()
+        with connection:
+            self._begin_write(connection)
+            version = self._bump_version(connection)
+            try:
+                connection.execute(SQL_INSERT, [item["id"]] + self._item_params(item) + [version])
+            except sqlite3.IntegrityError:
+                raise ValueError(f"Duplicate item id: {item['id']}")
+            self._write_brands(connection, item)
+            self._notify([("add", item, None)])
+        return item
+
+    def add(self, product, status=1):
+        """Create a new item from a product dict and return it."""
+        connection = self._connection()
+        with connection:
+            self._begin_write(connection)
+            events = []
+            item = self._add(connection, product, status, events)
+            self._notify(events)
+        return item
+
+    def update(self, item_id, fields, expected_versions=None):
+        """
+        Update keys inside the item's "product".
+        Return the updated item, or None if the id does not exist.
+        expected_versions works like in InventoryStore.update.
+        """
+        connection = self._connection()
+        with connection:
+            self._begin_write(connection)
+            events = []
+            item = self._update(connection, item_id, fields, expected_versions, events)
+            self._notify(events)
+        return item
+
+    def delete(self, item_id, expected_versions=None):
+        """Remove an item. Return the removed item, or None if missing."""
+        connection = self._connection()
+        with connection:
+            self._begin_write(connection)
+            events = []
+            item = self._delete(connection, item_id, expected_versions, events)
+            self._notify(events)
+        return item
+
+    def adjust_stock(self, item_id, delta, fail_if_negative=False):
+        """
+        Add delta to the item's stock with one UPDATE, so concurrent
+        adjustments (from any thread or process) are never lost.
+        Same return values and errors as InventoryStore.adjust_stock.
+        """
+        connection = self._connection()
+        with connection:
+            self._begin_write(connection)
+            row = connection.execute(SQL_GET, (item_id,)).fetchone()
+            if row is None:
+                return None
+            stock = row[6]
+            if isinstance(stock, (str, bytes)):
+                raise ValueError(f"Stock of item {item_id} is not a number")
+
+            version = self._bump_version(connection)
+            cursor = connection.execute(
+                SQL_ADJUST_STOCK, (delta, version, item_id, int(fail_if_negative), delta)
+            )
+            row = connection.execute(SQL_GET, (item_id,)).fetchone()
+            if cursor.rowcount == 0:
+                if row is None:
+                    return None
+                raise InsufficientStockError(item_id, row[6] or 0, delta)
+            item = self._row_to_item(row)
+            self._notify([("update", item, {"stock": row[6]})])
+        return item
+
+    # The _add / _update / _delete helpers run inside a transaction
+    # opened by the caller, so a batch can share one transaction. They
+    # append (event, item, changes) to `events`; the caller passes them to
+    # _notify() once it knows the transaction will not be rolled back.
+
+    @staticmethod
+    def _begin_write(connection):
+        # take the write lock now, so rows read in this transaction cannot
+        # be changed by another connection before we write them back
+        connection.execute("BEGIN IMMEDIATE")
+
+    def _add(self, connection, product, status, events):
+        new_item = {"id": None, "status": status, "product": product}
+        version = self._bump_version(connection)
+        # AUTOINCREMENT never hands out a deleted id again
+        cursor = connection.execute(SQL_INSERT, [None] + self._item_params(new_item) + [version])
+        new_item["id"] = cursor.lastrowid
+        self._write_brands(connection, new_item)
+        events.append(("add", new_item, None))
+        return new_item
+
+    def _update(self, connection, item_id, fields, expected_versions, events):
+        row = connection.execute(SQL_GET, (item_id,)).fetchone()
+        if row is None:
+            return None
+        self._check_version(row, expected_versions)
+
+        item = self._row_to_item(row)
+        item["product"].update(fields)
+        version = self._bump_version(connection)
+        connection.execute(SQL_UPDATE, self._item_params(item) + [version, item_id])
+        if not INDEXED_FIELDS.isdisjoint(fields):
+            self._write_brands(connection, item)
+        events.append(("update", item, fields))
+        return item
+
+    def _delete(self, connection, item_id, expected_versions, events):
+        row = connection.execute(SQL_GET, (item_id,)).fetchone()
+        if row is None:
+            return None
+        self._check_version(row, expected_versions)
+        self._bump_version(connection)
+        connection.execute(SQL_DELETE, (item_id,))
+        item = self._row_to_item(row)
+        events.append(("delete", item, None))
+        return item
+
+    def apply_batch(self, operations, atomic=False):
+        """
+        Apply a list of operations in one transaction (see
+        InventoryStore.apply_batch). With atomic=True the transaction is
+        rolled back if any operation fails.
+        """
+        connection = self._connection()
+        results = []
+        ok = True
+        errors = {}
+        events = []
+
+        # "with connection" commits at the end, or rolls back on an exception
+        try:
+            with connection:
+                self._begin_write(connection)
+                for index, operation in enumerate(operations):
+                    op = operation["op"]
+                    result = {"index": index, "op": op}
+
+                    if op == "create":
+                        item = self._add(
+                            connection, operation["product"], operation.get("status", 1), events
+                        )
+                    elif op == "patch":
+                        item = self._update(connection, operation["id"], operation["fields"], None, events)
+                    else:
+                        item = self._delete(connection, operation["id"], None, events)
+
+                    if item is None:
+                        ok = False
+                        errors[index] = "Item not found"
+                        result.update(status="error", id=operation["id"], error="Item not found")
+                    else:
+                        result.update(status="ok", id=item["id"])
+                    results.append(result)
+
+                if atomic and not ok:
+                    raise _RollBack()
+                self._notify(events)
+        except _RollBack:
+            return False, batch_failure_results(operations, errors)
+
+        return ok, results
+
+    def clear(self):
+        """Remove every item (AUTOINCREMENT keeps the id counter going up)."""
+        connection = self._connection()
+        with connection:
+            self._begin_write(connection)
+            self._bump_version(connection)
+            connection.execute(SQL_DELETE_ALL)
+            self._notify([("clear", None, None)])
+
+    def find(self, barcode=None, brand=None, name_prefix=None, fields=None):
+        """Return the items matching every filter that is not None, in id order."""
+        conditions = []
+        params = []
+
+        if barcode is not None:
+            conditions.append("barcode = ?")
+            params.append(str(barcode))
+
+        if brand is not None:
+            conditions.append("id IN (SELECT item_id FROM item_brands WHERE brand = ?)")
+            params.append(brand.strip().casefold())
+
+        if name_prefix is not None:
+            # a range on the indexed name_key column (LIKE would not use the index)
+            prefix = name_prefix.casefold()
+            conditions.append("name_key >= ? AND name_key < ?")
+            params.extend([prefix, prefix + "\U0010ffff"])
+
+        if not conditions:
+            return self.all(fields)
+
+        sql = f"SELECT {SELECT_COLUMNS} FROM items WHERE {' AND '.join(conditions)} ORDER BY id"
+        rows = self._connection().execute(sql, params).fetchall()
+        return [self._row_to_item(row, fields) for row in rows]
+
+    def stats(self):
+        """Totals and per-brand rollups (same shape as InventoryStats.stats)."""
+        connection = self._connection()
+        # one read transaction, so the totals and the brands agree
+        with connection:
+            connection.execute("BEGIN")
+            items, units, value = connection.execute(SQL_TOTALS).fetchone()
+            brands = {
+                row[0]: [row[1], _whole(row[2]), row[3]]
+                for row in connection.execute(SQL_BRAND_TOTALS)
+            }
+        return format_stats(items, _whole(units), value, brands)
+
+    def low_stock(self, threshold, limit=100):
+        """Return up to `limit` items with stock <= threshold, lowest stock first."""
+        rows = self._connection().execute(SQL_LOW_STOCK, (threshold, limit)).fetchall()
+        return [self._row_to_item(row) for row in rows]
+
+    def _range_rows(self, keys_only, min_price, max_price, min_stock, max_stock, sort, limit, after):
+        bounds = {"price": (min_price, max_price), "stock": (min_stock, max_stock)}
+        if sort is not None:
+            field, direction = sort.lstrip("-"), "DESC" if sort.startswith("-") else "ASC"
+        else:
+            field, direction = ("price" if bounds["price"] != (None, None) else "stock"), "ASC"
+
+        conditions = []
+        params = []
+        for name, (low, high) in bounds.items():
+            if name == field or (low, high) != (None, None):
+                conditions.append(SQL_RANGE.format(field=name))
+                params.extend([-math.inf if low is None else low, math.inf if high is None else high])
+        if after is not None:
+            conditions.append(SQL_RANGE_AFTER.format(field=field, operator="<" if direction == "DESC" else ">"))
+            params.extend(after)
+
+        # only (value, id) for range_keys: the (field, id) index covers it
+        columns = f"{field}, id" if keys_only else SELECT_COLUMNS
+        # LIMIT -1 means no limit in SQLite
+        sql = (
+            f"SELECT {columns} FROM items WHERE {' AND '.join(conditions)} "
+            f"ORDER BY {field} {direction}, id {direction} LIMIT ?"
+        )
+        params.append(-1 if limit is None else limit)
+        return self._connection().execute(sql, params).fetchall()
+
+    def range_keys(self, min_price=None, max_price=None, min_stock=None, max_stock=None,
+                   sort=None, limit=None, after=None):
+        """(value, id) keys of a range query, same rules as RangeIndex.range_keys."""
+        rows = self._range_rows(True, min_price, max_price, min_stock, max_stock, sort, limit, after)
+        return [tuple(row) for row in rows]
+
+    def range_query(self, min_price=None, max_price=None, min_stock=None, max_stock=None,
+                    sort=None, limit=None, after=None, fields=None):
+        """Price / stock range query, same rules as RangeIndex.range_query."""
+        rows = self._range_rows(False, min_price, max_price, min_stock, max_stock, sort, limit, after)
+        return [self._row_to_item(row, fields) for row in rows]
+
+    def search(self, query, limit=20, offset=0):
+        """
+        Return the items ranked offset .. offset + limit - 1 for the query,
+        best first (same matching rules as search.SearchIndex).
+        """
+        words = tokenize(query)
+        if not words:
+            return []
+        # every word must match, as a prefix; quoting keeps FTS5 syntax out
+        match = " AND ".join(f'"{word}"*' for word in dict.fromkeys(words))
+        rows = self._connection().execute(SQL_SEARCH, (match, limit, offset)).fetchall()
+        return [self._row_to_item(row) for row in rows]
+
+    def find_by_barcode(self, barcode):
+        """Return the items with this barcode (uses the barcode index)."""
+        return self.find(barcode=barcode)
+
+    def page(self, after_id=0, limit=100, fields=None):
+        """Return up to `limit` items with an id greater than `after_id`."""
+        rows = self._connection().execute(SQL_PAGE, (after_id, limit)).fetchall()
+        return [self._row_to_item(row, fields) for row in rows]
+
+    def iter_pages(self, page_size=500, fields=None):
+        """Yield the items page by page without loading the whole table."""
+        after_id = 0
+        while True:
+            items = self.page(after_id, page_size, fields)
+            if not items:
+                return
+            yield from items
+            after_id = items[-1]["id"]
+
+
+def _whole(number):
+    # TOTAL() always gives a float; show whole unit counts as ints
+    return int(number) if number.is_integer() else number
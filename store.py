@@ -0,0 +1,814 @@
+
+# In-memory inventory store used by app.py
+#
+# The store keeps every item in a dict keyed by id (the "primary index").
+# Python dicts remember insertion order, so iterating the store gives the
+# items in the same order they were added, just like the old list did.
+#
+# It also keeps a few secondary indexes so GET /inventory can filter
+# without looking at every item:
+# - barcode -> ids  (hash index, O(1) lookup)
+# - brand   -> ids  (hash index, one entry per comma separated brand)
+# - sorted (name, id) pairs for product_name prefix search (bisect)
+
+import re
+import sys
+import threading
+from contextlib import ExitStack
+import uuid
+from bisect import bisect_left, bisect_right, insort
+
+
+class SortedIndex:
+    """
+    A sorted list split into small chunks.
+
+    A plain sorted list needs to shift every later element on insert,
+    which gets slow with a million entries. Keeping the values in chunks
+    of at most CHUNK_SIZE * 2 means an insert or remove only shifts one
+    small chunk. Values must be comparable (we use tuples like (key, id)).
+    """
+
+    CHUNK_SIZE = 512
+
+    def __init__(self):
+        self._chunks = []  # list of sorted lists
+        self._maxes = []   # last value of each chunk
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            yield from chunk
+
+    def add(self, value):
+        if not self._chunks:
+            self._chunks.append([value])
+            self._maxes.append(value)
+            self._size = 1
+            return
+
+        position = bisect_left(self._maxes, value)
+        if position == len(self._maxes):
+            position -= 1
+
+        chunk = self._chunks[position]
+        insort(chunk, value)
+        self._maxes[position] = chunk[-1]
+        self._size += 1
+
+        # split big chunks in half
+        if len(chunk) > self.CHUNK_SIZE * 2:
+            half = chunk[self.CHUNK_SIZE:]
+            del chunk[self.CHUNK_SIZE:]
+            self._chunks.insert(position + 1, half)
+            self._maxes[position] = chunk[-1]
+            self._maxes.insert(position + 1, half[-1])
+
+    def remove(self, value):
+        """Remove value if present. Return True if it was found."""
+        position = bisect_left(self._maxes, value)
+        if position == len(self._maxes):
+            return False
+
+        chunk = self._chunks[position]
+        index = bisect_left(chunk, value)
+        if index == len(chunk) or chunk[index] != value:
+            return False
+
+        del chunk[index]
+        self._size -= 1
+        if chunk:
+            self._maxes[position] = chunk[-1]
+        else:
+            del self._chunks[position]
+            del self._maxes[position]
+        return True
+
+    def irange(self, start):
+        """Yield every value >= start, in sorted order."""
+        position = bisect_left(self._maxes, start)
+        if position == len(self._maxes):
+            return
+
+        chunk = self._chunks[position]
+        yield from chunk[bisect_left(chunk, start):]
+        for chunk in self._chunks[position + 1:]:
+            yield from chunk
+
+    def irange_reverse(self, stop):
+        """Yield every value <= stop, in reverse sorted order."""
+        # chunks before `position` only hold values <= stop; the chunk at
+        # `position` (if any) holds some values on both sides of stop
+        position = bisect_right(self._maxes, stop)
+        if position < len(self._chunks):
+            chunk = self._chunks[position]
+            yield from reversed(chunk[:bisect_right(chunk, stop)])
+        for chunk in reversed(self._chunks[:position]):
+            yield from reversed(chunk)
+
+    def clear(self):
+        self._chunks.clear()
+        self._maxes.clear()
+        self._size = 0
+
+
+class InsufficientStockError(Exception):
+    """Raised by adjust_stock when the stock would go below 0."""
+
+    def __init__(self, item_id, stock, delta):
+        super().__init__(f"Item {item_id} has {stock} in stock, cannot apply {delta}")
+        self.item_id = item_id
+        self.stock = stock
+        self.delta = delta
+
+
+class VersionConflictError(Exception):
+    """Raised when an update or delete expected a different item version."""
+
+    def __init__(self, item_id, current_version):
+        super().__init__(f"Item {item_id} is at version {current_version}")
+        self.item_id = item_id
+        self.current_version = current_version
+
+
+# Helper to build the results of an atomic batch that was not applied
+def batch_failure_results(operations, errors):
+    results = []
+    for index, operation in enumerate(operations):
+        result = {"index": index, "op": operation["op"]}
+        if "id" in operation:
+            result["id"] = operation["id"]
+        if index in errors:
+            result.update(status="error", error=errors[index])
+        else:
+            result["status"] = "skipped"
+        results.append(result)
+    return results
+
+
+# Product fields used by the secondary indexes
+INDEXED_FIELDS = frozenset(("barcode", "brands", "product_name"))
+
+
+# Product fields kept in their own slot of ItemRecord (any other key goes in "extra")
+PRODUCT_FIELDS = ("product_name", "brands", "ingredients_text", "price", "stock", "barcode")
+PRODUCT_FIELD_SET = frozenset(PRODUCT_FIELDS)
+
+# marks a product field that was never set (different from a field set to None)
+MISSING = object()
+
+FIELD_NAME = re.compile(r"[A-Za-z0-9_]+")
+
+
+def parse_fields(text):
+    """
+    Parse a field list like "id,product_name,price" (for ?fields=) into
+    a tuple for project(). "id", "status" and "product" (the whole
+    product) are item keys, any other name is a key of the product. "id"
+    is always included, so clients can page and match items.
+    Raise ValueError for an empty list or a name that is not a word.
+    """
+    fields = ["id"]
+    for name in text.split(","):
+        name = name.strip()
+        if not FIELD_NAME.fullmatch(name):
+            raise ValueError(f"Invalid field name: {name!r}")
+        if name not in fields:
+            fields.append(name)
+    if "product" in fields:
+        # the whole product already has every product key
+        fields = [name for name in fields if name in ("id", "status", "product")]
+    return tuple(fields)
+
+
+class ItemRecord:
+    """
+    Compact in-memory form of one item.
+
+    A nested dict item costs two dicts per SKU; with __slots__ the fields
+    live in one small object. Brand strings are interned so items of the
+    same brand share one string. Keys that are not product fields (sent
+    with PATCH) go in the small "extra" dict, created only when needed.
+
+    to_dict() gives back the usual {"id", "status", "product": {...}} shape.
+    """
+
+    __slots__ = ("id", "status") + PRODUCT_FIELDS + ("extra",)
+
+    def __init__(self, item_id, status, product):
+        self.id = item_id
+        self.status = status
+        for name in PRODUCT_FIELDS:
+            setattr(self, name, MISSING)
+        self.extra = None
+        self.update(product)
+
+    def update(self, fields):
+        for key, value in fields.items():
+            if key in PRODUCT_FIELD_SET:
+                if key == "brands" and isinstance(value, str):
+                    value = sys.intern(value)
+                setattr(self, key, value)
+            else:
+                if self.extra is None:
+                    self.extra = {}
+                self.extra[key] = value
+
+    def get(self, key, default=None):
+        """Look up a product field, like product.get(key) on the dict form."""
+        if key in PRODUCT_FIELD_SET:
+            value = getattr(self, key)
+            return default if value is MISSING else value
+        if self.extra is None:
+            return default
+        return self.extra.get(key, default)
+
+    def product(self):
+        product = {}
+        for name in PRODUCT_FIELDS:
+            value = getattr(self, name)
+            if value is not MISSING:
+                product[name] = value
+        if self.extra:
+            product.update(self.extra)
+        return product
+
+    def to_dict(self):
+        return {"id": self.id, "status": self.status, "product": self.product()}
+
+    def project(self, fields):
+        """
+        Like to_dict(), but only with the keys in fields (see parse_fields),
+        so the keys that were not asked for are never copied.
+        """
+        item = {}
+        product = None
+        for name in fields:
+            if name == "id":
+                item["id"] = self.id
+            elif name == "status":
+                item["status"] = self.status
+            elif name == "product":
+                item["product"] = self.product()
+            else:
+                if product is None:
+                    product = item["product"] = {}
+                value = self.get(name, MISSING)
+                if value is not MISSING:
+                    product[name] = value
+        return item
+
+
+# Helper functions to build the index keys from a product dict (or an ItemRecord)
+def barcode_key(product):
+    barcode = product.get("barcode")
+    if barcode is None or barcode == "":
+        return None
+    return str(barcode)
+
+
+def brand_keys(product):
+    # OpenFoodFacts stores brands like "Silk, Danone"
+    brands = product.get("brands") or ""
+    keys = []
+    for brand in str(brands).split(","):
+        brand = brand.strip().casefold()
+        if brand and brand not in keys:
+            keys.append(brand)
+    return keys
+
+
+def name_key(product):
+    return str(product.get("product_name") or "").casefold()
+
+
+class InventoryStore:
+    """
+    Keep inventory items indexed by id.
+
+    - get / add / update / delete are O(1)
+    - ids come from a counter that only goes up, so a deleted id
+      is never given to a new item
+    - iterating the store returns items in insertion order
+    - find() answers barcode / brand / name prefix queries from indexes
+    - subscribe() lets other parts of the app hear about every change
+      (on_commit() hooks run once the change released its locks)
+    - safe to use from many threads (see "Locking" below)
+    - a store-wide version and a version per item go up on every change
+      (used for ETags and If-Match)
+    - items are kept as compact ItemRecord objects; every method that
+      returns items gives new dicts, so changing them does not change
+      the store (use update / adjust_stock for that)
+
+    Locking:
+    - _lock (one per store) protects the id counter, the primary index
+      and the secondary indexes; it is held by add, delete, batches,
+      queries, and updates that change an indexed field
+    - _stripes (STRIPES locks, picked by id) protect the fields of one
+      item; price / stock updates and adjust_stock only need the item's
+      stripe, so busy SKUs do not block the rest of the store
+    - add, insert and delete hold the item's stripe as well, so events
+      of one item always reach the listeners in order
+    - when both are needed, _lock is always taken first
+    """
+
+    STRIPES = 64
+
+    def __init__(self, items=None):
+        # id -> ItemRecord
+        self._items = {}
+        # next id to hand out
+        self._next_id = 1
+
+        # all ids in sorted order, used to resume a page after a given id
+        self._ids = SortedIndex()
+
+        # secondary indexes (the inner dicts are used as ordered sets of ids)
+        self._by_barcode = {}
+        self._by_brand = {}
+        self._names = SortedIndex()
+
+        # functions called after every change (see subscribe), and after
+        # the change let go of the store's locks (see on_commit)
+        self._listeners = []
+        self._commit_hooks = []
+        # per thread: True while apply_batch runs (see _committed)
+        self._local = threading.local()
+
+        # version counters; epoch changes on every restart so versions
+        # from before a restart never look equal to new ones
+        self.epoch = uuid.uuid4().hex[:8]
+        self._version = 0
+        self._versions = {}  # id -> version of its last change
+        self._version_lock = threading.Lock()
+
+        # see "Locking" in the class docstring
+        self._lock = threading.RLock()
+        self._stripes = [threading.RLock() for _ in range(self.STRIPES)]
+
+        for item in items or []:
+            self.insert(item)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        # iterate over a snapshot so callers can delete while looping
+        return iter(self.all())
+
+    def __contains__(self, item_id):
+        return item_id in self._items
+
+    # The read methods take fields=: a tuple from parse_fields() to get
+    # only those keys of each item (ItemRecord.project).
+
+    def get(self, item_id, fields=None):
+        """Return the item with this id, or None if it does not exist."""
+        record = self._items.get(item_id)
+        if record is None:
+            return None
+        return record.to_dict() if fields is None else record.project(fields)
+
+    def get_many(self, item_ids, fields=None):
+        """
+        Return the items with these ids, in the same order. Ids that do
+        not exist are skipped: indexes that read ids under their own lock
+        use this, and an item can be deleted before they look it up.
+        """
+        items = []
+        for item_id in item_ids:
+            item = self.get(item_id, fields)
+            if item is not None:
+                items.append(item)
+        return items
+
+    def get_versioned(self, item_id):
+        """Return (item, version) read together, or (None, None)."""
+        with self._stripe(item_id):
+            record = self._items.get(item_id)
+            if record is None:
+                return None, None
+            return record.to_dict(), self._versions.get(item_id)
+
+    def all(self, fields=None):
+        """Return a list with every item, in insertion order."""
+        records = list(self._items.values())
+        if fields is not None:
+            return [record.project(fields) for record in records]
+        return [record.to_dict() for record in records]
+
+    def item_ids(self):
+        """Return every id, in insertion order."""
+        return list(self._items)
+
+    def _stripe(self, item_id):
+        return self._stripes[hash(item_id) % self.STRIPES]
+
+    def allocate_id(self):
+        """Reserve and return the next free id."""
+        with self._lock:
+            new_id = self._next_id
+            self._next_id += 1
+            return new_id
+
+    @property
+    def next_id(self):
+        return self._next_id
+
+    def ensure_next_id(self, next_id):
+        """Make sure ids below next_id are never handed out again."""
+        with self._lock:
+            if next_id > self._next_id:
+                self._next_id = next_id
+
+    def subscribe(self, callback):
+        """
+        Call callback(event, item, changes) after every change.
+
+        event is "add", "update", "delete" or "clear". changes is the dict
+        of updated fields for "update" and None otherwise.
+        """
+        self._listeners.append(callback)
+
+    def follow(self, callback):
+        """
+        Subscribe callback, then call callback("add", item, None) for
+        every item already in the store. Indexes and counters built from
+        the store use this.
+
+        It holds _lock and every stripe meanwhile, so no change can happen
+        between the replay and the subscription: each item reaches
+        callback exactly once as "add", then only its later changes. It is
+        safe to call while other threads use the store.
+        """
+        with self._lock, ExitStack() as stripes:
+            for stripe in self._stripes:
+                stripes.enter_context(stripe)
+            self._listeners.append(callback)
+            for record in self._items.values():
+                callback("add", record.to_dict(), None)
+
+    def on_commit(self, callback):
+        """
+        Call callback() after every change, once the store's locks are
+        released (once for a whole apply_batch). Listeners that need to
+        wait, like the journal waiting for fsync, do it here instead of
+        inside subscribe's callback, so other writers are not blocked.
+        """
+        self._commit_hooks.append(callback)
+
+    def _committed(self):
+        # called by the change methods after their `with` blocks
+        if not getattr(self._local, "in_batch", False):
+            for callback in self._commit_hooks:
+                callback()
+
+    @property
+    def version(self):
+        """Store-wide version, goes up by one on every change."""
+        return self._version
+
+    def item_version(self, item_id):
+        """Version of the item's last change, or None if it does not exist."""
+        return self._versions.get(item_id)
+
+    def _check_version(self, item_id, expected_versions):
+        # caller holds the item's lock
+        if expected_versions is not None and self._versions.get(item_id) not in expected_versions:
+            raise VersionConflictError(item_id, self._versions.get(item_id))
+
+    def _notify(self, event, item, changes=None):
+        # every change passes through here, so this is where versions go up
+        with self._version_lock:
+            self._version += 1
+            if event == "delete":
+                self._versions.pop(item["id"], None)
+            elif event == "clear":
+                self._versions.clear()
+            else:
+                self._versions[item["id"]] = self._version
+
+        for callback in self._listeners:
+            callback(event, item, changes)
+
+    def insert(self, item):
+        """
+        Store an item that already has an id (used when seeding the store).
+        The id counter is moved past it so it will never be reused.
+        """
+        item_id = item["id"]
+        # the stripe too (see add)
+        with self._lock, self._stripe(item_id):
+            if item_id in self._items:
+                raise ValueError(f"Duplicate item id: {item_id}")
+
+            record = ItemRecord(item_id, item.get("status", 1), item.get("product", {}))
+            self._items[item_id] = record
+            self._ids.add(item_id)
+            self._index(record)
+            if item_id >= self._next_id:
+                self._next_id = item_id + 1
+            item = record.to_dict()
+            self._notify("add", item)
+        self._committed()
+        return item
+
+    def add(self, product, status=1):
+        """Create a new item from a product dict and return it."""
+        with self._lock:
+            record = ItemRecord(self.allocate_id(), status, product)
+            # get() sees the item as soon as it is in _items; holding its
+            # stripe until "add" is sent keeps a price / stock change of
+            # the new item from notifying before it
+            with self._stripe(record.id):
+                self._items[record.id] = record
+                self._ids.add(record.id)
+                self._index(record)
+                new_item = record.to_dict()
+                self._notify("add", new_item)
+        self._committed()
+        return new_item
+
+    def update(self, item_id, fields, expected_versions=None):
+        """
+        Update keys inside the item's "product" dict.
+        Return the updated item, or None if the id does not exist.
+
+        If expected_versions is given, raise VersionConflictError (and
+        change nothing) unless the item's version is one of them.
+        """
+        if INDEXED_FIELDS.isdisjoint(fields):
+            # price / stock changes do not touch the secondary indexes,
+            # so the item's stripe lock is enough
+            with self._stripe(item_id):
+                record = self._items.get(item_id)
+                if record is None:
+                    return None
+                self._check_version(item_id, expected_versions)
+                record.update(fields)
+                item = record.to_dict()
+                self._notify("update", item, fields)
+            self._committed()
+            return item
+
+        with self._lock, self._stripe(item_id):
+            record = self._items.get(item_id)
+            if record is None:
+                return None
+            self._check_version(item_id, expected_versions)
+            # take the item out of the indexes, change it, then put it back
+            # so a new barcode, brand or name is re-keyed correctly
+            self._unindex(record)
+            record.update(fields)
+            self._index(record)
+            item = record.to_dict()
+            self._notify("update", item, fields)
+        self._committed()
+        return item
+
+    def adjust_stock(self, item_id, delta, fail_if_negative=False):
+        """
+        Add delta to the item's stock in one atomic step.
+
+        Return the updated item, or None if the id does not exist.
+        Raise InsufficientStockError if fail_if_negative is True and the
+        new stock would be below 0 (nothing is changed in that case).
+        Raise ValueError if the current stock is not a number.
+        """
+        with self._stripe(item_id):
+            record = self._items.get(item_id)
+            if record is None:
+                return None
+
+            stock = record.get("stock") or 0
+            if isinstance(stock, bool) or not isinstance(stock, (int, float)):
+                raise ValueError(f"Stock of item {item_id} is not a number")
+
+            new_stock = stock + delta
+            if fail_if_negative and new_stock < 0:
+                raise InsufficientStockError(item_id, stock, delta)
+
+            changes = {"stock": new_stock}
+            record.stock = new_stock
+            item = record.to_dict()
+            self._notify("update", item, changes)
+        self._committed()
+        return item
+
+    def delete(self, item_id, expected_versions=None):
+        """
+        Remove an item. Return the removed item, or None if missing.
+        expected_versions works like in update().
+        """
+        with self._lock, self._stripe(item_id):
+            if item_id in self._items:
+                self._check_version(item_id, expected_versions)
+            record = self._items.pop(item_id, None)
+            if record is None:
+                return None
+            self._ids.remove(item_id)
+            self._unindex(record)
+            item = record.to_dict()
+            self._notify("delete", item)
+        self._committed()
+        return item
+
+    def clear(self):
+        """Remove every item (the id counter keeps going up)."""
+        with self._lock:
+            self._items.clear()
+            self._ids.clear()
+            self._by_barcode.clear()
+            self._by_brand.clear()
+            self._names.clear()
+            self._notify("clear", None)
+        self._committed()
+
+    # Batches
+
+    def apply_batch(self, operations, atomic=False):
+        """
+        Apply a list of operations in one pass while holding the store lock.
+
+        Each operation is a dict:
+            {"op": "create", "product": {...}, "status": 1}
+            {"op": "patch", "id": 3, "fields": {...}}
+            {"op": "delete", "id": 3}
+
+        Return (ok, results) with one result dict per operation. With
+        atomic=True nothing is applied unless every operation can succeed.
+        """
+        # the commit hooks run once, after the whole batch
+        self._local.in_batch = True
+        try:
+            ok, results = self._apply_batch(operations, atomic)
+        finally:
+            self._local.in_batch = False
+        self._committed()
+        return ok, results
+
+    def _apply_batch(self, operations, atomic):
+        with self._lock:
+            if atomic:
+                errors = self._check_batch(operations)
+                if errors:
+                    return False, batch_failure_results(operations, errors)
+
+            results = []
+            ok = True
+            for index, operation in enumerate(operations):
+                op = operation["op"]
+                result = {"index": index, "op": op}
+
+                if op == "create":
+                    item = self.add(operation["product"], status=operation.get("status", 1))
+                elif op == "patch":
+                    item = self.update(operation["id"], operation["fields"])
+                else:
+                    item = self.delete(operation["id"])
+
+                if item is None:
+                    ok = False
+                    result.update(status="error", id=operation["id"], error="Item not found")
+                else:
+                    result.update(status="ok", id=item["id"])
+                results.append(result)
+            return ok, results
+
+    def _check_batch(self, operations):
+        """Return {index: error} for operations that would fail, without changing anything."""
+        errors = {}
+        deleted = set()
+        for index, operation in enumerate(operations):
+            if operation["op"] == "create":
+                continue
+            item_id = operation["id"]
+            if item_id not in self._items or item_id in deleted:
+                errors[index] = "Item not found"
+            elif operation["op"] == "delete":
+                deleted.add(item_id)
+        return errors
+
+    # Queries
+
+    def find(self, barcode=None, brand=None, name_prefix=None, fields=None):
+        """
+        Return the items matching every filter that is not None.
+        Results are in insertion order (same order as iterating the store).
+        """
+        with self._lock:
+            matches = None  # None means "no filter applied yet"
+
+            if barcode is not None:
+                matches = self._intersect(matches, self._by_barcode.get(str(barcode), {}))
+
+            if brand is not None:
+                key = brand.strip().casefold()
+                matches = self._intersect(matches, self._by_brand.get(key, {}))
+
+            if name_prefix is not None:
+                matches = self._intersect(matches, self._ids_with_name_prefix(name_prefix))
+
+            if matches is None:
+                return self.all(fields)
+
+            # ids are handed out in increasing order, so sorting them
+            # gives the same order as the primary index
+            records = [self._items[item_id] for item_id in sorted(matches)]
+            if fields is not None:
+                return [record.project(fields) for record in records]
+            return [record.to_dict() for record in records]
+
+    def page(self, after_id=0, limit=100, fields=None):
+        """
+        Return up to `limit` items with an id greater than `after_id`.
+
+        Ids only go up, so "everything after this id" stays a stable
+        position even when other items are added or deleted between pages.
+        """
+        with self._lock:
+            items = []
+            for item_id in self._ids.irange(after_id + 1):
+                record = self._items.get(item_id)
+                if record is not None:
+                    items.append(record.to_dict() if fields is None else record.project(fields))
+                    if len(items) >= limit:
+                        break
+            return items
+
+    def iter_pages(self, page_size=500, fields=None):
+        """
+        Yield the items page by page without copying the whole store.
+        Items added while iterating show up if their id is still ahead.
+        """
+        after_id = 0
+        while True:
+            items = self.page(after_id, page_size, fields)
+            if not items:
+                return
+            yield from items
+            after_id = items[-1]["id"]
+
+    def find_by_barcode(self, barcode):
+        """Return the items with this barcode (O(1) lookup)."""
+        return self.find(barcode=barcode)
+
+    def _ids_with_name_prefix(self, prefix):
+        prefix = prefix.casefold()
+        ids = {}
+        # all names starting with prefix sit next to each other in the sorted index
+        for name, item_id in self._names.irange((prefix,)):
+            if not name.startswith(prefix):
+                break
+            ids[item_id] = None
+        return ids
+
+    @staticmethod
+    def _intersect(matches, ids):
+        if matches is None:
+            return dict(ids)
+        # loop over the smaller side
+        if len(ids) < len(matches):
+            matches, ids = ids, matches
+        return {item_id: None for item_id in matches if item_id in ids}
+
+    # Index maintenance
+
+    def _index(self, record):
+        item_id = record.id
+        product = record
+
+        barcode = barcode_key(product)
+        if barcode is not None:
+            self._by_barcode.setdefault(barcode, {})[item_id] = None
+
+        for brand in brand_keys(product):
+            self._by_brand.setdefault(brand, {})[item_id] = None
+
+        self._names.add((name_key(product), item_id))
+
+    def _unindex(self, record):
+        item_id = record.id
+        product = record
+
+        barcode = barcode_key(product)
+        if barcode is not None:
+            self._discard(self._by_barcode, barcode, item_id)
+
+        for brand in brand_keys(product):
+            self._discard(self._by_brand, brand, item_id)
+
+        self._names.remove((name_key(product), item_id))
+
+    @staticmethod
+    def _discard(index, key, item_id):
+        ids = index.get(key)
+        if ids is None:
+            return
+        ids.pop(item_id, None)
+        # drop empty buckets so the index does not grow forever
+        if not ids:
+            del index[key]
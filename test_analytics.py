@@ -0,0 +1,80 @@
+import random
+
+from analytics import InventoryStats, compute_stats
+from store import InventoryStore
+
+
+def test_running_totals_follow_changes():
+    """Test that the totals and brand rollups change with add, update, adjust and delete."""
+    store = InventoryStore()
+    stats = InventoryStats(store)
+    store.add({"brands": "Silk, Danone", "price": 2.0, "stock": 3})
+    store.add({"brands": "Silk", "price": 1.5, "stock": 10})
+
+    result = stats.stats()
+    assert (result["items"], result["units"], result["value"]) == (2, 13, 21.0)
+    assert result["brands"] == [
+        {"brand": "danone", "items": 1, "units": 3, "value": 6.0},
+        {"brand": "silk", "items": 2, "units": 13, "value": 21.0},
+    ]
+
+    store.update(1, {"brands": "Kind"})
+    store.adjust_stock(2, -4)
+    store.delete(1)
+    assert stats.stats() == {
+        "items": 1, "units": 6, "value": 9.0,
+        "brands": [{"brand": "silk", "items": 1, "units": 6, "value": 9.0}],
+    }
+
+    store.clear()
+    assert stats.stats() == {"items": 0, "units": 0, "value": 0.0, "brands": []}
+
+
+def test_bool_stock_and_price_count_as_zero():
+    """Test that true / false are not numbers for the stats (like for adjust_stock)."""
+    store = InventoryStore()
+    stats = InventoryStats(store)
+    store.add({"brands": "Silk", "price": 2.0, "stock": True})
+    store.add({"brands": "Silk", "price": True, "stock": 4})
+
+    result = stats.stats()
+    assert (result["items"], result["units"], result["value"]) == (2, 4, 0.0)
+    assert stats.low_stock(0)[0]["product"]["stock"] is True
+    assert stats.check()
+
+
+def test_low_stock_is_sorted_by_stock():
+    """Test that low_stock returns items at or below the threshold, lowest stock first."""
+    store = InventoryStore()
+    for stock in (7, 2, 5, None, 9):
+        store.add({"stock": stock})
+    stats = InventoryStats(store)
+
+    assert [item["id"] for item in stats.low_stock(5)] == [4, 2, 3]
+    assert [item["id"] for item in stats.low_stock(5, limit=2)] == [4, 2]
+
+    store.adjust_stock(5, -9)
+    assert [item["id"] for item in stats.low_stock(0)] == [4, 5]
+
+
+def test_running_totals_match_full_recompute():
+    """Test that random changes keep the running totals equal to compute_stats()."""
+    rng = random.Random(7)
+    store = InventoryStore()
+    stats = InventoryStats(store)
+    brands = ["A", "B", "A, C", None, "c"]
+
+    for _ in range(2000):
+        ids = store.item_ids()
+        action = rng.random()
+        if action < 0.4 or not ids:
+            store.add({"brands": rng.choice(brands), "price": rng.choice([0.1, 2.99, "x"]), "stock": rng.randint(0, 50)})
+        elif action < 0.7:
+            store.update(rng.choice(ids), {"price": round(rng.uniform(0, 10), 2), "brands": rng.choice(brands)})
+        elif action < 0.9:
+            store.adjust_stock(rng.choice(ids), rng.randint(-5, 5))
+        else:
+            store.delete(rng.choice(ids))
+
+    assert stats.check()
+    assert stats.stats()["items"] == compute_stats(store.all())["items"] == len(store)
@@ -1,5 +1,6 @@
 
 import json
+import time
 from unittest.mock import patch, MagicMock
 
 from app import app, inventory, fetch_openfoodfacts_product
@@ -62,7 +63,7 @@ def test_update_inventory_item():
     client = get_test_client()
 
     # Make sure there is at least one item to update
-    first_item_id = inventory[0]["id"]
+    first_item_id = next(iter(inventory))["id"]
 
     update_data = {"price": 4.50}
 
@@ -109,9 +110,9 @@ def test_delete_inventory_item():
     get_response = client.get(f"/inventory/{new_id}")
     assert get_response.status_code == 404
 
-# Tests for external API helper (mocking requests.get)
+# Tests for external API helper (mocking the client session)
 
-@patch("app.requests.get")
+@patch("app.off_client.session.get")
 def test_fetch_openfoodfacts_product_success(mock_get):
     """Test fetch_openfoodfacts_product when external API returns a valid product."""
 
@@ -140,7 +141,7 @@ def test_fetch_openfoodfacts_product_success(mock_get):
     assert result["ingredients_text"] == "Mock ingredients"
 
 
-@patch("app.requests.get")
+@patch("app.off_client.session.get")
 def test_fetch_openfoodfacts_product_not_found(mock_get):
     """Test fetch_openfoodfacts_product when external API does not find product."""
 
@@ -157,3 +158,694 @@ def test_fetch_openfoodfacts_product_not_found(mock_get):
 
     # Should return None if product is not found
     assert result is None
+
+
+def test_get_inventory_with_filters():
+    """Test GET /inventory with barcode, brand and name_prefix filters."""
+    client = get_test_client()
+
+    response = client.get("/inventory?barcode=0987654321")
+    assert response.status_code == 200
+    data = response.get_json()
+    assert len(data) == 1
+    assert data[0]["product"]["product_name"] == "Granola Bar"
+
+    data = client.get("/inventory?brand=silk").get_json()
+    assert all("Silk" in item["product"]["brands"] for item in data)
+
+    data = client.get("/inventory?name_prefix=organic").get_json()
+    assert any(item["product"]["barcode"] == "1234567890" for item in data)
+
+    data = client.get("/inventory?barcode=does-not-exist").get_json()
+    assert data == []
+
+
+def test_get_inventory_paginated():
+    """Test GET /inventory?limit= returns pages linked by an opaque cursor."""
+    client = get_test_client()
+
+    seen = []
+    cursor = None
+    while True:
+        url = "/inventory?limit=1"
+        if cursor:
+            url += f"&cursor={cursor}"
+        response = client.get(url)
+        assert response.status_code == 200
+        page = response.get_json()
+        assert len(page["items"]) <= 1
+        seen.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    assert seen == [item["id"] for item in inventory]
+
+    bad = client.get("/inventory?limit=1&cursor=not-a-cursor")
+    assert bad.status_code == 400
+
+
+def test_get_inventory_ndjson_stream():
+    """Test GET /inventory with Accept: application/x-ndjson streams one item per line."""
+    client = get_test_client()
+
+    response = client.get("/inventory", headers={"Accept": "application/x-ndjson"})
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    lines = response.get_data(as_text=True).splitlines()
+    ids = [json.loads(line)["id"] for line in lines]
+    assert ids == [item["id"] for item in inventory]
+
+
+@patch("app.off_client.session.get")
+def test_fetch_openfoodfacts_product_is_cached(mock_get):
+    """Test that looking up the same barcode twice only calls the external API once."""
+
+    fake_response = MagicMock()
+    fake_response.status_code = 200
+    fake_response.json.return_value = {
+        "status": 1,
+        "product": {"product_name": "Cached Product", "brands": "Brand", "ingredients_text": ""}
+    }
+    mock_get.return_value = fake_response
+
+    first = fetch_openfoodfacts_product("5555555555")
+    second = fetch_openfoodfacts_product("5555555555")
+
+    assert first == second
+    assert mock_get.call_count == 1
+
+
+@patch("app.lookup_openfoodfacts_product")
+def test_add_items_from_barcodes_batch(mock_lookup):
+    """Test POST /inventory/fetch/batch looks each barcode up once, in parallel."""
+
+    def fake_lookup(barcode):
+        time.sleep(0.05)  # pretend the external API is slow
+        if barcode.startswith("missing"):
+            return None
+        return {"product_name": f"Batch {barcode}", "brands": "Batch", "ingredients_text": ""}
+
+    mock_lookup.side_effect = fake_lookup
+    client = get_test_client()
+    barcodes = [f"batch-{i}" for i in range(8)] + ["batch-0", "missing-1"]
+
+    start = time.perf_counter()
+    response = client.post("/inventory/fetch/batch", json={"barcodes": barcodes, "concurrency": 8})
+    elapsed = time.perf_counter() - start
+
+    assert response.status_code == 200
+    data = response.get_json()
+
+    # 9 unique barcodes, each looked up once
+    assert mock_lookup.call_count == 9
+    assert data["created"] == 8
+    assert data["not_found"] == 1
+    statuses = [result["status"] for result in data["results"]]
+    assert statuses == ["created"] * 8 + ["duplicate", "not_found"]
+    assert data["results"][8]["id"] == data["results"][0]["id"]
+
+    # 9 lookups of 50 ms with 8 at a time should take about 2 rounds, not 9
+    assert elapsed < 0.05 * 9
+
+    created_id = data["results"][0]["id"]
+    assert client.get(f"/inventory/{created_id}").get_json()["product"]["barcode"] == "batch-0"
+
+
+def test_add_items_from_barcodes_batch_validation():
+    """Test that a batch without a list of barcodes is rejected."""
+    client = get_test_client()
+
+    assert client.post("/inventory/fetch/batch", json={}).status_code == 400
+    assert client.post("/inventory/fetch/batch", json={"barcodes": []}).status_code == 400
+    response = client.post("/inventory/fetch/batch", json={"barcodes": ["1"], "concurrency": 0})
+    assert response.status_code == 400
+    # true is not an integer here, and the body must be an object
+    response = client.post("/inventory/fetch/batch", json={"barcodes": ["1"], "concurrency": True})
+    assert response.status_code == 400
+    assert client.post("/inventory/fetch/batch", json=["1"]).status_code == 400
+    for bad in (None, {}, 12.5, ""):
+        response = client.post("/inventory/fetch/batch", json={"barcodes": ["1", bad]})
+        assert response.status_code == 400
+
+
+def test_bulk_operations():
+    """Test POST /inventory/bulk applies create, patch and delete in one request."""
+    client = get_test_client()
+    created = client.post("/inventory", json={"product_name": "Bulk Target", "price": 1.0}).get_json()
+
+    response = client.post("/inventory/bulk", json={"operations": [
+        {"op": "create", "product": {"product_name": "Bulk New", "stock": 3}},
+        {"op": "patch", "id": created["id"], "fields": {"price": 2.5}},
+        {"op": "delete", "id": 999999},
+    ]})
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["applied"] == 2
+    assert data["failed"] == 1
+    assert [result["status"] for result in data["results"]] == ["ok", "ok", "error"]
+
+    new_id = data["results"][0]["id"]
+    assert client.get(f"/inventory/{new_id}").get_json()["product"]["stock"] == 3
+    assert client.get(f"/inventory/{created['id']}").get_json()["product"]["price"] == 2.5
+
+
+def test_bulk_operations_atomic_rolls_back():
+    """Test that an atomic batch with one failing operation changes nothing."""
+    client = get_test_client()
+    created = client.post("/inventory", json={"product_name": "Atomic Target", "price": 1.0}).get_json()
+    count_before = len(inventory)
+
+    response = client.post("/inventory/bulk", json={"atomic": True, "operations": [
+        {"op": "create", "product": {"product_name": "Never Added"}},
+        {"op": "patch", "id": created["id"], "fields": {"price": 9.0}},
+        {"op": "delete", "id": created["id"]},
+        {"op": "patch", "id": created["id"], "fields": {"price": 5.0}},
+    ]})
+
+    assert response.status_code == 409
+    statuses = [result["status"] for result in response.get_json()["results"]]
+    assert statuses == ["skipped", "skipped", "skipped", "error"]
+    assert len(inventory) == count_before
+    assert client.get(f"/inventory/{created['id']}").get_json()["product"]["price"] == 1.0
+
+
+def test_bulk_operations_validation():
+    """Test that malformed operations are rejected before anything is applied."""
+    client = get_test_client()
+    count_before = len(inventory)
+
+    response = client.post("/inventory/bulk", json={"operations": [
+        {"op": "create", "product": {"product_name": "Not Added"}},
+        {"op": "rename", "id": 1},
+        {"op": "patch", "id": "1", "fields": {"price": 1}},
+    ]})
+
+    assert response.status_code == 400
+    assert [entry["index"] for entry in response.get_json()["invalid"]] == [1, 2]
+    assert len(inventory) == count_before
+
+    # the body must be an object, and atomic a real boolean
+    assert client.post("/inventory/bulk", json=[1]).status_code == 400
+    create = {"op": "create", "product": {"product_name": "Not Added"}}
+    response = client.post("/inventory/bulk", json={"operations": [create], "atomic": "false"})
+    assert response.status_code == 400
+    assert len(inventory) == count_before
+
+
+def test_adjust_inventory_stock():
+    """Test POST /inventory/<id>/adjust adds a delta and guards against negative stock."""
+    client = get_test_client()
+    created = client.post("/inventory", json={"product_name": "Adjust Me", "stock": 5}).get_json()
+    url = f"/inventory/{created['id']}/adjust"
+
+    response = client.post(url, json={"delta": 3})
+    assert response.status_code == 200
+    assert response.get_json()["product"]["stock"] == 8
+
+    response = client.post(url, json={"delta": -10, "fail_if_negative": True})
+    assert response.status_code == 409
+    assert response.get_json()["stock"] == 8
+
+    response = client.post(url, json={"delta": -8, "fail_if_negative": True})
+    assert response.get_json()["product"]["stock"] == 0
+
+    assert client.post(url, json={"delta": "1"}).status_code == 400
+    assert client.post(url, json=[1]).status_code == 400
+    assert client.post(url, json={"delta": -1, "fail_if_negative": "no"}).status_code == 400
+    assert client.post("/inventory/999999/adjust", json={"delta": 1}).status_code == 404
+
+
+def test_etag_and_conditional_requests():
+    """Test ETag / If-None-Match on reads and If-Match on PATCH and DELETE."""
+    client = get_test_client()
+    created = client.post("/inventory", json={"product_name": "ETag Item", "price": 1.0})
+    item_id = created.get_json()["id"]
+    url = f"/inventory/{item_id}"
+
+    # single item: 304 while unchanged
+    first = client.get(url)
+    etag = first.headers["ETag"]
+    assert etag == created.headers["ETag"]
+    again = client.get(url, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.data == b""
+
+    # list: 304 while unchanged, 200 after any change
+    listing = client.get("/inventory")
+    list_etag = listing.headers["ETag"]
+    assert client.get("/inventory", headers={"If-None-Match": list_etag}).status_code == 304
+
+    # If-Match with the current ETag works and returns the new ETag
+    patched = client.patch(url, json={"price": 2.0}, headers={"If-Match": etag})
+    assert patched.status_code == 200
+    assert patched.headers["ETag"] != etag
+    assert client.get("/inventory", headers={"If-None-Match": list_etag}).status_code == 200
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 200
+
+    # a stale ETag is rejected and nothing changes
+    stale = client.patch(url, json={"price": 9.0}, headers={"If-Match": etag})
+    assert stale.status_code == 412
+    assert stale.headers["ETag"] == patched.headers["ETag"]
+    assert client.delete(url, headers={"If-Match": etag}).status_code == 412
+    assert client.get(url).get_json()["product"]["price"] == 2.0
+
+    assert client.delete(url, headers={"If-Match": patched.headers["ETag"]}).status_code == 200
+
+
+def test_inventory_stats_and_low_stock():
+    """Test GET /inventory/stats follows every change and /inventory/low-stock finds items."""
+    client = get_test_client()
+    before = client.get("/inventory/stats").get_json()
+
+    created = client.post("/inventory", json={
+        "product_name": "Stats Item", "brands": "StatsBrand", "price": 2.5, "stock": -1000,
+    }).get_json()
+    after = client.get("/inventory/stats").get_json()
+    assert after["items"] == before["items"] + 1
+    assert after["units"] == before["units"] - 1000
+    assert {"brand": "statsbrand", "items": 1, "units": -1000, "value": -2500.0} in after["brands"]
+    assert after == client.get("/inventory/stats?recompute=true").get_json()
+
+    low = client.get("/inventory/low-stock?threshold=-500").get_json()
+    assert [item["id"] for item in low["items"]] == [created["id"]]
+    assert client.get("/inventory/low-stock?threshold=abc").status_code == 400
+
+    client.delete(f"/inventory/{created['id']}")
+    assert client.get("/inventory/stats").get_json() == before
+
+
+def test_search_inventory():
+    """Test GET /inventory/search ranks matches, pages with a cursor and sees new items."""
+    client = get_test_client()
+    first = client.post("/inventory", json={"product_name": "Zesty Quinoa Crisps", "ingredients_text": "quinoa"}).get_json()
+    second = client.post("/inventory", json={"product_name": "Quinoa Salad"}).get_json()
+
+    response = client.get("/inventory/search?q=quinoa&limit=1")
+    assert response.status_code == 200
+    page = response.get_json()
+    assert [item["id"] for item in page["items"]] == [first["id"]]
+
+    rest = client.get(f"/inventory/search?q=quinoa&limit=1&cursor={page['next_cursor']}").get_json()
+    assert [item["id"] for item in rest["items"]] == [second["id"]]
+    assert rest["next_cursor"] is None
+
+    assert [item["id"] for item in client.get("/inventory/search?q=zest").get_json()["items"]] == [first["id"]]
+    assert client.get("/inventory/search?q=").status_code == 400
+    assert client.get("/inventory/search?q=quinoa&cursor=bad").status_code == 400
+
+
+def test_metrics_endpoint():
+    """Test GET /metrics counts requests by route pattern and reports store timings."""
+    client = get_test_client()
+    client.get("/inventory/1")
+    client.get("/inventory/999999")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain")
+    text = response.get_data(as_text=True)
+    assert 'inventory_http_requests_total{method="GET",route="/inventory/<int:item_id>",status="404"}' in text
+    assert 'inventory_http_request_duration_seconds_count{method="GET",route="/inventory/<int:item_id>"}' in text
+    assert 'inventory_store_operation_duration_seconds_count{operation="get"}' in text
+    assert f"inventory_items {len(inventory)}" in text
+
+
+def test_admin_profile_endpoints():
+    """Test the profiler admin endpoints: token check, on/off, report and download."""
+    from app import create_app
+
+    # disabled when no admin token is configured
+    no_token_app = create_app({"INVENTORY_ADMIN_TOKEN": None})
+    assert no_token_app.test_client().get("/admin/profile").status_code == 404
+
+    client = create_app({"INVENTORY_ADMIN_TOKEN": "secret", "INVENTORY_PROFILE": "0"}).test_client()
+    assert client.get("/admin/profile").status_code == 401
+    headers = {"Authorization": "Bearer secret"}
+    assert client.get("/admin/profile", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get("/admin/profile", headers=headers).get_json()["enabled"] is False
+
+    response = client.post("/admin/profile", json={"sample_rate": 2}, headers=headers)
+    assert response.status_code == 400
+    assert client.post("/admin/profile", json=[True], headers=headers).status_code == 400
+    response = client.post("/admin/profile", json={"enabled": True, "sample_rate": 1}, headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()["enabled"] is True
+
+    client.get("/inventory/1")
+    routes = client.get("/admin/profile", headers=headers).get_json()["routes"]
+    assert routes.get("GET /inventory/<int:item_id>", 0) >= 1
+
+    response = client.get(
+        "/admin/profile/report?route=GET /inventory/<int:item_id>&sort=tottime", headers=headers
+    )
+    assert response.status_code == 200
+    assert "function calls" in response.get_data(as_text=True)
+    assert client.get("/admin/profile/report?sort=nope", headers=headers).status_code == 400
+
+    response = client.get("/admin/profile/stats", headers=headers)
+    assert response.status_code == 200
+    assert response.content_type == "application/octet-stream"
+    assert ".pstats" in response.headers["Content-Disposition"]
+
+    # tracemalloc is off unless it is turned on
+    assert client.get("/admin/profile/memory", headers=headers).status_code == 409
+
+    client.delete("/admin/profile", headers=headers)
+    assert client.get("/admin/profile/report", headers=headers).status_code == 404
+
+
+def test_inventory_changes_feed():
+    """Test GET /inventory/changes: start position, changes since, resync and SSE."""
+    import app as app_module
+
+    client = get_test_client()
+    start = client.get("/inventory/changes").get_json()
+    assert start["changes"] == []
+
+    created = client.post("/inventory", json={"product_name": "Feed Item", "price": 1.0, "stock": 2}).get_json()
+    client.patch(f"/inventory/{created['id']}", json={"price": 1.5})
+    client.delete(f"/inventory/{created['id']}")
+
+    response = client.get(f"/inventory/changes?since={start['last_seq']}&epoch={start['epoch']}")
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [event["event"] for event in data["changes"]] == ["add", "update", "delete"]
+    assert data["changes"][1]["item"]["product"]["price"] == 1.5
+    assert data["last_seq"] == start["last_seq"] + 3
+
+    # nothing new, so an immediate empty answer
+    response = client.get(f"/inventory/changes?since={data['last_seq']}&wait=0")
+    assert response.get_json()["changes"] == []
+
+    # a restart (other epoch) or a seq the server never gave out -> resync
+    response = client.get("/inventory/changes?since=1&epoch=other")
+    assert response.status_code == 410
+    assert response.get_json()["resync"] is True
+    assert client.get(f"/inventory/changes?since={data['last_seq'] + 100}").status_code == 410
+    assert client.get("/inventory/changes?since=abc").status_code == 400
+    assert client.get("/inventory/changes?since=0&wait=999").status_code == 400
+
+    # SSE: resume after the add, read the "retry" hint and the next event
+    response = client.get(
+        "/inventory/changes",
+        headers={"Accept": "text/event-stream", "Last-Event-ID": f"{app_module.change_feed.epoch}-{start['last_seq'] + 1}"},
+        buffered=False,
+    )
+    assert response.content_type.startswith("text/event-stream")
+    chunks = response.iter_encoded()
+    assert next(chunks).startswith(b"retry:")
+    message = next(chunks).decode()
+    response.close()
+    assert message.startswith(f"id: {app_module.change_feed.epoch}-{start['last_seq'] + 2}\nevent: change\n")
+    assert json.loads(message.split("data: ", 1)[1])["event"] == "update"
+
+
+def test_async_barcode_fetch_keeps_crud_fast(monkeypatch):
+    """Test that async fetches answer 202 at once and CRUD stays fast while the upstream is slow."""
+    import app as app_module
+    from off_client import OpenFoodFactsClient
+    from off_stub import StubServer
+
+    delay = 0.5
+    barcodes = [f"7700000000{i}" for i in range(6)]
+    products = {barcode: {"product_name": f"Slow {barcode}", "brands": "Stub"} for barcode in barcodes}
+    client = get_test_client()
+
+    with StubServer(products=products, delay=delay) as stub:
+        monkeypatch.setattr(app_module, "off_client", OpenFoodFactsClient(base_url=stub.url, retries=0))
+
+        start = time.perf_counter()
+        accepted = [client.post(f"/inventory/fetch/{barcode}?async=true") for barcode in barcodes]
+        submit_seconds = time.perf_counter() - start
+
+        # CRUD requests while every lookup is still waiting on the stub
+        crud_seconds = []
+        for _ in range(20):
+            start = time.perf_counter()
+            assert client.get("/inventory/1").status_code == 200
+            crud_seconds.append(time.perf_counter() - start)
+
+        # all six were accepted long before even one lookup could finish
+        assert submit_seconds < delay
+        assert max(crud_seconds) < delay / 5
+        assert all(response.status_code == 202 for response in accepted)
+
+        body = accepted[0].get_json()
+        assert accepted[0].headers["Location"] == f"/jobs/{body['job']['id']}"
+        assert body["item"]["product"]["product_name"] == "Unknown Product"
+
+        # wait for the jobs, then the placeholders are filled in
+        deadline = time.monotonic() + 10
+        for response in accepted:
+            job_id = response.get_json()["job"]["id"]
+            while True:
+                job = client.get(f"/jobs/{job_id}").get_json()
+                if job["status"] in ("succeeded", "failed") or time.monotonic() > deadline:
+                    break
+                time.sleep(0.02)
+            assert job["status"] == "succeeded"
+            item = client.get(f"/inventory/{job['item_id']}").get_json()
+            assert item["product"]["product_name"] == f"Slow {job['barcode']}"
+            assert item["product"]["brands"] == "Stub"
+
+    assert client.get("/jobs/unknown").status_code == 404
+
+
+def test_async_barcode_fetch_not_found_removes_placeholder(monkeypatch):
+    """Test that a barcode the upstream does not know fails the job and drops the placeholder."""
+    import app as app_module
+    from off_client import OpenFoodFactsClient
+    from off_stub import StubServer
+
+    client = get_test_client()
+    with StubServer() as stub:
+        monkeypatch.setattr(app_module, "off_client", OpenFoodFactsClient(base_url=stub.url, retries=0))
+        response = client.post("/inventory/fetch/7711111111", headers={"Prefer": "respond-async"})
+        assert response.status_code == 202
+        job_id = response.get_json()["job"]["id"]
+        item_id = response.get_json()["item"]["id"]
+
+        deadline = time.monotonic() + 5
+        while client.get(f"/jobs/{job_id}").get_json()["status"] in ("queued", "running"):
+            assert time.monotonic() < deadline
+            time.sleep(0.02)
+
+    job = client.get(f"/jobs/{job_id}").get_json()
+    assert job["status"] == "failed"
+    assert job["error"] == "Product not found in external API"
+    assert client.get(f"/inventory/{item_id}").status_code == 404
+
+
+@patch("app.lookup_openfoodfacts_product")
+def test_fetch_uses_offline_dump_first(mock_lookup, monkeypatch, tmp_path):
+    """Test that barcodes in the offline dump index never go to the network."""
+    import app as app_module
+    from off_dump import DumpIndex, build_index
+
+    source = tmp_path / "dump.jsonl"
+    source.write_text(json.dumps({"code": "4400000000001", "product_name": "Offline Oats", "brands": "Dump"}) + "\n")
+    build_index(str(source), str(tmp_path / "off.idx"))
+    index = DumpIndex(str(tmp_path / "off.idx"))
+    monkeypatch.setattr(app_module, "dump_index", index)
+    # the network is down
+    mock_lookup.return_value = None
+
+    client = get_test_client()
+    response = client.post("/inventory/fetch/4400000000001")
+    assert response.status_code == 201
+    assert response.get_json()["product"]["product_name"] == "Offline Oats"
+    # found in the dump, so no async job either
+    assert client.post("/inventory/fetch/4400000000001?async=true").status_code == 201
+    assert mock_lookup.call_count == 0
+
+    # not in the dump: falls back to the API
+    assert client.post("/inventory/fetch/4400000000002").status_code == 404
+    assert mock_lookup.call_count == 1
+    assert client.get("/cache/stats").get_json()["dump_index"]["hits"] == 2
+    index.close()
+
+
+def test_field_projection():
+    """Test ?fields= on the list, page, NDJSON and single-item routes."""
+    client = get_test_client()
+
+    items = client.get("/inventory?fields=product_name,price").get_json()
+    assert len(items) == len(inventory)
+    for item in items:
+        assert set(item) == {"id", "product"}
+        assert set(item["product"]) <= {"product_name", "price"}
+
+    page = client.get("/inventory?limit=1&fields=stock").get_json()
+    assert list(page["items"][0]) == ["id", "product"]
+    assert page["next_cursor"] is not None
+
+    lines = client.get("/inventory?format=ndjson&fields=status").get_data(as_text=True).splitlines()
+    assert json.loads(lines[0]) == {"id": items[0]["id"], "status": 1}
+
+    item = client.get("/inventory/1?fields=product_name").get_json()
+    assert item == {"id": 1, "product": {"product_name": inventory.get(1)["product"]["product_name"]}}
+
+    # each field list has its own ETag
+    full = client.get("/inventory/1")
+    projected = client.get("/inventory/1?fields=price")
+    assert full.headers["ETag"] != projected.headers["ETag"]
+    assert client.get("/inventory/1?fields=price", headers={"If-None-Match": projected.headers["ETag"]}).status_code == 304
+
+    assert client.get("/inventory?fields=a;b").status_code == 400
+    assert client.get("/inventory/1?fields=").status_code == 400
+
+
+def test_inventory_price_and_stock_ranges():
+    """Test ?min_price= / ?max_stock= / ?sort= with pages, other filters, PATCH and bad values."""
+    client = get_test_client()
+    ids = []
+    for price, stock in ((1000.30, 5), (1000.10, 50), (1000.20, 5)):
+        response = client.post("/inventory", json={"product_name": "Range", "brands": "RangeTest",
+                                                   "price": price, "stock": stock})
+        ids.append(response.get_json()["id"])
+
+    def result_ids(url):
+        response = client.get(url)
+        assert response.status_code == 200
+        data = response.get_json()
+        return [item["id"] for item in (data["items"] if isinstance(data, dict) else data)]
+
+    assert result_ids("/inventory?min_price=1000&max_price=1000.25") == [ids[1], ids[2]]
+    assert result_ids("/inventory?min_price=1000&sort=-price") == [ids[0], ids[2], ids[1]]
+    assert result_ids("/inventory?brand=RangeTest&max_stock=5&sort=-stock") == [ids[2], ids[0]]
+
+    page = client.get("/inventory?min_price=1000&sort=price&limit=2").get_json()
+    assert [item["id"] for item in page["items"]] == [ids[1], ids[2]]
+    # a new item before the cursor does not move the next page
+    cheap = client.post("/inventory", json={"product_name": "Range", "price": 1000.0}).get_json()["id"]
+    rest = result_ids(f"/inventory?min_price=1000&sort=price&limit=2&cursor={page['next_cursor']}")
+    assert rest == [ids[0]]
+    client.delete(f"/inventory/{cheap}")
+    assert client.get("/inventory?min_price=1000&sort=price&cursor=bm9wZQ==").status_code == 400
+
+    # a PATCH moves the item in the price order
+    client.patch(f"/inventory/{ids[1]}", json={"price": 1000.40})
+    assert result_ids("/inventory?min_price=1000&sort=-price&fields=price") == [ids[1], ids[0], ids[2]]
+
+    assert client.get("/inventory?min_price=cheap").status_code == 400
+    assert client.get("/inventory?max_stock=inf").status_code == 400
+    assert client.get("/inventory?sort=name").status_code == 400
+
+    for item_id in ids:
+        client.delete(f"/inventory/{item_id}")
+
+
+def test_response_compression():
+    """Test negotiated gzip: body, ETag variants, small bodies and streams."""
+    import gzip
+
+    from app import create_app
+
+    client = create_app({"INVENTORY_COMPRESS_MIN_SIZE": 0}).test_client()
+    plain = client.get("/inventory")
+    assert "Content-Encoding" not in plain.headers
+
+    response = client.get("/inventory", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert gzip.decompress(response.data) == plain.data
+    assert response.headers["ETag"] == plain.headers["ETag"][:-1] + '-gzip"'
+
+    # the gzip ETag revalidates, and works for If-Match
+    revalidate = client.get(
+        "/inventory", headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["ETag"]}
+    )
+    assert revalidate.status_code == 304
+    item = client.get("/inventory/1", headers={"Accept-Encoding": "gzip"})
+    assert item.headers["Content-Encoding"] == "gzip"
+    patched = client.patch("/inventory/1", json={"price": 3.99}, headers={"If-Match": item.headers["ETag"]})
+    assert patched.status_code == 200
+
+    # NDJSON is compressed while it streams
+    stream = client.get("/inventory?format=ndjson", headers={"Accept-Encoding": "gzip"})
+    assert stream.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(stream.data) == client.get("/inventory?format=ndjson").data
+
+    # small bodies and clients that refuse gzip get plain JSON
+    large_only = create_app({"INVENTORY_COMPRESS_MIN_SIZE": 10**9}).test_client()
+    assert "Content-Encoding" not in large_only.get("/inventory", headers={"Accept-Encoding": "gzip"}).headers
+    assert "Content-Encoding" not in client.get("/inventory", headers={"Accept-Encoding": "gzip;q=0"}).headers
+
+
+def test_compression_keeps_weak_etags():
+    """Test that a weak ETag is not turned into a "-gzip" variant."""
+    from app import create_app
+    from flask import jsonify as flask_jsonify
+
+    weak_app = create_app({"SEED_ITEMS": []})
+
+    @weak_app.route("/weak")
+    def weak_route():
+        response = flask_jsonify({"text": "x" * 4096})
+        response.set_etag("v1", weak=True)
+        return response
+
+    response = weak_app.test_client().get("/weak", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["ETag"] == 'W/"v1"'
+
+
+def test_create_app_isolated_and_lazy(tmp_path):
+    """Test that create_app() builds nothing up front and each app has its own store."""
+    from app import create_app
+
+    memory_app = create_app({"INVENTORY_BACKEND": "memory", "SEED_ITEMS": []})
+    sqlite_app = create_app({"INVENTORY_BACKEND": "sqlite", "INVENTORY_DB": str(tmp_path / "inventory.db")})
+    memory_services = memory_app.extensions["inventory"]
+    assert memory_services.peek("inventory") is None
+
+    memory_client = memory_app.test_client()
+    assert memory_client.get("/inventory").get_json() == []
+    created = memory_client.post("/inventory", json={"product_name": "Only here", "price": 1.0}).get_json()
+    assert memory_client.get(f"/inventory/{created['id']}").get_json()["product"]["product_name"] == "Only here"
+    # the store (and what follows it) was built, the OpenFoodFacts client was not
+    assert memory_services.peek("search_index") is not None
+    assert memory_services.peek("off_client") is None
+
+    sqlite_client = sqlite_app.test_client()
+    assert len(sqlite_client.get("/inventory").get_json()) == 2
+    assert sqlite_client.get("/inventory/search?q=only").get_json()["items"] == []
+    assert all(item["product"].get("product_name") != "Only here" for item in inventory)
+
+    memory_services.close()
+    sqlite_app.extensions["inventory"].close()
+
+
+def test_settings_and_metrics_are_per_app():
+    """Test that each app reads its limits from its config and keeps its own metrics."""
+    from app import create_app
+
+    small_app = create_app({"SEED_ITEMS": [], "INVENTORY_BULK_MAX": 1, "INVENTORY_METRICS": "0"})
+    other_app = create_app({"SEED_ITEMS": []})
+    small_client = small_app.test_client()
+    other_client = other_app.test_client()
+
+    operations = [{"op": "create", "product": {"product_name": name}} for name in ("One", "Two")]
+    response = small_client.post("/inventory/bulk", json={"operations": operations})
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "At most 1 operations per request"
+    assert other_client.post("/inventory/bulk", json={"operations": operations}).status_code == 200
+
+    # metrics are off for small_app, and other_app only counts its own requests
+    assert "inventory_http_requests_total{" not in small_client.get("/metrics").get_data(as_text=True)
+    text = other_client.get("/metrics").get_data(as_text=True)
+    assert 'inventory_http_requests_total{method="POST",route="/inventory/bulk",status="200"} 1' in text
+    assert 'status="400"' not in text
+
+
+def test_import_does_not_load_requests():
+    """Test that importing the app does not import requests (the OpenFoodFacts client is lazy)."""
+    import subprocess
+    import sys
+
+    code = "import sys, app; print('requests' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
@@ -0,0 +1,67 @@
+import threading
+
+import pytest
+
+from changes import ChangeFeed, ResyncRequired
+from store import InventoryStore
+
+
+def test_changes_are_numbered_in_order():
+    """Test that every kind of change is recorded with the item and its seq."""
+    store = InventoryStore()
+    feed = ChangeFeed(store)
+    assert feed.changes(0) == ([], 0)
+
+    item = store.add({"product_name": "Milk", "price": 1.0, "stock": 3})
+    store.update(item["id"], {"price": 2.0})
+    store.adjust_stock(item["id"], -1)
+    store.delete(item["id"])
+    store.clear()
+
+    events, last_seq = feed.changes(0)
+    assert last_seq == 5
+    assert [event["seq"] for event in events] == [1, 2, 3, 4, 5]
+    assert [event["event"] for event in events] == ["add", "update", "update", "delete", "clear"]
+    assert events[1]["item"]["product"]["price"] == 2.0
+    assert events[1]["changes"] == {"price": 2.0}
+    assert events[2]["changes"] == {"stock": 2}
+    assert events[3] == {"seq": 4, "event": "delete", "id": item["id"]}
+
+    # paging with limit
+    events, last_seq = feed.changes(1, limit=2)
+    assert [event["seq"] for event in events] == [2, 3]
+    assert last_seq == 3
+
+
+def test_resync_when_client_falls_behind():
+    """Test that changes older than the buffer (or unknown ones) ask for a resync."""
+    store = InventoryStore()
+    feed = ChangeFeed(store, size=3)
+    for i in range(5):
+        store.add({"product_name": f"Item {i}"})
+
+    # changes 3..5 are kept, so a client at 2 is still fine
+    assert [event["seq"] for event in feed.changes(2)[0]] == [3, 4, 5]
+    with pytest.raises(ResyncRequired) as error:
+        feed.changes(1)
+    assert error.value.last_seq == 5
+    # a seq from before a restart
+    with pytest.raises(ResyncRequired):
+        feed.changes(99)
+
+
+def test_long_poll_wakes_up_on_change():
+    """Test that a waiting reader gets a change made by another thread."""
+    store = InventoryStore()
+    feed = ChangeFeed(store)
+    timer = threading.Timer(0.05, store.add, [{"product_name": "Late"}])
+    timer.start()
+    try:
+        events, last_seq = feed.changes(0, timeout=5)
+    finally:
+        timer.join()
+    assert last_seq == 1
+    assert events[0]["item"]["product"]["product_name"] == "Late"
+
+    # nothing new: returns empty after the timeout
+    assert feed.changes(1, timeout=0.01) == ([], 1)
@@ -3,33 +3,62 @@ from unittest.mock import patch, MagicMock
 
 import cli
 
-@patch("cli.requests.get")
+@patch("cli.session.get")
 def test_view_all_items(mock_get):
     """Test that view_all_items calls the API and handles a basic response."""
 
     # Fake response from the API
     fake_response = MagicMock()
     fake_response.status_code = 200
-    fake_response.json.return_value = [
-        {
-            "id": 1,
-            "product": {
-                "product_name": "Test Product",
-                "brands": "Test Brand",
-                "price": 1.23,
-                "stock": 5,
-                "barcode": "1234567890"
+    fake_response.json.return_value = {
+        "items": [
+            {
+                "id": 1,
+                "product": {
+                    "product_name": "Test Product",
+                    "brands": "Test Brand",
+                    "price": 1.23,
+                    "stock": 5,
+                    "barcode": "1234567890"
+                }
             }
-        }
-    ]
+        ],
+        "next_cursor": None
+    }
 
     mock_get.return_value = fake_response
 
     # so the function runs without errors
+    cli.view_all_items()
+    # only the printed fields are asked for
+    assert mock_get.call_args.kwargs["params"]["fields"] == cli.LIST_FIELDS
+
+
+@patch("cli.session.get")
+def test_view_all_items_follows_cursor(mock_get):
+    """Test that view_all_items keeps asking for pages until next_cursor is empty."""
+
+    first_page = MagicMock()
+    first_page.status_code = 200
+    first_page.json.return_value = {
+        "items": [{"id": 1, "product": {"product_name": "A"}}],
+        "next_cursor": "abc"
+    }
+    last_page = MagicMock()
+    last_page.status_code = 200
+    last_page.json.return_value = {
+        "items": [{"id": 2, "product": {"product_name": "B"}}],
+        "next_cursor": None
+    }
+    mock_get.side_effect = [first_page, last_page]
+
     cli.view_all_items()
 
+    assert mock_get.call_count == 2
+    assert mock_get.call_args.kwargs["params"]["cursor"] == "abc"
 
-@patch("cli.requests.post")
+
+@patch("cli.session.post")
 @patch("builtins.input")
 def test_add_item_from_barcode(mock_input, mock_post):
     """Test the CLI function that adds an item from barcode using the external API route."""
@@ -53,3 +82,114 @@ def test_add_item_from_barcode(mock_input, mock_post):
 
     # so it runs without errors
     cli.add_item_from_barcode()
+
+
+@patch("cli.session.get")
+def test_get_json_cached_reuses_body_on_304(mock_get):
+    """Test that a 304 answer reuses the body saved with the last ETag."""
+    cli.response_cache.clear()
+
+    first = MagicMock()
+    first.status_code = 200
+    first.headers = {"ETag": '"abc-1"'}
+    first.json.return_value = {"id": 1}
+    not_modified = MagicMock()
+    not_modified.status_code = 304
+    mock_get.side_effect = [first, not_modified]
+
+    assert cli.get_json_cached("/inventory/1") == (200, {"id": 1})
+    assert cli.get_json_cached("/inventory/1") == (200, {"id": 1})
+    assert mock_get.call_args.kwargs["headers"] == {"If-None-Match": '"abc-1"'}
+
+
+@patch("cli.session.get")
+@patch("builtins.input")
+def test_search_items(mock_input, mock_get):
+    """Test that search_items sends the query and asks before loading the next page."""
+    mock_input.side_effect = ["almond", "n"]
+
+    fake_response = MagicMock()
+    fake_response.status_code = 200
+    fake_response.headers = {}
+    fake_response.json.return_value = {
+        "items": [{"id": 1, "product": {"product_name": "Almond Milk", "brands": "Silk"}}],
+        "next_cursor": "abc"
+    }
+    mock_get.return_value = fake_response
+
+    cli.search_items()
+
+    assert mock_get.call_count == 1
+    assert mock_get.call_args.kwargs["params"]["q"] == "almond"
+
+
+def bulk_response(operations):
+    response = MagicMock()
+    response.status_code = 200
+    response.json.return_value = {
+        "results": [{"index": i, "op": op["op"], "status": "ok", "id": i + 1} for i, op in enumerate(operations)],
+        "applied": len(operations),
+        "failed": 0,
+    }
+    return response
+
+
+@patch("cli.session.post")
+def test_import_sends_batches(mock_post, tmp_path):
+    """Test that `import` reads a CSV file and sends its rows to /inventory/bulk in batches."""
+    path = tmp_path / "items.csv"
+    rows = ["product_name,brands,price,stock"] + [f"Item {i},Brand,1.5,{i}" for i in range(5)]
+    path.write_text("\n".join(rows) + "\n")
+    mock_post.side_effect = lambda url, json: bulk_response(json["operations"])
+
+    assert cli.main(["--base-url", "http://api.test", "import", str(path), "--batch-size", "2"]) == 0
+
+    sent = [call.kwargs["json"]["operations"] for call in mock_post.call_args_list]
+    assert [len(batch) for batch in sent] == [2, 2, 1]
+    assert all(call.args[0] == "http://api.test/inventory/bulk" for call in mock_post.call_args_list)
+    operations = sorted((op for batch in sent for op in batch), key=lambda op: op["product"]["stock"])
+    assert operations[0] == {"op": "create", "product": {"product_name": "Item 0", "brands": "Brand",
+                                                         "price": 1.5, "stock": 0}}
+
+
+@patch("cli.session.post")
+def test_update_from_file_reports_failures(mock_post, tmp_path):
+    """Test that `update --file` sends patches and exits with 1 when some fail."""
+    path = tmp_path / "changes.ndjson"
+    path.write_text('{"id": 1, "price": 2.5}\n\n{"id": 99, "stock": 3}\n')
+    response = MagicMock()
+    response.status_code = 200
+    response.json.return_value = {
+        "results": [{"index": 0, "op": "patch", "status": "ok", "id": 1},
+                    {"index": 1, "op": "patch", "status": "error", "id": 99, "error": "Item not found"}],
+        "applied": 1,
+        "failed": 1,
+    }
+    mock_post.return_value = response
+
+    assert cli.main(["update", "--file", str(path)]) == 1
+    assert mock_post.call_args.kwargs["json"]["operations"] == [
+        {"op": "patch", "id": 1, "fields": {"price": 2.5}},
+        {"op": "patch", "id": 99, "fields": {"stock": 3}},
+    ]
+
+
+@patch("cli.session.get")
+def test_export_writes_csv(mock_get, tmp_path):
+    """Test that `export` streams the NDJSON list into a CSV file."""
+    response = MagicMock()
+    response.status_code = 200
+    response.iter_lines.return_value = [
+        b'{"id": 1, "product": {"product_name": "Milk", "price": 3.99, "color": "white"}}',
+        b'{"id": 2, "product": {"product_name": "Bar", "stock": 5}}',
+    ]
+    mock_get.return_value = response
+    path = tmp_path / "items.csv"
+
+    assert cli.main(["export", str(path)]) == 0
+    assert mock_get.call_args.kwargs["params"] == {"format": "ndjson"}
+    assert path.read_text().splitlines() == [
+        "id,product_name,brands,ingredients_text,price,stock,barcode",
+        "1,Milk,,,3.99,,",
+        "2,Bar,,,,5,",
+    ]
@@ -0,0 +1,135 @@
+import threading
+import time
+
+from analytics import InventoryStats
+from store import InsufficientStockError, InventoryStore
+
+
+# helper to run the same function in several threads at once
+def run_threads(count, target):
+    start = threading.Barrier(count)
+
+    def worker(index):
+        start.wait()
+        target(index)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_concurrent_adjustments_are_not_lost():
+    """Test that many threads adjusting one popular item never lose an update."""
+    store = InventoryStore()
+    item = store.add({"product_name": "Popular", "stock": 0})
+
+    def adjust(index):
+        for _ in range(2000):
+            store.adjust_stock(item["id"], 1)
+
+    run_threads(8, adjust)
+
+    assert store.get(item["id"])["product"]["stock"] == 8 * 2000
+
+
+def test_reservations_never_oversell():
+    """Test that fail_if_negative lets exactly the available stock be reserved."""
+    store = InventoryStore()
+    item = store.add({"product_name": "Limited", "stock": 100})
+    reserved = []
+
+    def reserve(index):
+        for _ in range(50):
+            try:
+                store.adjust_stock(item["id"], -1, fail_if_negative=True)
+                reserved.append(1)
+            except InsufficientStockError:
+                pass
+
+    run_threads(8, reserve)
+
+    assert len(reserved) == 100
+    assert store.get(item["id"])["product"]["stock"] == 0
+
+
+def test_concurrent_adds_get_unique_ids():
+    """Test that items added from many threads never share an id."""
+    store = InventoryStore()
+    ids = []
+
+    def add(index):
+        for i in range(1000):
+            ids.append(store.add({"product_name": f"T{index}-{i}", "barcode": f"{index}-{i}"})["id"])
+
+    run_threads(8, add)
+
+    assert len(ids) == len(set(ids)) == 8000
+    assert len(store) == 8000
+    assert len(store.find(name_prefix="t")) == 8000
+
+
+def test_throughput_by_thread_count():
+    """Measure adjust throughput as threads are added (printed with pytest -s)."""
+    for threads in (1, 2, 4, 8):
+        store = InventoryStore()
+        items = [store.add({"stock": 0}) for _ in range(64)]
+        per_thread = 4000
+
+        def adjust(index):
+            for i in range(per_thread):
+                store.adjust_stock(items[(index + i) % 64]["id"], 1)
+
+        start = time.perf_counter()
+        run_threads(threads, adjust)
+        elapsed = time.perf_counter() - start
+
+        total = sum(item["product"]["stock"] for item in store)
+        assert total == threads * per_thread
+        print(f"{threads} threads: {threads * per_thread / elapsed:,.0f} adjustments/sec")
+
+
+def test_add_event_comes_before_updates_of_the_new_item():
+    """Test that a change of a just added item is never sent before its "add" event."""
+    store = InventoryStore()
+    events = []
+
+    def slow_listener(event, item, changes):
+        if event == "add":
+            time.sleep(0.05)
+        events.append(event)
+
+    store.subscribe(slow_listener)
+    stats = InventoryStats(store)
+
+    thread = threading.Thread(target=store.add, args=({"product_name": "New", "stock": 1},))
+    thread.start()
+    # get() sees the item while the listeners are still busy with "add"
+    while store.get(1) is None:
+        time.sleep(0.001)
+    store.adjust_stock(1, 5)
+    thread.join()
+
+    assert events == ["add", "update"]
+    assert stats.stats()["items"] == 1
+    assert stats.check()
+
+
+def test_follow_replays_and_subscribes_in_one_step():
+    """Test that a change made during follow()'s replay reaches the callback after it."""
+    store = InventoryStore([{"id": i, "product": {"stock": 1}} for i in (1, 2, 3)])
+    events = []
+    writer = threading.Thread(target=store.adjust_stock, args=(3, 1))
+
+    def callback(event, item, changes):
+        if writer.ident is None:
+            # another thread changes item 3 while the replay is running
+            writer.start()
+            writer.join(0.1)
+        events.append((event, item["id"], item["product"]["stock"]))
+
+    store.follow(callback)
+    writer.join()
+
+    assert events == [("add", 1, 1), ("add", 2, 1), ("add", 3, 1), ("update", 3, 2)]
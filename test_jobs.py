@@ -0,0 +1,61 @@
+import threading
+import time
+
+import pytest
+
+from jobs import JobError, JobQueue, QueueFull
+
+
+def wait_for(queue, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job["status"] in ("succeeded", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_job_results_and_errors():
+    """Test that jobs report their result, or the error they failed with."""
+    queue = JobQueue(workers=2)
+
+    job = queue.submit(lambda: {"answer": 42}, {"barcode": "111"})
+    assert job["status"] in ("queued", "running")
+    assert job["barcode"] == "111"
+    done = wait_for(queue, job["id"])
+    assert done["status"] == "succeeded"
+    assert done["result"] == {"answer": 42}
+    assert done["finished_at"] >= done["started_at"] >= done["created_at"]
+
+    def not_found():
+        raise JobError("Product not found")
+
+    assert wait_for(queue, queue.submit(not_found)["id"])["error"] == "Product not found"
+    assert wait_for(queue, queue.submit(lambda: 1 / 0)["id"])["error"].startswith("ZeroDivisionError")
+    assert queue.get("missing") is None
+    queue.shutdown()
+
+
+def test_queue_depth_limit():
+    """Test that submit() refuses work once max_pending jobs are waiting or running."""
+    release = threading.Event()
+    queue = JobQueue(workers=1, max_pending=2)
+    first = queue.submit(release.wait)
+    queue.submit(release.wait)
+    assert queue.pending() == 2
+    with pytest.raises(QueueFull):
+        queue.submit(release.wait)
+
+    release.set()
+    wait_for(queue, first["id"])
+    queue.shutdown()
+    assert queue.pending() == 0
+
+
+def test_old_finished_jobs_are_forgotten():
+    """Test that only the last max_finished finished jobs are kept."""
+    queue = JobQueue(workers=1, max_finished=2)
+    ids = [queue.submit(lambda: None)["id"] for _ in range(4)]
+    queue.shutdown()
+    assert [queue.get(job_id) is not None for job_id in ids] == [False, False, True, True]
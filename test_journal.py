@@ -0,0 +1,102 @@
+import os
+import threading
+import time
+
+from journal import Journal
+from store import InventoryStore
+
+
+# helper to open a store with a journal in a folder
+def open_store(folder, **options):
+    store = InventoryStore()
+    journal = Journal(str(folder), **options)
+    journal.recover(store)
+    journal.attach(store)
+    return store, journal
+
+
+def test_changes_survive_restart(tmp_path):
+    """Test that add, update and delete are replayed after a restart."""
+    store, journal = open_store(tmp_path, fsync="always")
+    store.add({"product_name": "Milk", "price": 3.99})
+    store.add({"product_name": "Bread"})
+    store.update(1, {"price": 4.5})
+    store.delete(2)
+    journal.close()
+
+    restarted, journal = open_store(tmp_path)
+    journal.close()
+
+    assert [item["id"] for item in restarted] == [1]
+    assert restarted.get(1)["product"]["price"] == 4.5
+    # the deleted id is not given out again
+    assert restarted.add({})["id"] == 3
+
+
+def test_snapshot_replaces_old_logs(tmp_path):
+    """Test that a snapshot plus the log tail gives back the same store."""
+    store, journal = open_store(tmp_path, fsync="never")
+    for i in range(10):
+        store.add({"product_name": f"Item {i}", "stock": i})
+    journal.snapshot()
+    store.update(3, {"stock": 100})
+    store.delete(10)
+    journal.close()
+
+    logs = [name for name in os.listdir(tmp_path) if name.startswith("wal-")]
+    assert logs == ["wal-1.log"]
+
+    restarted, journal = open_store(tmp_path)
+    journal.close()
+
+    assert len(restarted) == 9
+    assert restarted.get(3)["product"]["stock"] == 100
+    assert restarted.add({})["id"] == 11
+
+
+def test_cut_off_last_line_is_ignored(tmp_path):
+    """Test that a half written record at the end of the log is skipped."""
+    store, journal = open_store(tmp_path, fsync="always")
+    store.add({"product_name": "Milk"})
+    journal.close()
+
+    with open(tmp_path / "wal-0.log", "a") as log:
+        log.write('["u",1,{"pri')
+
+    restarted, journal = open_store(tmp_path)
+    journal.close()
+
+    assert restarted.get(1)["product"] == {"product_name": "Milk"}
+
+
+def test_concurrent_adds_share_an_fsync(tmp_path, monkeypatch):
+    """Test that with fsync="always", adds from many threads wait for the same fsync."""
+    store, journal = open_store(tmp_path, fsync="always")
+    fsyncs = []
+    real_fsync = os.fsync
+
+    def slow_fsync(fd):
+        fsyncs.append(fd)
+        time.sleep(0.05)
+        real_fsync(fd)
+
+    monkeypatch.setattr(os, "fsync", slow_fsync)
+    start = threading.Barrier(16)
+
+    def add(i):
+        start.wait()
+        store.add({"product_name": f"Item {i}"})
+
+    threads = [threading.Thread(target=add, args=(i,)) for i in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    journal.close()
+
+    # one fsync per add would be 16; the store lock is not held while
+    # waiting, so the adds queued during one fsync share the next one
+    assert len(fsyncs) <= 4
+    restarted, journal = open_store(tmp_path)
+    journal.close()
+    assert len(restarted) == 16
@@ -0,0 +1,57 @@
+from metrics import Registry, instrument
+
+
+def test_render_counter_and_histogram():
+    """Test the Prometheus text output: labels, cumulative buckets, sum and count."""
+    registry = Registry()
+    requests = registry.counter("requests_total", "Requests.", ("route",))
+    latency = registry.histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+    registry.gauge("items", "Items.", lambda: 3)
+
+    requests.inc("/a")
+    requests.inc("/a")
+    latency.observe(0.05, "/a")
+    latency.observe(0.5, "/a")
+    latency.observe(5, "/a")
+
+    assert registry.render().splitlines() == [
+        "# HELP requests_total Requests.",
+        "# TYPE requests_total counter",
+        'requests_total{route="/a"} 2',
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/a",le="0.1"} 1',
+        'latency_seconds_bucket{route="/a",le="1"} 2',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 3',
+        'latency_seconds_sum{route="/a"} 5.55',
+        'latency_seconds_count{route="/a"} 3',
+        "# HELP items Items.",
+        "# TYPE items gauge",
+        "items 3",
+    ]
+
+
+def test_label_values_are_escaped():
+    """Test that quotes and backslashes in label values do not break the format."""
+    registry = Registry()
+    registry.counter("c", "C.", ("path",)).inc('say "hi"\\')
+
+    assert 'c{path="say \\"hi\\"\\\\"} 1' in registry.render()
+
+
+def test_instrument_times_methods_of_one_object():
+    """Test that instrument() wraps methods on the object and keeps their results."""
+    class Store:
+        def get(self, item_id):
+            return {"id": item_id}
+
+    registry = Registry()
+    seconds = registry.histogram("store_seconds", "Store.", ("operation",))
+    store = Store()
+    instrument(store, ["get", "missing"], seconds)
+
+    assert store.get(4) == {"id": 4}
+    assert seconds.count("get") == 1
+    # other objects of the class are not timed
+    Store().get(1)
+    assert seconds.count("get") == 1
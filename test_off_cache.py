@@ -0,0 +1,92 @@
+import threading
+import time
+
+from off_cache import LookupCache, SingleFlight
+
+
+def test_hit_and_miss_counters():
+    """Test that get counts hits and misses."""
+    cache = LookupCache()
+
+    assert cache.get("111") == (False, None)
+    cache.put("111", {"product_name": "Milk"})
+    assert cache.get("111") == (True, {"product_name": "Milk"})
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_lru_eviction():
+    """Test that the least recently used barcode is evicted first."""
+    cache = LookupCache(max_size=2)
+    cache.put("a", {"product_name": "A"})
+    cache.put("b", {"product_name": "B"})
+    cache.get("a")  # "b" is now the oldest
+    cache.put("c", {"product_name": "C"})
+
+    assert cache.get("b") == (False, None)
+    assert cache.get("a")[0] is True
+    assert cache.stats()["evictions"] == 1
+
+
+def test_negative_results_expire_sooner(clock):
+    """Test that a cached "not found" uses the shorter negative TTL."""
+    cache = LookupCache(ttl=100, negative_ttl=10, clock=clock)
+    cache.put("found", {"product_name": "A"})
+    cache.put("missing", None)
+
+    assert cache.get("missing") == (True, None)
+
+    clock.now += 11
+    assert cache.get("missing") == (False, None)
+    assert cache.get("found")[0] is True
+
+    clock.now += 100
+    assert cache.get("found") == (False, None)
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    """Test that a new cache with the same file finds earlier lookups."""
+    path = str(tmp_path / "lookups.db")
+    LookupCache(path=path).put("111", {"product_name": "Milk"})
+
+    cache = LookupCache(path=path)
+
+    assert cache.get("111") == (True, {"product_name": "Milk"})
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_single_flight_shares_one_call():
+    """Test that threads asking for the same key at the same time share one call."""
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow_lookup():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return {"product_name": "Milk"}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("111", slow_lookup)))
+    leader.start()
+    started.wait()
+
+    followers = [
+        threading.Thread(target=lambda: results.append(flight.do("111", slow_lookup)))
+        for _ in range(3)
+    ]
+    for thread in followers:
+        thread.start()
+    # give the followers time to start waiting on the leader
+    time.sleep(0.05)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{"product_name": "Milk"}] * 4
+    assert flight.in_flight() == 0
@@ -0,0 +1,69 @@
+from off_client import CircuitBreaker, OpenFoodFactsClient
+from off_stub import StubServer
+
+
+# helper to build a client that talks to the stub and never sleeps
+def make_client(stub, breaker=None):
+    return OpenFoodFactsClient(base_url=stub.url, retries=2, backoff=0, breaker=breaker)
+
+
+def test_fetch_product_reuses_connection():
+    """Test that several lookups go over one kept-alive connection."""
+    with StubServer(products={"111": {"product_name": "Milk", "brands": "Silk"}}) as stub:
+        client = make_client(stub)
+
+        for _ in range(5):
+            product = client.fetch_product("111")
+        client.close()
+
+    assert product["product_name"] == "Milk"
+    assert stub.requests == 5
+    assert stub.connections == 1
+
+
+def test_not_found_returns_none():
+    """Test that an unknown barcode returns None without tripping the breaker."""
+    with StubServer() as stub:
+        client = make_client(stub)
+        assert client.fetch_product("000") is None
+        client.close()
+
+    assert client.breaker.state == "closed"
+
+
+def test_transient_errors_are_retried():
+    """Test that a 503 followed by a good answer still returns the product."""
+    with StubServer(products={"111": {"product_name": "Milk"}}) as stub:
+        stub.fail_next = [503, 502]
+        client = make_client(stub)
+        product = client.fetch_product("111")
+        client.close()
+
+    assert product["product_name"] == "Milk"
+    assert stub.requests == 3
+
+
+def test_circuit_breaker_opens_and_probes(clock):
+    """Test that the breaker fails fast while the API is down and closes after a good probe."""
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+
+    with StubServer(products={"111": {"product_name": "Milk"}}) as stub:
+        stub.down = True
+        client = make_client(stub, breaker)
+
+        assert client.fetch_product("111") is None
+        assert client.fetch_product("111") is None
+        assert breaker.state == "open"
+
+        # while open, no request reaches the server
+        calls = stub.requests
+        assert client.fetch_product("111") is None
+        assert stub.requests == calls
+
+        # after reset_timeout one probe goes through and closes the circuit
+        stub.down = False
+        clock.now += 10
+        assert breaker.state == "half-open"
+        assert client.fetch_product("111")["product_name"] == "Milk"
+        assert breaker.state == "closed"
+        client.close()
@@ -0,0 +1,77 @@
+import gzip
+import json
+import random
+
+import pytest
+
+from off_dump import DumpIndex, build_index
+
+
+def write_jsonl_gz(path, products):
+    with gzip.open(path, "wt", encoding="utf-8") as file:
+        for product in products:
+            file.write(json.dumps(product) + "\n")
+
+
+def test_build_and_look_up(tmp_path):
+    """Test that every barcode is found, across many sorted runs, and others are not."""
+    rng = random.Random(3)
+    barcodes = rng.sample(range(10**12, 10**13), 500)
+    products = [
+        {"code": str(code), "product_name": f"Product {code}", "brands": "Brand", "ingredients_text": "Oats",
+         "nutriments": {"energy": 100}}
+        for code in barcodes
+    ]
+    # a duplicate (the first one wins), a broken line and a missing barcode
+    products.append({"code": str(barcodes[0]), "product_name": "Second copy"})
+    products.append({"product_name": "No barcode"})
+    source = tmp_path / "dump.jsonl.gz"
+    write_jsonl_gz(source, products)
+    with gzip.open(source, "at", encoding="utf-8") as file:
+        file.write("{not json\n")
+
+    output = str(tmp_path / "off.idx")
+    # small runs so the merge of many runs is tested
+    result = build_index(str(source), output, run_size=37)
+    assert result == {"products": 500, "duplicates": 1, "skipped": 1}
+
+    index = DumpIndex(output)
+    assert len(index) == 500
+    for code in barcodes:
+        assert index.get(str(code)) == {
+            "product_name": f"Product {code}", "brands": "Brand", "ingredients_text": "Oats",
+        }
+    assert index.get(str(barcodes[0]))["product_name"] == f"Product {barcodes[0]}"
+    # before the first key, after the last one, a prefix of a real one, junk
+    for missing in ("0", "9" * 20, str(barcodes[1])[:-1], "x" * 100, ""):
+        assert index.get(missing) is None
+    assert index.stats()["hits"] == 501
+    index.close()
+
+
+def test_build_from_tab_separated_csv(tmp_path):
+    """Test the CSV export: tab separated, unquoted, empty cells become None."""
+    source = tmp_path / "products.csv"
+    source.write_text(
+        "code\turl\tproduct_name\tbrands\tingredients_text\n"
+        "3017620422003\thttp://x\tNutella \"original\"\tFerrero\tSugar, palm oil\n"
+        "0000000000017\thttp://y\tCrème brûlée\t\t\n",
+        encoding="utf-8",
+    )
+    output = str(tmp_path / "off.idx")
+    assert build_index(str(source), output)["products"] == 2
+
+    index = DumpIndex(output)
+    assert index.get("3017620422003") == {
+        "product_name": 'Nutella "original"', "brands": "Ferrero", "ingredients_text": "Sugar, palm oil",
+    }
+    assert index.get("0000000000017") == {"product_name": "Crème brûlée", "brands": None, "ingredients_text": None}
+    index.close()
+
+
+def test_rejects_other_files(tmp_path):
+    """Test that a file that is not an index is refused."""
+    path = tmp_path / "other.idx"
+    path.write_bytes(b"x" * 100)
+    with pytest.raises(ValueError):
+        DumpIndex(str(path))
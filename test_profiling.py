@@ -0,0 +1,68 @@
+import pstats
+
+import pytest
+
+from profiling import Profiler
+
+
+def busy_function():
+    return sum(i * i for i in range(1000))
+
+
+def test_sampled_requests_are_added_up_per_route():
+    """Test that profiles are collected per route and show up in the report."""
+    profiler = Profiler(enabled=True, sample_rate=1)
+    for route in ("GET /a", "GET /a", "GET /b"):
+        profile = profiler.start()
+        busy_function()
+        profiler.finish(route, profile)
+
+    assert profiler.routes() == {"GET /a": 2, "GET /b": 1}
+    assert "busy_function" in profiler.report("GET /a")
+    assert "busy_function" in profiler.report()
+    assert profiler.report("GET /missing") is None
+    with pytest.raises(ValueError):
+        profiler.report(sort="nope")
+
+    profiler.reset()
+    assert profiler.routes() == {}
+    assert profiler.report() is None
+
+
+def test_disabled_profiler_profiles_nothing():
+    """Test that start() returns None when profiling is off."""
+    assert Profiler().start() is None
+    assert Profiler(enabled=True, sample_rate=0).start() is None
+
+
+def test_dump_is_a_pstats_file(tmp_path):
+    """Test that dump() writes a file pstats can load."""
+    profiler = Profiler(enabled=True, sample_rate=1)
+    profile = profiler.start()
+    busy_function()
+    profiler.finish("GET /a", profile)
+
+    path = tmp_path / "profile.pstats"
+    path.write_bytes(profiler.dump())
+    names = [function for filename, line, function in pstats.Stats(str(path)).stats]
+    assert "busy_function" in names
+
+
+def test_memory_report():
+    """Test the tracemalloc report, including the growth since the last one."""
+    profiler = Profiler()
+    assert profiler.memory_report() is None
+
+    profiler.set_tracemalloc(True)
+    try:
+        first = profiler.memory_report(limit=5)
+        kept = [bytearray(1000) for _ in range(100)]
+        second = profiler.memory_report(limit=5)
+    finally:
+        profiler.set_tracemalloc(False)
+
+    assert "top 5 by size" in first
+    assert "growth since the last report" not in first
+    assert "growth since the last report" in second
+    assert len(kept) == 100
+    assert not profiler.tracing_memory
@@ -0,0 +1,70 @@
+import random
+
+from range_index import RangeIndex, scan_range
+from store import InventoryStore
+
+
+def make_store():
+    store = InventoryStore()
+    for price, stock in ((3.0, 10), (1.5, 25), (5.0, 0), (2.0, 10), (None, 4), ("n/a", 7), (2.0, 30)):
+        store.add({"price": price, "stock": stock})
+    return store
+
+
+def test_range_query_filters_and_sorts(ids):
+    """Test that bounds are inclusive, sorts break ties by id and non-numbers are left out."""
+    store = make_store()
+    index = RangeIndex(store)
+
+    assert ids(index.range_query(min_price=2, max_price=3)) == [4, 7, 1]
+    assert ids(index.range_query(sort="-price")) == [3, 1, 7, 4, 2]
+    assert ids(index.range_query(max_stock=10, sort="stock")) == [3, 5, 6, 1, 4]
+    assert ids(index.range_query(min_price=2, max_stock=10, sort="-stock")) == [4, 1, 3]
+    # pages resume after the (value, id) key of the last item
+    assert index.range_keys(sort="price", limit=2) == [(1.5, 2), (2.0, 4)]
+    assert ids(index.range_query(sort="price", limit=2, after=(2.0, 4))) == [7, 1]
+    assert ids(index.range_query(sort="-price", after=(2.0, 7))) == [4, 2]
+    assert index.range_query(min_price=2, max_price=2, fields=("id", "price")) == [
+        {"id": 4, "product": {"price": 2.0}}, {"id": 7, "product": {"price": 2.0}},
+    ]
+
+
+def test_range_index_follows_changes(ids):
+    """Test that updates, stock adjustments, deletes and clear move items in the indexes."""
+    store = make_store()
+    index = RangeIndex(store)
+
+    store.update(2, {"price": 9.0})
+    store.update(1, {"product_name": "renamed"})
+    store.adjust_stock(3, 40)
+    store.delete(4)
+    assert ids(index.range_query(sort="-price", limit=2)) == [2, 3]
+    assert ids(index.range_query(min_stock=30, sort="stock")) == [7, 3]
+
+    store.update(5, {"price": 0.5})
+    assert ids(index.range_query(max_price=1)) == [5]
+
+    store.clear()
+    assert index.range_query(sort="price") == []
+
+
+def test_range_query_matches_scan(ids):
+    """Test that the index gives the same results as scan_range on random data and queries."""
+    rng = random.Random(7)
+    store = InventoryStore()
+    for _ in range(2000):
+        store.add({"price": round(rng.uniform(0, 10), 1), "stock": rng.randrange(50)})
+    index = RangeIndex(store)
+
+    for _ in range(100):
+        low = round(rng.uniform(0, 10), 1)
+        query = {
+            "min_price": low,
+            "max_price": low + rng.choice((0, 0.5, 3)),
+            "max_stock": rng.choice((None, 10, 40)),
+            "sort": rng.choice((None, "price", "-price", "stock", "-stock")),
+        }
+        assert ids(index.range_query(**query)) == ids(scan_range(store.all(), **query))
+        # paging by key gives the same items as the whole list
+        after = (low + 1, rng.randrange(2000))
+        assert ids(index.range_query(**query, after=after)) == ids(scan_range(store.all(), **query, after=after))
@@ -0,0 +1,79 @@
+import random
+
+from search import SearchIndex, tokenize
+from store import InventoryStore
+
+
+def make_index():
+    store = InventoryStore()
+    store.add({"product_name": "Organic Almond Milk", "brands": "Silk", "ingredients_text": "Water, almonds"})
+    store.add({"product_name": "Granola Bar", "brands": "Nature Valley", "ingredients_text": "Oats, honey"})
+    store.add({"product_name": "Honey", "brands": "Crème Farms", "ingredients_text": "Honey"})
+    return store, SearchIndex(store)
+
+
+def test_tokenize_folds_case_and_accents():
+    """Test that tokens are lower case words without accents or punctuation."""
+    assert tokenize("Crème BRÛLÉE, oats_and-honey 2x") == ["creme", "brulee", "oats", "and", "honey", "2x"]
+
+
+def test_search_matches_words_and_prefixes(ids):
+    """Test that every query word must match, as a word or the start of one."""
+    store, index = make_index()
+
+    assert ids(index.search("almond")) == [1]
+    assert ids(index.search("ALMOND milk")) == [1]
+    assert ids(index.search("gran")) == [2]
+    assert ids(index.search("creme")) == [3]
+    assert index.search("almond honey") == []
+    assert index.search("chocolate") == []
+    assert index.search("  ") == []
+
+
+def test_search_ranks_with_bm25_and_pages(ids):
+    """Test that a short item with the word twice ranks first and pages do not overlap."""
+    store, index = make_index()
+
+    assert ids(index.search("honey")) == [3, 2]
+    assert ids(index.search("honey", limit=1)) == [3]
+    assert ids(index.search("honey", limit=1, offset=1)) == [2]
+
+
+def test_index_follows_changes(ids):
+    """Test that updates and deletes change the index without a rebuild."""
+    store, index = make_index()
+
+    store.update(1, {"product_name": "Oat Milk"})
+    assert index.search("organic") == []
+    assert ids(index.search("oat")) == [1, 2]
+
+    store.update(2, {"price": 2.0})
+    store.delete(3)
+    assert ids(index.search("honey")) == [2]
+
+    store.clear()
+    assert index.search("oat") == []
+    assert len(index) == 0
+
+
+def test_search_matches_brute_force():
+    """Test the ranked results against scoring every item one by one."""
+    rng = random.Random(3)
+    words = ["milk", "oat", "oats", "honey", "bar", "almond", "almonds", "rice", "soy", "salt"]
+    store = InventoryStore()
+    for _ in range(3000):
+        store.add({
+            "product_name": " ".join(rng.choices(words, k=rng.randint(1, 4))),
+            "ingredients_text": " ".join(rng.choices(words, k=rng.randint(0, 6))),
+        })
+    index = SearchIndex(store)
+
+    for query in ["milk", "oat", "alm", "honey salt", "oat mil", "soy rice bar"]:
+        found = index._rank(query, 25)
+        everything = index._rank(query, len(store))
+        assert found == everything[:25]
+        for item_id in range(1, len(store) + 1):
+            product_words = set(tokenize(store.get(item_id)["product"]["product_name"]))
+            product_words |= set(tokenize(store.get(item_id)["product"]["ingredients_text"]))
+            matches = all(any(term.startswith(word) for term in product_words) for word in tokenize(query))
+            assert matches == (item_id in {entry[1] for entry in everything})
@@ -0,0 +1,65 @@
+from flask import Flask, jsonify
+
+from serializer import ResponseCache, encode_fast, encode_stdlib
+from store import InventoryStore
+
+
+# Flask app only used to produce the reference jsonify() output
+reference_app = Flask(__name__)
+
+
+def jsonify_bytes(value):
+    with reference_app.app_context():
+        return jsonify(value).get_data()
+
+
+ITEMS = [
+    {"id": 1, "status": 1, "product": {"product_name": "Almond Milk", "price": 3.99, "stock": 10}},
+    {"id": 2, "status": 1, "product": {"product_name": "Café ☕", "brands": "Über", "price": 1e16}},
+    {"id": 3, "status": 1, "product": {"product_name": "Tiny", "price": 1e-05, "big": 2 ** 70}},
+    {"id": 4, "status": 1, "product": {"extra": [1, 2.5, None, True, {"b": 1, "a": "x\n\"y\""}]}},
+]
+
+
+def test_encoders_match_jsonify():
+    """Test that both encoders give the same bytes as jsonify (without the newline)."""
+    # orjson does not escape DEL (U+007F) but the stdlib does
+    del_char = {"id": 5, "status": 1, "product": {"product_name": "DEL \x7f char"}}
+    for item in ITEMS + [del_char]:
+        expected = jsonify_bytes(item)
+        assert encode_stdlib(item) + b"\n" == expected
+        assert encode_fast(item) + b"\n" == expected
+
+
+def test_list_and_page_bodies_match_jsonify():
+    """Test that bodies built from fragments match jsonify byte for byte."""
+    store = InventoryStore(ITEMS)
+    cache = ResponseCache(store)
+
+    assert cache.full_list_body() == jsonify_bytes(store.all())
+    assert cache.item_body(store.get(2)) == jsonify_bytes(store.get(2))
+    page = store.page(0, 2)
+    assert cache.page_body(page, "abc") == jsonify_bytes({"items": page, "next_cursor": "abc"})
+    assert cache.page_body([], None) == jsonify_bytes({"items": [], "next_cursor": None})
+
+
+def test_only_changed_items_are_encoded_again():
+    """Test that a write rebuilds one fragment and the list body picks it up."""
+    store = InventoryStore(ITEMS)
+    cache = ResponseCache(store)
+    cache.full_list_body()
+    misses = cache.misses
+
+    # nothing changed: the whole body comes from the cache
+    cache.full_list_body()
+    assert cache.misses == misses
+
+    store.update(1, {"price": 4.5})
+    body = cache.full_list_body()
+
+    assert cache.misses == misses + 1
+    assert body == jsonify_bytes(store.all())
+
+    store.delete(2)
+    assert cache.full_list_body() == jsonify_bytes(store.all())
+    assert cache.stats()["fragments"] == 3
@@ -0,0 +1,184 @@
+from sqlite_store import SQLiteInventoryStore
+
+
+# helper to build a store in a temporary database file
+def make_store(tmp_path):
+    return SQLiteInventoryStore(str(tmp_path / "inventory.db"))
+
+
+def test_add_get_update_delete(tmp_path):
+    """Test the basic CRUD methods of the SQLite store."""
+    store = make_store(tmp_path)
+
+    item = store.add({"product_name": "Milk", "brands": "Silk", "price": 3.99, "stock": 10, "barcode": "111"})
+    assert item["id"] == 1
+    assert store.get(1)["product"]["product_name"] == "Milk"
+
+    updated = store.update(1, {"price": 4.5, "color": "white"})
+    assert updated["product"]["price"] == 4.5
+    # keys that are not columns are kept in the JSON column
+    assert store.get(1)["product"]["color"] == "white"
+
+    assert store.delete(1)["id"] == 1
+    assert store.get(1) is None
+    assert store.update(1, {"price": 1.0}) is None
+    assert store.delete(1) is None
+
+
+def test_ids_are_never_reused(tmp_path):
+    """Test that AUTOINCREMENT does not give a deleted id to a new item."""
+    store = make_store(tmp_path)
+    store.add({})
+    store.add({})
+    store.delete(2)
+
+    assert store.add({})["id"] == 3
+
+
+def test_data_survives_reopening(tmp_path):
+    """Test that items are still there after opening the database again."""
+    store = make_store(tmp_path)
+    store.add({"product_name": "Granola Bar", "barcode": "222"})
+    store.close()
+
+    seeds = [{"id": 1, "status": 1, "product": {"product_name": "Seed"}}]
+    reopened = SQLiteInventoryStore(str(tmp_path / "inventory.db"), seeds)
+
+    # the database was not empty, so the seed items are not added again
+    assert len(reopened) == 1
+    assert reopened.get(1)["product"]["product_name"] == "Granola Bar"
+
+
+def test_find_and_page(tmp_path):
+    """Test the barcode, brand and name prefix filters and paging."""
+    store = make_store(tmp_path)
+    store.add({"product_name": "Almond Milk", "brands": "Silk, Danone", "barcode": "111"})
+    store.add({"product_name": "Oat Milk", "brands": "Oatly", "barcode": "222"})
+    store.add({"product_name": "Almond Butter", "brands": "Silk", "barcode": "333"})
+
+    assert [item["id"] for item in store.find(barcode="222")] == [2]
+    assert [item["id"] for item in store.find(brand="silk")] == [1, 3]
+    assert [item["id"] for item in store.find(name_prefix="alm")] == [1, 3]
+
+    # changing the brands re-keys the item
+    store.update(3, {"brands": "Oatly"})
+    assert [item["id"] for item in store.find(brand="oatly")] == [2, 3]
+
+    assert [item["id"] for item in store.page(1, 1)] == [2]
+    assert [item["id"] for item in store.iter_pages(page_size=2)] == [1, 2, 3]
+
+
+def test_apply_batch_atomic_rolls_back(tmp_path):
+    """Test that a failing atomic batch leaves the database unchanged."""
+    store = make_store(tmp_path)
+    store.add({"product_name": "Milk", "price": 1.0})
+
+    ok, results = store.apply_batch([
+        {"op": "create", "product": {"product_name": "New"}},
+        {"op": "patch", "id": 1, "fields": {"price": 2.0}},
+        {"op": "delete", "id": 42},
+    ], atomic=True)
+
+    assert ok is False
+    assert [result["status"] for result in results] == ["skipped", "skipped", "error"]
+    assert len(store) == 1
+    assert store.get(1)["product"]["price"] == 1.0
+
+    ok, results = store.apply_batch([{"op": "patch", "id": 1, "fields": {"price": 2.0}}])
+    assert ok is True
+    assert store.get(1)["product"]["price"] == 2.0
+
+
+def test_stats_and_low_stock_match_memory_store(tmp_path):
+    """Test that the SQL stats and low-stock list agree with analytics.compute_stats."""
+    from analytics import compute_stats
+
+    store = make_store(tmp_path)
+    store.add({"brands": "Silk, Danone", "price": 2.0, "stock": 3})
+    store.add({"brands": "Silk", "price": "n/a", "stock": 10})
+    store.add({"brands": "Kind", "price": 1.25})
+
+    assert store.stats() == compute_stats(store.all())
+    assert [item["id"] for item in store.low_stock(3)] == [3, 1]
+    assert [item["id"] for item in store.low_stock(3, limit=1)] == [3]
+
+
+def test_range_query_matches_memory_store(tmp_path):
+    """Test that the SQL price / stock range queries agree with range_index.scan_range."""
+    from range_index import scan_range
+
+    store = make_store(tmp_path)
+    for price, stock in ((3.0, 10), (1.5, 25), (5.0, 0), (2.0, 10), (None, 4), ("n/a", 7), (2.0, 30)):
+        store.add({"price": price, "stock": stock})
+
+    queries = [
+        {"min_price": 2, "max_price": 3},
+        {"sort": "-price"},
+        {"max_stock": 10, "sort": "stock"},
+        {"min_price": 2, "max_stock": 10, "sort": "-stock"},
+    ]
+    for query in queries:
+        expected = [item["id"] for item in scan_range(store.all(), **query)]
+        assert [item["id"] for item in store.range_query(**query)] == expected
+    assert store.range_keys(sort="price", limit=2) == [(1.5, 2), (2.0, 4)]
+    assert [item["id"] for item in store.range_query(sort="price", limit=2, after=(2.0, 4))] == [7, 1]
+    assert [item["id"] for item in store.range_query(sort="-price", after=(2.0, 7))] == [4, 2]
+    assert [item["id"] for item in store.get_many([7, 99, 1])] == [7, 1]
+
+
+def test_search_follows_changes(tmp_path):
+    """Test that the FTS5 index is kept up to date by the triggers."""
+    store = make_store(tmp_path)
+    store.add({"product_name": "Organic Almond Milk", "ingredients_text": "Water, almonds"})
+    store.add({"product_name": "Granola", "ingredients_text": "Oats, honey, crème"})
+
+    assert [item["id"] for item in store.search("almond")] == [1]
+    assert [item["id"] for item in store.search("CREME oat")] == [2]
+
+    store.update(2, {"ingredients_text": "Oats"})
+    assert store.search("honey") == []
+    store.delete(1)
+    assert store.search("milk") == []
+
+    # reopening keeps the index
+    assert [item["id"] for item in make_store(tmp_path).search("oats")] == [2]
+
+
+def test_subscribe_hears_committed_changes(tmp_path):
+    """Test that listeners get every change, and nothing from a rolled back batch."""
+    store = make_store(tmp_path)
+    events = []
+    store.subscribe(lambda event, item, changes: events.append((event, item and item["id"], changes)))
+
+    item = store.add({"product_name": "Milk", "stock": 1})
+    store.update(item["id"], {"price": 2.0})
+    store.adjust_stock(item["id"], 4)
+    ok, results = store.apply_batch(
+        [{"op": "patch", "id": item["id"], "fields": {"price": 3.0}}, {"op": "delete", "id": 999}],
+        atomic=True,
+    )
+    assert not ok
+    store.apply_batch([{"op": "delete", "id": item["id"]}])
+    store.clear()
+
+    assert events == [
+        ("add", item["id"], None),
+        ("update", item["id"], {"price": 2.0}),
+        ("update", item["id"], {"stock": 5}),
+        ("delete", item["id"], None),
+        ("clear", None, None),
+    ]
+
+
+def test_field_projection(tmp_path):
+    """Test that fields= works like in the memory store."""
+    from store import parse_fields
+
+    store = make_store(tmp_path)
+    store.add({"product_name": "Milk", "price": 2.0, "ingredients_text": "Long text", "color": "white"})
+    fields = parse_fields("product_name,price,color,missing")
+
+    assert store.get(1, fields) == {"id": 1, "product": {"product_name": "Milk", "price": 2.0, "color": "white"}}
+    assert store.all(parse_fields("status")) == [{"id": 1, "status": 1}]
+    assert store.page(0, 10, parse_fields("product")) == [{"id": 1, "product": store.get(1)["product"]}]
+    assert store.find(name_prefix="mi", fields=parse_fields("price")) == [{"id": 1, "product": {"price": 2.0}}]
@@ -0,0 +1,164 @@
+
+import pytest
+
+from store import InventoryStore, parse_fields
+
+
+# helper to build a store with n simple items
+def make_store(n):
+    store = InventoryStore()
+    for i in range(n):
+        store.add({"product_name": f"Item {i}", "price": 1.0, "stock": 1})
+    return store
+
+
+def test_add_and_get():
+    """Test that add gives a new id and get finds the item."""
+    store = InventoryStore()
+    item = store.add({"product_name": "Milk"})
+
+    assert item["id"] == 1
+    assert item["status"] == 1
+    assert store.get(1)["product"]["product_name"] == "Milk"
+    assert store.get(99) is None
+
+
+def test_get_many_skips_missing_ids():
+    """Test that get_many keeps the order of the ids and leaves out deleted ones."""
+    store = make_store(3)
+    store.delete(2)
+
+    assert [item["id"] for item in store.get_many([3, 2, 1, 99])] == [3, 1]
+    assert store.get_many([1], fields=("id",)) == [{"id": 1}]
+
+
+def test_ids_are_never_reused():
+    """Test that deleting the newest item does not give its id to the next one."""
+    store = make_store(3)
+
+    store.delete(3)
+    new_item = store.add({"product_name": "New"})
+
+    assert new_item["id"] == 4
+
+
+def test_seeded_items_move_the_id_counter():
+    """Test that items passed to the constructor keep their ids."""
+    store = InventoryStore([{"id": 7, "status": 1, "product": {}}])
+
+    assert store.get(7) is not None
+    assert store.add({})["id"] == 8
+
+
+def test_iteration_keeps_insertion_order():
+    """Test that iterating gives the items in the order they were added."""
+    store = make_store(5)
+    store.delete(2)
+    store.add({})
+
+    assert [item["id"] for item in store] == [1, 3, 4, 5, 6]
+
+
+def test_update_and_delete_missing_item():
+    """Test that update and delete return None for unknown ids."""
+    store = make_store(1)
+
+    assert store.update(42, {"price": 2.0}) is None
+    assert store.delete(42) is None
+    assert store.update(1, {"price": 2.0})["product"]["price"] == 2.0
+    assert store.delete(1)["id"] == 1
+    assert len(store) == 0
+
+
+def test_find_by_barcode_brand_and_name_prefix():
+    """Test the secondary indexes used by GET /inventory filters."""
+    store = InventoryStore()
+    store.add({"product_name": "Almond Milk", "brands": "Silk, Danone", "barcode": "111"})
+    store.add({"product_name": "Oat Milk", "brands": "Oatly", "barcode": "222"})
+    store.add({"product_name": "Almond Butter", "brands": "Silk", "barcode": "333"})
+
+    assert [item["id"] for item in store.find(barcode="222")] == [2]
+    assert [item["id"] for item in store.find(brand="silk")] == [1, 3]
+    assert [item["id"] for item in store.find(brand="Danone")] == [1]
+    assert [item["id"] for item in store.find(name_prefix="alm")] == [1, 3]
+    assert [item["id"] for item in store.find(brand="Silk", name_prefix="almond b")] == [3]
+    assert store.find(barcode="999") == []
+
+
+def test_update_rekeys_indexes():
+    """Test that changing barcode, brands or name moves the item in the indexes."""
+    store = InventoryStore()
+    store.add({"product_name": "Granola", "brands": "Nature Valley", "barcode": "111"})
+
+    store.update(1, {"barcode": "999", "brands": "Kind", "product_name": "Bar"})
+
+    assert store.find(barcode="111") == []
+    assert store.find(brand="Nature Valley") == []
+    assert store.find(name_prefix="gran") == []
+    assert [item["id"] for item in store.find(barcode="999")] == [1]
+    assert [item["id"] for item in store.find(brand="kind")] == [1]
+    assert [item["id"] for item in store.find(name_prefix="ba")] == [1]
+
+    store.delete(1)
+    assert store.find(barcode="999") == []
+    assert store.find(name_prefix="") == []
+
+
+def test_page_is_stable_across_inserts_and_deletes():
+    """Test that paging by id does not skip or repeat items when the store changes."""
+    store = make_store(5)
+
+    first = store.page(0, 2)
+    assert [item["id"] for item in first] == [1, 2]
+
+    # change the store between pages
+    store.delete(3)
+    store.add({})
+
+    rest = store.page(first[-1]["id"], 10)
+    assert [item["id"] for item in rest] == [4, 5, 6]
+    assert [item["id"] for item in store.iter_pages(page_size=2)] == [1, 2, 4, 5, 6]
+
+
+def test_returned_items_are_copies():
+    """Test that changing a returned item does not change the store."""
+    store = InventoryStore()
+    item = store.add({"product_name": "Milk", "stock": 2})
+
+    item["product"]["stock"] = 99
+    store.get(1)["product"]["product_name"] = "Changed"
+
+    assert store.get(1) == {"id": 1, "status": 1, "product": {"product_name": "Milk", "stock": 2}}
+
+
+def test_unset_and_extra_fields_round_trip():
+    """Test that fields never set stay out of the product and extra PATCH keys are kept."""
+    store = InventoryStore()
+    store.add({"product_name": "Milk", "price": None})
+
+    store.update(1, {"size": "1L"})
+
+    assert store.get(1)["product"] == {"product_name": "Milk", "price": None, "size": "1L"}
+
+
+def test_field_projection():
+    """Test that fields= returns only the asked keys, with id always there."""
+    assert parse_fields("product_name, price,price") == ("id", "product_name", "price")
+    assert parse_fields("status,product,price") == ("id", "status", "product")
+    for bad in ("", "price,", "a b", "price;stock"):
+        with pytest.raises(ValueError):
+            parse_fields(bad)
+
+    store = InventoryStore()
+    first = store.add({"product_name": "Milk", "price": 2.0, "ingredients_text": "Long text", "color": "white"})
+    store.add({"product_name": "Oats"})
+    fields = parse_fields("product_name,price,color")
+
+    assert store.get(first["id"], fields) == {
+        "id": first["id"], "product": {"product_name": "Milk", "price": 2.0, "color": "white"},
+    }
+    # fields an item does not have are left out, like in the full item
+    assert store.all(fields)[1] == {"id": 2, "product": {"product_name": "Oats"}}
+    assert store.page(0, 1, parse_fields("status")) == [{"id": 1, "status": 1}]
+    assert store.find(name_prefix="oa", fields=parse_fields("price")) == [{"id": 2, "product": {}}]
+    assert [item["id"] for item in store.iter_pages(1, parse_fields("price"))] == [1, 2]